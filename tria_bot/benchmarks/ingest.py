@@ -0,0 +1,104 @@
+"""Compare model and raw ingest paths of DepthSvc
+
+Usage:
+    python -m tria_bot.benchmarks.ingest [-n 20000] [--redis-url URL]
+
+Without `--redis-url` only the CPU cost of building what is sent to
+Redis is measured. With it, every path also writes the frames with one
+pipeline per 100 frames.
+"""
+import asyncio
+import json
+from time import perf_counter
+from typing import Any, Callable, Dict, Optional
+import orjson
+from aredis_om import get_redis_connection
+from tria_bot.crud.batch import json_set_raw
+from tria_bot.services.depth import DepthSvc
+
+
+FRAME = orjson.dumps(
+    {
+        "lastUpdateId": 41276198831,
+        "bids": [
+            ["0.05193000", "12.37210000"],
+            ["0.05192000", "25.18380000"],
+            ["0.05191000", "3.00210000"],
+            ["0.05190000", "40.51600000"],
+            ["0.05189000", "9.74410000"],
+        ],
+        "asks": [
+            ["0.05194000", "7.95470000"],
+            ["0.05195000", "18.29070000"],
+            ["0.05196000", "2.48370000"],
+            ["0.05197000", "31.10500000"],
+            ["0.05198000", "6.09910000"],
+        ],
+    }
+)
+
+
+def model_path(svc: DepthSvc, data: Dict[str, Any]):
+    # same work as JsonModel.save: model json, loads and dumps again
+    for model in svc._model_or_raise(data=data):
+        yield model.key(), json.dumps(json.loads(model.json()))
+
+
+def raw_path(svc: DepthSvc, data: Dict[str, Any]):
+    yield from svc._raw_or_raise(data=data)
+
+
+def bench_cpu(name: str, path: Callable, svc: DepthSvc, n: int) -> float:
+    start = perf_counter()
+    for _ in range(n):
+        list(path(svc, orjson.loads(FRAME)))
+    elapsed = perf_counter() - start
+    print(f"{name:>6}: {elapsed / n * 1e6:8.2f} us/frame")
+    return elapsed
+
+
+async def bench_redis(
+    name: str,
+    path: Callable,
+    svc: DepthSvc,
+    n: int,
+    url: str,
+    batch: int = 100,
+) -> None:
+    conn = get_redis_connection(url=url)
+    start = perf_counter()
+    for _ in range(0, n, batch):
+        async with conn.pipeline(transaction=False) as pipe:
+            for _ in range(batch):
+                for key, document in path(svc, orjson.loads(FRAME)):
+                    json_set_raw(pipe, key, document)
+            await pipe.execute()
+    elapsed = perf_counter() - start
+    print(f"{name:>6}: {elapsed / n * 1e6:8.2f} us/frame written")
+    await conn.delete(svc.model.make_primary_key(svc.symbol))
+    await conn.close()
+
+
+def main(n: int, redis_url: Optional[str]) -> None:
+    svc = DepthSvc(symbol="BENCHSYMBOL")
+    model = bench_cpu("model", model_path, svc, n)
+    raw = bench_cpu("raw", raw_path, svc, n)
+    print(f"raw ingest is {model / raw:.1f}x faster")
+
+    if redis_url:
+        asyncio.run(bench_redis("model", model_path, svc, n, redis_url))
+        asyncio.run(bench_redis("raw", raw_path, svc, n, redis_url))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest path benchmark")
+    parser.add_argument("-n", type=int, default=20000, help="Frames")
+    parser.add_argument(
+        "--redis-url",
+        type=str,
+        default=None,
+        help="Also write frames to this Redis (needs RedisJSON)",
+    )
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,93 @@
+"""Compare websocket receive throughput of both socket transports
+
+Usage:
+    python -m tria_bot.benchmarks.websocket [-n 20000]
+
+A local aiohttp server pushes `n` combined-stream depth frames as fast as
+possible and every stack receives and decodes all of them. The
+`binance+sleep` stack adds the per-message sleep of the former loop.
+"""
+import asyncio
+from time import perf_counter
+from typing import Awaitable, Callable
+import orjson
+from aiohttp import ClientSession, web
+from binance.streams import ReconnectingWebsocket
+from tria_bot.clients.websocket import AsyncWebsocket
+
+
+HOST = "127.0.0.1"
+FRAME = orjson.dumps(
+    {
+        "stream": "ethbtc@depth5@100ms",
+        "data": {
+            "lastUpdateId": 41276198831,
+            "bids": [["0.05193000", "12.37210000"]] * 5,
+            "asks": [["0.05194000", "7.95470000"]] * 5,
+        },
+    }
+).decode()
+
+
+async def start_server(n: int) -> web.AppRunner:
+    async def handler(request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        for _ in range(n):
+            await ws.send_str(FRAME)
+        await ws.receive()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws/bench", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, 0).start()
+    return runner
+
+
+async def aiohttp_stack(url: str, n: int, sleep: bool) -> None:
+    async with ClientSession() as session:
+        async with AsyncWebsocket(url=f"{url}ws/bench", session=session) as ws:
+            for _ in range(n):
+                await ws.recv()
+                if sleep:
+                    await asyncio.sleep(0)
+
+
+async def binance_stack(url: str, n: int, sleep: bool) -> None:
+    ReconnectingWebsocket.MAX_QUEUE_SIZE = n + 1
+    async with ReconnectingWebsocket(url=url, path="bench") as ws:
+        for _ in range(n):
+            await ws.recv()
+            if sleep:
+                await asyncio.sleep(0.001)
+
+
+async def bench(
+    name: str,
+    stack: Callable[[str, int, bool], Awaitable[None]],
+    n: int,
+    sleep: bool = False,
+) -> None:
+    runner = await start_server(n)
+    port = runner.addresses[0][1]
+    start = perf_counter()
+    await stack(f"ws://{HOST}:{port}/", n, sleep)
+    elapsed = perf_counter() - start
+    print(f"{name:>14}: {n / elapsed:10.0f} msg/s")
+    await runner.cleanup()
+
+
+async def main(n: int) -> None:
+    await bench("aiohttp", aiohttp_stack, n, sleep=True)
+    await bench("binance", binance_stack, n)
+    await bench("binance+sleep", binance_stack, min(n, 2000), sleep=True)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Websocket benchmark")
+    parser.add_argument("-n", type=int, default=20000, help="Frames")
+    asyncio.run(main(**vars(parser.parse_args())))
@@ -0,0 +1,128 @@
+from time import time_ns
+from typing import Any, Iterable, Optional
+import orjson
+from aiohttp import ClientSession, WSMsgType
+
+
+class SocketClosedError(Exception):
+    ...
+
+
+class AsyncWebsocket:
+    """Thin websocket transport on aiohttp
+
+    Frames are decoded with orjson as soon as they are read, without
+    internal queues or extra sleeps. The local receive time of the last
+    frame is kept in `recv_time` (nanoseconds).
+    """
+
+    TIMEOUT = 60.0
+    HEARTBEAT = 20.0
+
+    def __init__(
+        self,
+        url: str,
+        session: ClientSession,
+        timeout: float = TIMEOUT,
+        heartbeat: float = HEARTBEAT,
+    ) -> None:
+        self.url = url
+        self.recv_time: int = 0
+        self._session = session
+        self._timeout = timeout
+        self._heartbeat = heartbeat
+        self._ws = None
+
+    async def __aenter__(self) -> "AsyncWebsocket":
+        self._ws = await self._session.ws_connect(
+            self.url,
+            heartbeat=self._heartbeat,
+            max_msg_size=0,
+        )
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Any] = None,
+        exc_val: Optional[Any] = None,
+        exc_tb: Optional[Any] = None,
+    ) -> None:
+        if self._ws != None:
+            await self._ws.close()
+            self._ws = None
+
+    async def recv_bytes(self) -> bytes:
+        """Receive the next raw frame
+
+        Raises:
+            SocketClosedError: If the connection was closed
+            asyncio.TimeoutError: If no frame is received in `timeout`
+
+        Returns:
+            bytes: Raw frame data
+        """
+        msg = await self._ws.receive(timeout=self._timeout)
+        if msg.type in (WSMsgType.TEXT, WSMsgType.BINARY):
+            self.recv_time = time_ns()
+            return msg.data
+        raise SocketClosedError(f"{self.url} closed ({msg.type.name})")
+
+    async def recv(self) -> Any:
+        return orjson.loads(await self.recv_bytes())
+
+    async def send(self, data: Any) -> None:
+        """Send a JSON message (e.g. combined-stream SUBSCRIBE)"""
+        await self._ws.send_str(orjson.dumps(data).decode())
+
+
+class SocketManager:
+    """Build Binance spot stream sockets sharing one aiohttp session
+
+    Exposes the subset of `binance.BinanceSocketManager` used by the
+    socket services, so both can be swapped.
+    """
+
+    STREAM_URL = "wss://stream.binance.{}:9443/"
+
+    WEBSOCKET_DEPTH_5 = "5"
+    WEBSOCKET_DEPTH_10 = "10"
+    WEBSOCKET_DEPTH_20 = "20"
+
+    def __init__(
+        self,
+        tld: str = "com",
+        session: Optional[ClientSession] = None,
+    ) -> None:
+        self.STREAM_URL = self.STREAM_URL.format(tld)
+        self._session = session or ClientSession()
+
+    async def close(self) -> None:
+        await self._session.close()
+
+    def _get_socket(self, path: str, prefix: str = "ws/") -> AsyncWebsocket:
+        return AsyncWebsocket(
+            url=f"{self.STREAM_URL}{prefix}{path}",
+            session=self._session,
+        )
+
+    def depth_socket(
+        self,
+        symbol: str,
+        depth: Optional[str] = None,
+        interval: Optional[int] = None,
+    ) -> AsyncWebsocket:
+        socket_name = f"{symbol.lower()}@depth"
+        if depth and depth != "1":
+            socket_name = f"{socket_name}{depth}"
+        if interval:
+            socket_name = f"{socket_name}@{interval}ms"
+        return self._get_socket(socket_name)
+
+    def ticker_socket(self) -> AsyncWebsocket:
+        return self._get_socket("!ticker@arr")
+
+    def multiplex_socket(self, streams: Iterable[str]) -> AsyncWebsocket:
+        return self._get_socket(
+            f"streams={'/'.join(streams)}",
+            prefix="stream?",
+        )
@@ -18,14 +18,100 @@ class Settings(BaseSettings):
     PUBSUB_PROFFIT_CHANNEL: str = "proffit-detection"
     PUBSUB_MULTI_PROFFIT_CHANNEL: str = "multi-proffit-detection"
     PUBSUB_GAPS_CHANNEL: str = "gaps-detection"
+    PUBSUB_DEPTH_UPDATES_CHANNEL: str = "depth-updates"
+    PUBSUB_CYCLES_CHANNEL: str = "cycles-detection"
+    PUBSUB_CACHE_INVALIDATION_CHANNEL: str = "cache-invalidation"
     #PUBSUB_GAPS_CHANNEL: str = "gaps-calc"
 
+    # socket transport: "aiohttp" (orjson) or "binance" (python-binance)
+    SOCKET_TRANSPORT: str = "aiohttp"
+
+    # keep only the latest pending socket update by symbol
+    SOCKET_CONFLATE: bool = True
+    SOCKET_CONFLATE_MAXSIZE: int = 1000
+
+    # batched socket writes (delay in seconds, 0 = next loop tick)
+    BATCH_WRITES: bool = True
+    BATCH_WRITE_MAX_DELAY: float = 0.0
+    BATCH_WRITE_MAX_RECORDS: int = 100
+    BATCH_WRITE_STATS_INTERVAL: float = 60.0
+    # write socket data as prebuilt JSON, skipping model validation
+    RAW_INGEST: bool = False
+
+    # socket reconnects (Binance allows 300 connections by 5 min by IP)
+    SOCKET_CONNECTIONS_LIMIT: int = 300
+    SOCKET_CONNECTIONS_PERIOD: float = 300.0
+    SOCKET_RECONNECT_BASE_DELAY: float = 0.5
+    SOCKET_RECONNECT_MAX_DELAY: float = 60.0
+    SOCKET_CONNECT_JITTER: float = 1.0
+    SOCKET_HEALTH_INTERVAL: float = 60.0
+
+    # connection pool size by Redis role (see crud/connections.py) and
+    # max wait (seconds) for a free connection
+    REDIS_DATA_MAX_CONNECTIONS: int = 50
+    REDIS_OM_MAX_CONNECTIONS: int = 20
+    REDIS_PUB_SUB_MAX_CONNECTIONS: int = 20
+    REDIS_POOL_TIMEOUT: float = 20.0
+
+    # crud waits: keyspace notification flags waking waiters when the
+    # server has any of them (JSON.SET is a module event "d", a generic one
+    # "g" on older RedisJSON; () = only poll), add the first ones to the
+    # server config (CONFIG SET, opt-in) and polling interval (seconds)
+    CRUD_WAIT_KEYSPACE_EVENTS: Tuple[str, ...] = ("Kd", "Kg")
+    CRUD_WAIT_CONFIG_SET: bool = False
+    CRUD_WAIT_POLL_INTERVAL: float = 1.0
+    # keep Symbol, ValidSymbols and TopVolumeAssets rows in process memory
+    CRUD_CACHE: bool = True
+
     # services
     COMPOSITE_LOOP_INTERVAL: float = 60.0
     GAP_MIN: float = 2.0
     PROFFIT_PERCENT_FORMAT: bool = True
     MIN_PROFFIT_DETECT: float = .3  # percent
     PROFFIT_INDEX: int = 0
+    # evaluate all triangles at once with numpy (see helpers/kernel.py)
+    PROFFIT_VECTORIZED: bool = True
+    # re-evaluate only triangles of updated depths (max evaluations by sec)
+    PROFFIT_EVENT_DRIVEN: bool = False
+    PROFFIT_MAX_EVAL_RATE: float = 20.0
+    # seconds between checks of shard worker processes (--workers)
+    PROFFIT_WORKERS_CHECK_INTERVAL: float = 5.0
+    # event mode: evaluate only triangles crossing a leg break-even price
+    PROFFIT_BREAK_EVEN: bool = True
+    # publish the stable input filled by current depths with proffits
+    # (arbitrage skips proffits sized 0 and caps its input at the size)
+    PROFFIT_DEPTH_SIZE: bool = True
+    # skip triangles with a leg book older than this (seconds, by leg:
+    # alt/stable, alt/strong, strong/stable; 0 = no limit). Books of live
+    # sockets are kept fresh by depth services (DEPTH_REFRESH_INTERVAL)
+    PROFFIT_MAX_LEG_AGES: Tuple[float, float, float] = (5.0, 5.0, 5.0)
+    PROFFIT_STALE_REPORT_INTERVAL: float = 60.0
+    # evaluate triangles inside Redis (Lua script), triangles by call
+    PROFFIT_SERVER_SIDE: bool = False
+    PROFFIT_SCRIPT_BATCH: int = 500
+    # max legs of cycles over every valid symbol (see helpers/graph.py)
+    CYCLES_MAX_LENGTH: int = 4
+    # symbols per combined-stream socket (1 = one socket by symbol)
+    DEPTH_SYMBOLS_PER_SOCKET: int = 50
+    # diff-depth books
+    DEPTH_SNAPSHOT_LIMIT: int = 1000
+    DEPTH_EXPORT_LEVELS: int = 20
+    # failed snapshots are retried with exponential backoff (seconds), a
+    # longer Retry-After (429/418 responses) is honoured
+    DEPTH_SNAPSHOT_RETRY_BASE_DELAY: float = 1.0
+    DEPTH_SNAPSHOT_RETRY_MAX_DELAY: float = 60.0
+    # publish updated depth symbols (event driven proffits)
+    DEPTH_PUBLISH_UPDATES: bool = True
+    # while their socket is connected, books not stored for this long get
+    # a new event_time (seconds, 0 = off), so quiet live books are not
+    # skipped as stale (see PROFFIT_MAX_LEG_AGES)
+    DEPTH_REFRESH_INTERVAL: float = 1.0
+    # adaptive depth tiers: recently active symbols get the hot stream
+    DEPTH_HOT_STREAM: str = "{symbol}@depth20@100ms"
+    DEPTH_COLD_STREAM: str = "{symbol}@depth5@1000ms"
+    DEPTH_HOT_WINDOW: float = 300.0
+    DEPTH_HOT_PROFFIT_MARGIN: float = .2  # percent below MIN_PROFFIT_DETECT
+    DEPTH_TIER_INTERVAL: float = 30.0
 
     class Config:
         extra = "ignore"
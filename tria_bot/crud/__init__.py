@@ -1,6 +1,11 @@
+from .activity import SymbolActivityCRUD
 from .base import CRUDBase
+from .batch import BatchWriter
+from .cache import ModelCache, model_cache
+from .connections import ConnectionManager
 from .composite import SymbolsCRUD, ValidSymbolsCRUD, TopVolumeAssetsCRUD
 from .depths import DepthsCRUD
 from .gaps import GapsCRUD
 from .proffits import ProffitsCRUD
-from .tickers import TickersCRUD
\ No newline at end of file
+from .tickers import TickersCRUD
+from .triangles import TriangleScript
\ No newline at end of file
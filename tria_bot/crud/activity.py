@@ -0,0 +1,65 @@
+from time import time
+from typing import Any, Iterable, Optional, Set
+from aredis_om.connections import redis
+from tria_bot.conf import settings
+from tria_bot.crud.connections import OM, ConnectionManager
+
+
+class SymbolActivityCRUD:
+    """Last opportunity activity time by symbol
+
+    Symbols of triangles with near threshold proffits or valid gaps are
+    marked in a Redis sorted set scored by time, so depth services can
+    spend fast and deep streams only on recently active symbols.
+    """
+
+    key = "tria_bot:SymbolActivity"
+
+    def __init__(
+        self,
+        conn: Optional[redis.Redis] = None,
+        window: float = settings.DEPTH_HOT_WINDOW,
+    ) -> None:
+        self._conn = conn
+        if self._conn == None:
+            self._conn = ConnectionManager.shared().get(OM)
+        self.window = window
+
+    async def __aenter__(self) -> "SymbolActivityCRUD":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Any] = None,
+        exc_val: Optional[Any] = None,
+        exc_tb: Optional[Any] = None,
+    ) -> None:
+        if self._conn != None:
+            await self._conn.close()
+
+    async def mark(self, symbols: Iterable[str]) -> None:
+        """Set symbols last activity to now, dropping expired ones
+
+        Args:
+            symbols (Iterable[str]): Active symbols
+        """
+        now = time()
+        mapping = {symbol: now for symbol in symbols}
+        if not mapping:
+            return
+
+        async with self._conn.pipeline(transaction=False) as pipe:
+            pipe.zadd(self.key, mapping)
+            pipe.zremrangebyscore(self.key, 0, now - self.window)
+            await pipe.execute()
+
+    async def hot(self) -> Set[str]:
+        """Get symbols with activity in the last `window` seconds
+
+        Returns:
+            Set[str]: Active symbols
+        """
+        symbols = await self._conn.zrangebyscore(
+            self.key, time() - self.window, "+inf"
+        )
+        return {s.decode() if isinstance(s, bytes) else s for s in symbols}
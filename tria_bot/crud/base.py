@@ -1,19 +1,26 @@
 import asyncio
+import time
 from abc import ABC, abstractproperty
 from typing import (
     Any,
     AsyncGenerator,
+    Dict,
     Generic,
+    List,
     Optional,
     Sequence,
+    Tuple,
     Type,
     TypeVar,
 )
 
 # from tria_bot.models.base import HashModelBase
-from aredis_om import RedisModel, get_redis_connection, NotFoundError
+from aredis_om import RedisModel
 from aredis_om.connections import redis
 from pydantic import BaseModel
+from tria_bot.conf import settings
+from tria_bot.crud.cache import ModelCache, model_cache
+from tria_bot.crud.connections import OM, ConnectionManager
 
 ModelType = TypeVar("ModelType", bound=RedisModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
@@ -21,6 +28,21 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType], ABC):
+    # `wait_for` wakes on keyspace notifications and polls as fallback
+    wait_keyspace_events = settings.CRUD_WAIT_KEYSPACE_EVENTS
+    wait_config_set = settings.CRUD_WAIT_CONFIG_SET
+    wait_poll_interval = settings.CRUD_WAIT_POLL_INTERVAL
+    # notifications of every server, checked (and enabled) once by process
+    _keyspace_notify: Dict[Tuple[Any, ...], bool] = {}
+    # rows read from process memory (see `ModelCache`), for models only
+    # written by `CompositeSvc`; writes always publish invalidations
+    cacheable: bool = False
+    use_cache = settings.CRUD_CACHE
+    cache: ModelCache = model_cache
+
+    # connection role used without a given connection
+    role: str = OM
+
     @abstractproperty
     def model(self) -> Type[ModelType]:
         ...
@@ -29,7 +51,7 @@ class CRUDBase(Generic[ModelType], ABC):
         super().__init__()
         self._conn = conn
         if self._conn == None:
-            self._conn = get_redis_connection()
+            self._conn = ConnectionManager.shared().get(self.role)
 
         self.model.Meta.database = self._conn
         self.model._meta.database = self._conn
@@ -46,8 +68,15 @@ class CRUDBase(Generic[ModelType], ABC):
         if self._conn != None:
             await self._conn.close()
 
+    @property
+    def _caching(self) -> bool:
+        return self.cacheable and self.use_cache
+
     async def save(self, obj: ModelType):
-        return await obj.save()
+        obj = await obj.save()
+        if self.cacheable:
+            await self.cache.publish(self._conn, [obj.key()])
+        return obj
 
     async def get(self, pk: Any) -> Optional[ModelType]:
         """Get row from model by uid
@@ -59,14 +88,189 @@ class CRUDBase(Generic[ModelType], ABC):
         Returns:
             Optional[ModelType]: ModelType instance or None if id not exists
         """
-        return await self.model.get(pk=pk)
+        if not self._caching:
+            return await self.model.get(pk=pk)
 
-    async def wait_for(self, pk: Any) -> ModelType:
-        try:
-            return await self.get(pk=pk)
-        except NotFoundError:
-            await asyncio.sleep(1.0)
-            return await self.wait_for(pk=pk)
+        key = self.model.make_primary_key(pk)
+        obj = self.cache.get(key)
+        if obj is None:
+            generation = self.cache.watch(self._conn)
+            obj = await self.model.get(pk=pk)
+            self.cache.put(key, obj, generation)
+        # callers may change their instances
+        return obj.copy(deep=True)
+
+    async def get_documents(
+        self,
+        pks: Sequence[Any],
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Get many rows as raw JSON documents in one round trip (JSON.MGET)
+
+        Args:
+            pks (Sequence[Any]): Primary keys
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: Documents in `pks` order, None
+                if a row not exists
+        """
+        if not pks:
+            return []
+        keys = [self.model.make_primary_key(pk) for pk in pks]
+        return await self._conn.json().mget(keys, ".")
+
+    async def get_many(self, pks: Sequence[Any]) -> List[Optional[ModelType]]:
+        """Get many rows in one round trip
+
+        Args:
+            pks (Sequence[Any]): Primary keys
+
+        Returns:
+            List[Optional[ModelType]]: ModelType instances in `pks` order,
+                None if a row not exists (instead of NotFoundError)
+        """
+        if not self._caching:
+            return [
+                self.model.parse_obj(d) if d is not None else None
+                for d in await self.get_documents(pks)
+            ]
+
+        keys = [self.model.make_primary_key(pk) for pk in pks]
+        objs = [self.cache.get(key) for key in keys]
+        missing = [i for i, obj in enumerate(objs) if obj is None]
+        if missing:
+            generation = self.cache.watch(self._conn)
+            documents = await self.get_documents([pks[i] for i in missing])
+            for i, document in zip(missing, documents):
+                if document is not None:
+                    objs[i] = self.model.parse_obj(document)
+                    self.cache.put(keys[i], objs[i], generation)
+        return [o.copy(deep=True) if o is not None else None for o in objs]
+
+    async def wait_for(
+        self,
+        pk: Any,
+        timeout: Optional[float] = None,
+    ) -> ModelType:
+        """Wait until a row exists (see `wait_for_all`)
+
+        Args:
+            pk (Any): Primary key
+            timeout (Optional[float], optional): Max seconds to wait.
+                Defaults to None (no limit).
+
+        Raises:
+            asyncio.TimeoutError: If row not exists after `timeout`
+
+        Returns:
+            ModelType: ModelType instance
+        """
+        models = await self.wait_for_all(pks=[pk], timeout=timeout)
+        return models[0]
+
+    async def wait_for_all(
+        self,
+        pks: Sequence[Any],
+        timeout: Optional[float] = None,
+    ) -> List[ModelType]:
+        """Wait until every row exists
+
+        Missing rows are read again as soon as a keyspace notification of
+        the model keys arrives, and every `wait_poll_interval` seconds
+        anyway, so waits also work without server notifications.
+
+        Args:
+            pks (Sequence[Any]): Primary keys
+            timeout (Optional[float], optional): Max seconds to wait.
+                Defaults to None (no limit).
+
+        Raises:
+            asyncio.TimeoutError: If any row not exists after `timeout`
+
+        Returns:
+            List[ModelType]: ModelType instances in `pks` order
+        """
+        pks = list(pks)
+        found: Dict[int, ModelType] = {}
+        deadline = None if timeout is None else time.monotonic() + timeout
+        notify = await self._enable_keyspace_events()
+        async with self._conn.pubsub(ignore_subscribe_messages=True) as ps:
+            # subscribed before reading, so no write is missed
+            if notify:
+                await ps.psubscribe(self._keyspace_pattern())
+            while True:
+                missing = [i for i in range(len(pks)) if i not in found]
+                models = await self.get_many([pks[i] for i in missing])
+                for i, obj in zip(missing, models):
+                    if obj is not None:
+                        found[i] = obj
+                if len(found) == len(pks):
+                    return [found[i] for i in range(len(pks))]
+
+                wait = self.wait_poll_interval
+                if deadline is not None:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        raise asyncio.TimeoutError(
+                            f"{len(pks) - len(found)} {self.model.__name__} "
+                            f"rows not found after {timeout} seconds"
+                        )
+                    wait = min(wait, left)
+                if not notify:
+                    await asyncio.sleep(wait)
+                elif await ps.get_message(timeout=wait) is not None:
+                    # merge a burst of writes in one read
+                    while await ps.get_message(timeout=0.0) is not None:
+                        pass
+
+    def _keyspace_pattern(self) -> str:
+        db = self._conn.connection_pool.connection_kwargs.get("db", 0)
+        prefix = self.model.make_key(
+            self.model._meta.primary_key_pattern.format(pk="")
+        )
+        return f"__keyspace@{db}__:{prefix}*"
+
+    def _server(self) -> Tuple[Any, ...]:
+        kwargs = self._conn.connection_pool.connection_kwargs
+        return tuple(kwargs.get(k, None) for k in ("host", "port", "path"))
+
+    async def _enable_keyspace_events(self) -> bool:
+        """Check the server has one of the `wait_keyspace_events` flag
+        sets, adding the first one if `wait_config_set`
+
+        Returns:
+            bool: False if disabled, or if the server lacks every flag set
+                and they can't be added
+        """
+        server = self._server()
+        notify = CRUDBase._keyspace_notify.get(server, None)
+        if notify is not None:
+            return notify
+
+        notify = False
+        if self.wait_keyspace_events:
+            try:
+                config = await self._conn.config_get("notify-keyspace-events")
+                current = config.get("notify-keyspace-events", "")
+                # "A" is the alias of every key type flag
+                flags = current.replace("A", "g$lshzxetd")
+                notify = any(
+                    all(f in flags for f in events)
+                    for events in self.wait_keyspace_events
+                )
+                if not notify and self.wait_config_set:
+                    missing = "".join(
+                        f for f in self.wait_keyspace_events[0]
+                        if f not in flags
+                    )
+                    await self._conn.config_set(
+                        "notify-keyspace-events", current + missing
+                    )
+                    notify = True
+            except redis.RedisError:
+                # e.g. CONFIG disabled on managed servers, only polls
+                pass
+        CRUDBase._keyspace_notify[server] = notify
+        return notify
 
     async def all_pks(self) -> AsyncGenerator[Any, None]:
         # ag = await self.model.all_pks()
@@ -74,8 +278,73 @@ class CRUDBase(Generic[ModelType], ABC):
             yield pk
 
     async def get_all(self) -> AsyncGenerator[ModelType, None]:
-        async for pk in self.all_pks():
-            yield await self.get(pk=pk)
+        async for batch in self.iter_batches():
+            for obj in batch:
+                yield obj
+
+    async def _scan_pks(self, count: int) -> AsyncGenerator[Any, None]:
+        # same keys as `model.all_pks`, with a SCAN count hint
+        prefix = self.model.make_key(
+            self.model._meta.primary_key_pattern.format(pk="")
+        )
+        async for key in self._conn.scan_iter(
+            match=f"{prefix}*", count=count, _type="ReJSON-RL"
+        ):
+            if isinstance(key, bytes):
+                key = key.decode(self.model.Meta.encoding)
+            yield key[len(prefix) :]
+
+    async def iter_batches(
+        self,
+        batch_size: int = 500,
+        prefetch: int = 1,
+    ) -> AsyncGenerator[List[ModelType], None]:
+        """Walk every row in batches, each read in one round trip
+
+        Primary keys are SCANned and every batch is read with `get_many`,
+        up to `prefetch` batches ahead while the caller consumes the
+        current one. Rows deleted during the scan are skipped.
+
+        Args:
+            batch_size (int, optional): Rows by batch. Defaults to 500.
+            prefetch (int, optional): Batches read ahead. Defaults to 1.
+
+        Yields:
+            List[ModelType]: ModelType instances
+        """
+        batches: asyncio.Queue = asyncio.Queue(maxsize=max(prefetch, 1))
+
+        async def read() -> None:
+            try:
+                pks = []
+                async for pk in self._scan_pks(count=batch_size):
+                    pks.append(pk)
+                    if len(pks) >= batch_size:
+                        await batches.put(await self.get_many(pks))
+                        pks = []
+                if pks:
+                    await batches.put(await self.get_many(pks))
+            except Exception as error:
+                # raised to the caller
+                await batches.put(error)
+                return
+            await batches.put(None)
+
+        reader = asyncio.create_task(read())
+        try:
+            while True:
+                batch = await batches.get()
+                if batch is None:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                yield [obj for obj in batch if obj is not None]
+        finally:
+            if not reader.done():
+                reader.cancel()
 
     async def add(self, models: Sequence[ModelType]) -> Sequence[ModelType]:
-        return await self.model.add(models=models)
+        models = await self.model.add(models=models)
+        if self.cacheable:
+            await self.cache.publish(self._conn, [m.key() for m in models])
+        return models
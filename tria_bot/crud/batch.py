@@ -0,0 +1,302 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
+from uuid import uuid1
+
+import orjson
+from aredis_om import RedisModel, get_redis_connection
+from aredis_om.connections import redis
+from tria_bot.conf import settings
+from tria_bot.helpers.utils import create_logger
+
+
+RawRecord = Tuple[str, bytes]
+
+
+def json_set_raw(pipe: redis.client.Pipeline, key: str, document: bytes):
+    """Queue a prebuilt JSON document as the root of `key`
+
+    Args:
+        pipe (redis.client.Pipeline): Redis pipeline
+        key (str): Redis key
+        document (bytes): Serialized JSON document
+
+    Returns:
+        redis.client.Pipeline: Pipeline with the queued command
+    """
+    return pipe.execute_command("JSON.SET", key, "$", document)
+
+
+def record_pk(record: Union[RedisModel, RawRecord]) -> str:
+    """Primary key of a model or a raw (key, document) record"""
+    if isinstance(record, tuple):
+        return record[0].rsplit(":", 1)[-1]
+    return record.pk
+
+
+def publish_updates(
+    pipe: redis.client.Pipeline,
+    channel: str,
+    pks: Set[str],
+):
+    """Queue the publication of updated primary keys
+
+    Args:
+        pipe (redis.client.Pipeline): Redis pipeline, after the writes
+        channel (str): Pub/sub channel
+        pks (Set[str]): Updated primary keys
+
+    Returns:
+        redis.client.Pipeline: Pipeline with the queued command
+    """
+    return pipe.publish(channel, orjson.dumps(sorted(pks)))
+
+
+class BatchStats:
+    """Flush counters of a `BatchWriter`"""
+
+    __slots__ = (
+        "flushes",
+        "records",
+        "last_batch_size",
+        "max_batch_size",
+        "total_latency",
+        "last_latency",
+        "max_latency",
+    )
+
+    def __init__(self) -> None:
+        self.flushes = 0
+        self.records = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.total_latency = 0.0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    def add(self, size: int, latency: float) -> None:
+        self.flushes += 1
+        self.records += size
+        self.last_batch_size = size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.total_latency += latency
+        self.last_latency = latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def as_dict(self) -> Dict[str, Any]:
+        flushes = self.flushes or 1
+        return {
+            "flushes": self.flushes,
+            "records": self.records,
+            "avg_batch_size": round(self.records / flushes, 2),
+            "max_batch_size": self.max_batch_size,
+            "avg_flush_ms": round(self.total_latency / flushes * 1000, 3),
+            "last_flush_ms": round(self.last_latency * 1000, 3),
+            "max_flush_ms": round(self.max_latency * 1000, 3),
+        }
+
+
+class BatchWriter:
+    """Process wide write batching for Redis models
+
+    Models added from every socket of the process are saved together in
+    one pipeline. A batch is flushed when it reaches `max_records` or
+    when `max_delay` seconds elapsed since its first record, whichever
+    comes first. A `max_delay` of zero flushes on the next loop tick.
+
+    Updated primary keys are published after the writes, on the pub/sub
+    connection (in the same pipeline if it's the data one).
+    """
+
+    _shared: Dict[Tuple[Optional[str], Optional[str]], "BatchWriter"] = {}
+
+    def __init__(
+        self,
+        conn: Optional[redis.Redis] = None,
+        pubsub_conn: Optional[redis.Redis] = None,
+        max_delay: float = settings.BATCH_WRITE_MAX_DELAY,
+        max_records: int = settings.BATCH_WRITE_MAX_RECORDS,
+        stats_interval: float = settings.BATCH_WRITE_STATS_INTERVAL,
+    ) -> None:
+        self._conn = conn
+        if self._conn == None:
+            self._conn = get_redis_connection()
+        self._pubsub_conn = pubsub_conn
+        if self._pubsub_conn == None:
+            self._pubsub_conn = self._conn
+        self.max_delay = max_delay
+        self.max_records = max_records
+        self.stats_interval = stats_interval
+        self.stats = BatchStats()
+        self.logger = create_logger(f"{type(self).__name__}[{uuid1()}]")
+        self._records: List[Union[RedisModel, RawRecord]] = []
+        self._updates: Dict[str, Set[str]] = {}
+        self._handle: Optional[asyncio.Handle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._users = 0
+        self._urls = None
+        self._last_stats = perf_counter()
+
+    @classmethod
+    def shared(
+        cls,
+        url: Optional[str] = None,
+        pubsub_url: Optional[str] = None,
+    ) -> "BatchWriter":
+        """Get the process writer for a Redis url
+
+        Every call must be paired with a `release` call.
+
+        Args:
+            url (Optional[str], optional): Redis url. Defaults to None.
+            pubsub_url (Optional[str], optional): Redis url to publish
+                updates to. Defaults to None (`url`).
+
+        Returns:
+            BatchWriter: Shared writer instance
+        """
+        urls = (url, pubsub_url or url)
+        writer = cls._shared.get(urls, None)
+        if writer is None:
+            conn = get_redis_connection(url=url)
+            pubsub_conn = None
+            if urls[1] != url:
+                pubsub_conn = get_redis_connection(url=urls[1])
+            writer = cls(conn=conn, pubsub_conn=pubsub_conn)
+            writer._urls = urls
+            cls._shared[urls] = writer
+        writer._users += 1
+        return writer
+
+    async def release(self) -> None:
+        """Release a shared writer, flushing and closing it if unused"""
+        self._users -= 1
+        if self._users > 0:
+            return
+
+        # no timer flush may run after the connection is closed
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        task, self._flush_task = self._flush_task, None
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+        self.logger.info(f"Batch write stats: {self.stats.as_dict()}")
+        if self._shared.get(self._urls, None) is self:
+            del self._shared[self._urls]
+        await self._conn.close()
+        if self._pubsub_conn is not self._conn:
+            await self._pubsub_conn.close()
+
+    def _schedule(self) -> None:
+        if self._handle is not None:
+            return
+
+        def create_flush():
+            self._handle = None
+            self._flush_task = asyncio.create_task(self.flush())
+
+        loop = asyncio.get_running_loop()
+        if self.max_delay > 0:
+            self._handle = loop.call_later(self.max_delay, create_flush)
+        else:
+            self._handle = loop.call_soon(create_flush)
+
+    async def add(
+        self,
+        models: Sequence[RedisModel],
+        channel: Optional[str] = None,
+    ) -> Sequence[RedisModel]:
+        """Queue models to be saved in the next batch
+
+        Args:
+            models (Sequence[RedisModel]): Models to save
+            channel (Optional[str], optional): Channel to publish updated
+                primary keys to, after the batch is saved. Defaults to None.
+
+        Returns:
+            Sequence[RedisModel]: Queued models
+        """
+        return await self._add(records=models, channel=channel)
+
+    async def add_raw(
+        self,
+        records: Sequence[RawRecord],
+        channel: Optional[str] = None,
+    ) -> Sequence[RawRecord]:
+        """Queue prebuilt (key, JSON document) records for the next batch
+
+        Args:
+            records (Sequence[RawRecord]): Records to save
+            channel (Optional[str], optional): Channel to publish updated
+                primary keys to, after the batch is saved. Defaults to None.
+
+        Returns:
+            Sequence[RawRecord]: Queued records
+        """
+        return await self._add(records=records, channel=channel)
+
+    async def _add(
+        self,
+        records: Sequence[Any],
+        channel: Optional[str] = None,
+    ) -> Sequence[Any]:
+        if channel is not None:
+            self._updates.setdefault(channel, set()).update(
+                record_pk(record) for record in records
+            )
+        self._records.extend(records)
+        if len(self._records) >= self.max_records:
+            await self.flush()
+        elif self._records:
+            self._schedule()
+        return records
+
+    async def flush(self) -> None:
+        """Save every queued record in one pipeline"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if not self._records:
+            return
+
+        records, self._records = self._records, []
+        updates, self._updates = self._updates, {}
+        # keep flush order, a late batch must never overwrite a newer one
+        async with self._lock:
+            start = perf_counter()
+            try:
+                async with self._conn.pipeline(transaction=False) as pipe:
+                    for record in records:
+                        if isinstance(record, tuple):
+                            json_set_raw(pipe, *record)
+                        else:
+                            await record.save(pipeline=pipe)
+                    if self._pubsub_conn is self._conn:
+                        self._publish(pipe, updates)
+                        updates = {}
+                    await pipe.execute()
+                if updates:
+                    pubsub_conn = self._pubsub_conn
+                    async with pubsub_conn.pipeline(transaction=False) as pipe:
+                        self._publish(pipe, updates)
+                        await pipe.execute()
+            except Exception as err:
+                self.logger.error(f"Error flushing {len(records)} records: {err}")
+                return
+            end = perf_counter()
+            self.stats.add(size=len(records), latency=end - start)
+
+        if self.stats_interval and end - self._last_stats >= self.stats_interval:
+            self._last_stats = end
+            self.logger.info(f"Batch write stats: {self.stats.as_dict()}")
+
+    @staticmethod
+    def _publish(
+        pipe: redis.client.Pipeline,
+        updates: Dict[str, Set[str]],
+    ) -> None:
+        for channel, pks in updates.items():
+            publish_updates(pipe, channel, pks)
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Any, Dict, Iterable, Optional
+import orjson
+from aredis_om.connections import redis
+from tria_bot.conf import settings
+
+
+class ModelCache:
+    """Process memory copies of slow-changing rows, by key
+
+    Rows are kept until an invalidation arrives on `channel`: a JSON list
+    of keys, or an empty list for every key. Writes of cacheable CRUDs
+    publish them (see `CRUDBase.save`), so the writer (`CompositeSvc`)
+    invalidates every process.
+
+    Rows are only kept while the invalidation listener is subscribed, and
+    a read only fills the cache if no invalidation arrived since it
+    started (`generation`), so a missed message can't leave stale rows.
+    """
+
+    channel = settings.PUBSUB_CACHE_INVALIDATION_CHANNEL
+
+    def __init__(self) -> None:
+        self._rows: Dict[str, Any] = {}
+        self._generation = 0
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached row (counting hits and misses)
+
+        Args:
+            key (str): Row key
+
+        Returns:
+            Optional[Any]: Row, None if not cached
+        """
+        row = self._rows.get(key, None)
+        if row is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return row
+
+    def watch(self, conn: redis.Redis) -> int:
+        """Start the invalidation listener if not running
+
+        Args:
+            conn (redis.Redis): Connection to subscribe with
+
+        Returns:
+            int: Current generation, to `put` rows read from now on
+        """
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen(conn))
+        return self._generation
+
+    def put(self, key: str, row: Any, generation: int) -> None:
+        """Keep a row read since `generation`, if still valid"""
+        if self._subscribed and generation == self._generation:
+            self._rows[key] = row
+
+    def invalidate(self, keys: Optional[Iterable[str]] = None) -> None:
+        """Drop some rows (every row if `keys` is None)"""
+        self._generation += 1
+        if keys is None:
+            self._rows.clear()
+            return
+        for key in keys:
+            self._rows.pop(key, None)
+
+    async def publish(self, conn: redis.Redis, keys: Iterable[str]) -> None:
+        """Invalidate rows in this and every other process
+
+        Args:
+            conn (redis.Redis): Connection to publish with
+            keys (Iterable[str]): Written row keys
+        """
+        keys = list(keys)
+        self.invalidate(keys)
+        await conn.publish(self.channel, orjson.dumps(keys))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "rows": len(self)}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def _listen(self, conn: redis.Redis) -> None:
+        try:
+            async with conn.pubsub(ignore_subscribe_messages=True) as ps:
+                await ps.subscribe(self.channel)
+                # rows read before subscribing may be already stale
+                self.invalidate()
+                self._subscribed = True
+                async for msg in ps.listen():
+                    if msg != None:
+                        self.invalidate(orjson.loads(msg["data"]) or None)
+        except (redis.RedisError, OSError):
+            # e.g. connection closed by its service, restarted by `watch`
+            pass
+        finally:
+            self._subscribed = False
+            self.invalidate()
+
+
+model_cache = ModelCache()
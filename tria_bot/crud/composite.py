@@ -4,12 +4,15 @@ from tria_bot.models.composite import Symbol, TopVolumeAssets, ValidSymbols
 
 class TopVolumeAssetsCRUD(CRUDBase[TopVolumeAssets]):
     model = TopVolumeAssets
+    cacheable = True
 
 
 
 class SymbolsCRUD(CRUDBase[Symbol]):
     model = Symbol
+    cacheable = True
 
 
 class ValidSymbolsCRUD(CRUDBase[ValidSymbols]):
-    model = ValidSymbols
\ No newline at end of file
+    model = ValidSymbols
+    cacheable = True
\ No newline at end of file
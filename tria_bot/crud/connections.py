@@ -0,0 +1,107 @@
+import os
+from typing import Dict, Optional
+from aredis_om.connections import redis
+from tria_bot.conf import settings
+
+
+# traffic roles
+DATA, OM, PUBSUB = "data", "om", "pubsub"
+
+
+class ConnectionManager:
+    """Redis clients by traffic role, each one with its own pool
+
+    - `DATA`: depths and tickers reads and writes (latency critical)
+    - `OM`: models metadata, startup waits and every other command
+    - `PUBSUB`: subscriptions (each one holds a connection) and publishes
+
+    Roles may use different Redis servers (`REDIS_DATA_URL`, `REDIS_OM_URL`
+    and `REDIS_PUB_SUB_URL`, missing ones use the OM one). Pools are sized
+    by role and callers wait up to `pool_timeout` seconds for a connection
+    when all of them are in use, so a busy role never takes another role
+    connections.
+    """
+
+    url_envs = {
+        DATA: "REDIS_DATA_URL",
+        OM: "REDIS_OM_URL",
+        PUBSUB: "REDIS_PUB_SUB_URL",
+    }
+    max_connections = {
+        DATA: settings.REDIS_DATA_MAX_CONNECTIONS,
+        OM: settings.REDIS_OM_MAX_CONNECTIONS,
+        PUBSUB: settings.REDIS_PUB_SUB_MAX_CONNECTIONS,
+    }
+    pool_timeout = settings.REDIS_POOL_TIMEOUT
+
+    _shared: Optional["ConnectionManager"] = None
+
+    def __init__(
+        self,
+        urls: Optional[Dict[str, Optional[str]]] = None,
+    ) -> None:
+        """
+        Args:
+            urls (Optional[Dict[str, Optional[str]]], optional): Redis url
+                by role. Defaults to None (from environment).
+        """
+        urls = urls or {}
+        om_url = urls.get(OM, None) or os.environ.get(self.url_envs[OM])
+        self.urls: Dict[str, Optional[str]] = {
+            role: urls.get(role, None) or os.environ.get(env) or om_url
+            for role, env in self.url_envs.items()
+        }
+        self._clients: Dict[str, redis.Redis] = {}
+
+    @classmethod
+    def shared(cls) -> "ConnectionManager":
+        """Get the process manager (urls from environment), for clients
+        built without a connection"""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get(self, role: str) -> redis.Redis:
+        """Get the client of a role, building its pool on first use
+
+        Args:
+            role (str): `DATA`, `OM` or `PUBSUB`
+
+        Returns:
+            redis.Redis: Role client
+        """
+        client = self._clients.get(role, None)
+        if client is None:
+            # as `get_redis_connection`, decoded responses by default
+            kwargs = {
+                "decode_responses": True,
+                "max_connections": self.max_connections[role],
+                "timeout": self.pool_timeout,
+            }
+            url = self.urls[role]
+            if url:
+                pool = redis.BlockingConnectionPool.from_url(url, **kwargs)
+            else:
+                pool = redis.BlockingConnectionPool(**kwargs)
+            client = redis.Redis(connection_pool=pool)
+            self._clients[role] = client
+        return client
+
+    @property
+    def data(self) -> redis.Redis:
+        return self.get(DATA)
+
+    @property
+    def om(self) -> redis.Redis:
+        return self.get(OM)
+
+    @property
+    def pubsub(self) -> redis.Redis:
+        return self.get(PUBSUB)
+
+    async def close(self) -> None:
+        """Close every client and disconnect its pool"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.close()
+            await client.connection_pool.disconnect()
@@ -1,6 +1,43 @@
+from typing import Any, List, Optional, Sequence
+from aredis_om import NotFoundError
 from tria_bot.crud.base import CRUDBase
+from tria_bot.crud.connections import DATA
+from tria_bot.helpers.book import CompactBook
 from tria_bot.models.depth import Depth
 
 
 class DepthsCRUD(CRUDBase[Depth]):
     model = Depth
+    role = DATA
+
+    async def get_book(self, pk: Any) -> CompactBook:
+        """Get a depth as a numeric book, without model validation
+
+        Args:
+            pk (Any): Depth symbol
+
+        Raises:
+            NotFoundError: If depth not exists
+
+        Returns:
+            CompactBook: Parsed depth
+        """
+        document = await self._conn.json().get(self.model.make_primary_key(pk))
+        if document is None:
+            raise NotFoundError
+        return CompactBook.from_document(document)
+
+    async def get_books(self, pks: Sequence[Any]) -> List[Optional[CompactBook]]:
+        """Get many depths as numeric books in one round trip (JSON.MGET)
+
+        Args:
+            pks (Sequence[Any]): Depth symbols
+
+        Returns:
+            List[Optional[CompactBook]]: Books in `pks` order, None if a
+                depth not exists
+        """
+        return [
+            CompactBook.from_document(d) if d is not None else None
+            for d in await self.get_documents(pks)
+        ]
@@ -0,0 +1,210 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+from aredis_om.connections import redis
+from tria_bot.crud.connections import DATA, ConnectionManager
+from tria_bot.helpers.kernel import step_params
+from tria_bot.helpers.symbols import Triangle
+from tria_bot.models.depth import Depth
+
+
+# KEYS: step sizes hash, then alt/stable, alt/strong and strong/stable
+# depth keys of every triangle.
+# ARGV: fee mult, ammount, book level, min proffit, percent (1/0), now (ms)
+# and max age (seconds, 0 = no limit) by leg.
+# Replies candidate triangles (batch position, proffit and the three leg
+# prices) and the symbols of stale legs.
+TRIANGLES_LUA = """
+local fee = tonumber(ARGV[1])
+local ammount = tonumber(ARGV[2])
+local level = '[' .. ARGV[3] .. '][0]'
+local min_proffit = tonumber(ARGV[4])
+local percent = ARGV[5] == '1'
+local now = tonumber(ARGV[6])
+local max_ages = {tonumber(ARGV[7]), tonumber(ARGV[8]), tonumber(ARGV[9])}
+local sides = {'.bids', '.asks', '.asks'}
+
+local function symbol_of(key)
+  return string.match(key, '([^:]+)$')
+end
+
+-- best price (string) and event time of a leg, false if not readable
+local legs = {}
+local function leg(key, side)
+  local cache_key = key .. side
+  local cached = legs[cache_key]
+  if cached == nil then
+    cached = false
+    local raw = redis.pcall('JSON.GET', key, side .. level, '.event_time')
+    if type(raw) == 'string' then
+      local doc = cjson.decode(raw)
+      local price = doc[side .. level]
+      if type(price) == 'string' then
+        cached = {price, tonumber(doc['.event_time']) or 0}
+      end
+    end
+    legs[cache_key] = cached
+  end
+  return cached
+end
+
+-- step unit and scale of a symbol (see `step_params`)
+local steps = {}
+local function step(key)
+  local cached = steps[key]
+  if cached == nil then
+    cached = false
+    local raw = redis.call('HGET', KEYS[1], symbol_of(key))
+    if raw then
+      local unit, scale = string.match(raw, '^([^:]+):([^:]+)$')
+      cached = {tonumber(unit), tonumber(scale)}
+    end
+    steps[key] = cached
+  end
+  return cached
+end
+
+-- same float operations as `step_floor`
+local function floor_step(value, params)
+  local unit, scale = params[1], params[2]
+  local m = math.floor(value * scale / unit)
+  if (m + 1) * unit / scale <= value then
+    m = m + 1
+  elseif m * unit / scale > value then
+    m = m - 1
+  end
+  return m * unit / scale
+end
+
+local candidates, stale = {}, {}
+for t = 0, (#KEYS - 1) / 3 - 1 do
+  local keys = {KEYS[2 + 3 * t], KEYS[3 + 3 * t], KEYS[4 + 3 * t]}
+  local prices, fresh = {}, true
+  for i = 1, 3 do
+    local data = leg(keys[i], sides[i])
+    if not data then
+      prices = nil
+      break
+    end
+    prices[i] = data[1]
+    if max_ages[i] > 0 and now - data[2] > max_ages[i] * 1000 then
+      fresh = false
+      table.insert(stale, symbol_of(keys[i]))
+    end
+  end
+
+  local alt_step, strong_step = step(keys[2]), step(keys[3])
+  if prices and fresh and alt_step and strong_step then
+    -- same float operations as `ProffitSvc.calc_proffit`
+    local alt_qty = (ammount / tonumber(prices[1])) * fee
+    local strong_qty = floor_step(alt_qty, alt_step)
+      * tonumber(prices[2]) * fee
+    local stable_qty = floor_step(strong_qty, strong_step)
+      * tonumber(prices[3]) * fee
+    local proffit = stable_qty / ammount - 1
+    if percent then
+      proffit = proffit * 100
+    end
+    if proffit > min_proffit then
+      -- numbers are replied as integers, so floats go as strings
+      table.insert(candidates, t)
+      table.insert(candidates, string.format('%.17g', proffit))
+      table.insert(candidates, prices[1])
+      table.insert(candidates, prices[2])
+      table.insert(candidates, prices[3])
+    end
+  end
+end
+return {candidates, stale}
+"""
+
+
+class TriangleScript:
+    """Evaluate triangles inside Redis with a registered Lua script
+
+    Leg depths are read by the script (one EVALSHA by batch of triangles),
+    step sizes are pre-loaded in the `steps_key` hash. The script runs the
+    same float operations as `ProffitSvc.calc_proffit` on the same prices,
+    so results are equal; only rounding is left to the caller.
+    """
+
+    depth_model = Depth
+    steps_key = "tria_bot:StepSizes"
+
+    def __init__(self, conn: Optional[redis.Redis] = None) -> None:
+        self._conn = conn
+        if self._conn == None:
+            self._conn = ConnectionManager.shared().get(DATA)
+        # EVALSHA, loading the script again on NOSCRIPT errors
+        self._script = self._conn.register_script(TRIANGLES_LUA)
+
+    async def load_steps(self, step_sizes: Dict[str, float]) -> None:
+        """Replace the step sizes hash
+
+        Args:
+            step_sizes (Dict[str, float]): Step size by symbol
+        """
+        mapping = {}
+        for symbol, step_size in step_sizes.items():
+            unit, scale = step_params(step_size)
+            mapping[symbol] = f"{unit!r}:{scale!r}"
+        async with self._conn.pipeline(transaction=True) as pipe:
+            pipe.delete(self.steps_key)
+            if mapping:
+                pipe.hset(self.steps_key, mapping=mapping)
+            await pipe.execute()
+
+    async def evaluate(
+        self,
+        triangles: Sequence[Triangle],
+        fee_mult: float,
+        min_proffit: float,
+        now: int,
+        max_ages: Sequence[float] = (0.0, 0.0, 0.0),
+        calc_index: int = 0,
+        percent: bool = True,
+        ammount: float = 100.0,
+    ) -> Tuple[List[Tuple[int, float, Tuple[str, str, str]]], List[str]]:
+        """Evaluate a batch of triangles in one call
+
+        Args:
+            triangles (Sequence[Triangle]): Triangles to evaluate
+            fee_mult (float): Remaining ratio after a trade fee
+            min_proffit (float): Exclusive minimum (not rounded) proffit
+            now (int): Current time in ms, for leg ages
+            max_ages (Sequence[float], optional): Max book age (seconds) by
+                leg, 0 is no limit. Defaults to no limits.
+            calc_index (int, optional): Book level. Defaults to 0.
+            percent (bool, optional): Proffit in percent. Defaults to True.
+            ammount (float, optional): Stable input. Defaults to 100.0.
+
+        Returns:
+            Tuple[List[Tuple[int, float, Tuple[str, str, str]]], List[str]]:
+                Position in `triangles`, proffit and leg prices of triangles
+                above minimum, and symbols of stale legs (once by skipped
+                triangle leg)
+        """
+        if not triangles:
+            return [], []
+        keys = [self.steps_key]
+        for triangle in triangles:
+            keys.extend(
+                self.depth_model.make_primary_key(s) for s in triangle.symbols
+            )
+        args = [
+            repr(float(fee_mult)),
+            repr(float(ammount)),
+            int(calc_index),
+            repr(float(min_proffit)),
+            1 if percent else 0,
+            int(now),
+            *(repr(float(max_age)) for max_age in max_ages),
+        ]
+        candidates, stale = await self._script(keys=keys, args=args)
+        results = [
+            (
+                int(candidates[i]),
+                float(candidates[i + 1]),
+                tuple(candidates[i + 2 : i + 5]),
+            )
+            for i in range(0, len(candidates), 5)
+        ]
+        return results, list(stale)
@@ -0,0 +1,10 @@
+import anyio
+from tria_bot.services.cycles import CyclesSvc
+
+
+async def main():
+    await CyclesSvc.start()
+
+
+if __name__ == "__main__":
+    anyio.run(main)
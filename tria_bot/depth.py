@@ -1,9 +1,31 @@
 import asyncio
-from tria_bot.services.depth import DepthSvc
+from tria_bot.conf import settings
+from tria_bot.services.depth import (
+    BookTickerSvc,
+    DepthSvc,
+    DiffDepthSvc,
+    MultiplexDepthSvc,
+    TieredDepthSvc,
+)
 
 
-async def main(splitter: str) -> None:
-    await DepthSvc.start(splitter=splitter)
+async def main(
+    splitter: str,
+    per_socket: int,
+    diff: bool,
+    book_ticker: bool,
+    tiered: bool,
+) -> None:
+    if tiered:
+        await TieredDepthSvc.start(splitter=splitter, per_socket=per_socket)
+    elif book_ticker:
+        await BookTickerSvc.start(splitter=splitter, per_socket=per_socket)
+    elif diff:
+        await DiffDepthSvc.start(splitter=splitter, per_socket=per_socket)
+    elif per_socket > 1:
+        await MultiplexDepthSvc.start(splitter=splitter, per_socket=per_socket)
+    else:
+        await DepthSvc.start(splitter=splitter)
 
 
 if __name__ == "__main__":
@@ -17,5 +39,33 @@ if __name__ == "__main__":
         default="1/1",
         help="Service index / Total services",
     )
+    parser.add_argument(
+        "-p",
+        "--per-socket",
+        type=int,
+        default=settings.DEPTH_SYMBOLS_PER_SOCKET,
+        help="Symbols by combined-stream socket (1 = one socket by symbol)",
+    )
+    parser.add_argument(
+        "--diff",
+        type=bool,
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Keep local order books from diff-depth streams",
+    )
+    parser.add_argument(
+        "--book-ticker",
+        type=bool,
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Store real time best bid/ask (bookTicker) as one level books",
+    )
+    parser.add_argument(
+        "--tiered",
+        type=bool,
+        default=False,
+        action=argparse.BooleanOptionalAction,
+        help="Fast, deep streams only for symbols with recent activity",
+    )
 
     asyncio.run(main(**vars(parser.parse_args())))
@@ -1,16 +1,19 @@
 from decimal import Decimal
-from typing import Literal, Optional, Sequence, Union
-from binance.helpers import round_step_size
+from typing import Dict, Literal, Optional, Sequence, Union
+from tria_bot.helpers.quantize import Quantizer, format_positional
 from tria_bot.models.composite import Symbol
-from decimal import Context
 
 
 class Binance:
     def __init__(self, symbols: Optional[Sequence[Symbol]] = None, **kwargs):
-        self._context = Context()
         self._symbols_info = {}
         if symbols != None:
             self._symbols_info = dict(self._map_symbols(symbols))
+        # step and tick sizes parsed once by symbol
+        self._quantizers: Dict[str, Quantizer] = {
+            symbol: Quantizer.from_model(info)
+            for symbol, info in self._symbols_info.items()
+        }
 
     @staticmethod
     def _map_symbols(symbols: Sequence[Symbol]):
@@ -22,11 +25,7 @@ class Binance:
         Convert the given float to a string,
         without resorting to scientific notation
         """
-        # ensure float
-        x = float(x)
-        self._context.prec = precision
-        d1 = self._context.create_decimal(repr(x))
-        return format(d1, "f")
+        return format_positional(x=x, precision=precision)
 
     def _ffp(self, x: float, precision: int = 8):
         """
@@ -79,8 +78,27 @@ class Binance:
         Returns:
             float: Applied size kind
         """
-        kind_size = self._get_size(symbol=symbol, kind=kind)
-        return round_step_size(quantity=value, step_size=kind_size)
+        quantizer = self.get_quantizer(symbol=symbol)
+        if kind == "step":
+            return quantizer.step(value)
+        return quantizer.tick(value)
+
+    def get_quantizer(self, symbol: str) -> Quantizer:
+        """Get symbol step and tick rounding
+
+        Args:
+            symbol (str): Symbol str
+
+        Raises:
+            KeyError: If symbol not found
+
+        Returns:
+            Quantizer: Symbol quantizer
+        """
+        quantizer = self._quantizers.get(symbol, None)
+        if quantizer is None:
+            raise KeyError(f"Symbol {symbol} not found")
+        return quantizer
 
     def apply_step_size(
         self, symbol: str, value: Union[float, Decimal, str]
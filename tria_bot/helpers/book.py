@@ -0,0 +1,212 @@
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+class OrderBookGapError(Exception):
+    ...
+
+
+class OrderBookSide:
+    """Sorted price levels of one order book side
+
+    Levels are kept as exchange strings (price, quantity) and sorted by a
+    float key, so best prices are always at the start of the side.
+    """
+
+    __slots__ = ("_reverse", "_keys", "_levels")
+
+    def __init__(self, reverse: bool = False) -> None:
+        self._reverse = reverse
+        self._keys: List[float] = []
+        self._levels: Dict[float, Tuple[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _key(self, price: str) -> float:
+        return -float(price) if self._reverse else float(price)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._levels.clear()
+
+    def update(self, price: str, qty: str) -> None:
+        """Set a price level, removing it if quantity is zero
+
+        Args:
+            price (str): Level price
+            qty (str): Level quantity
+        """
+        key = self._key(price)
+        if float(qty) == 0.0:
+            if self._levels.pop(key, None) is not None:
+                del self._keys[bisect_left(self._keys, key)]
+            return
+
+        if key not in self._levels:
+            insort(self._keys, key)
+        self._levels[key] = (price, qty)
+
+    def top(self, levels: int) -> List[Tuple[str, str]]:
+        return [self._levels[k] for k in self._keys[:levels]]
+
+
+class OrderBook:
+    """Local order book maintained from Binance diff-depth events
+
+    Follows the Binance procedure: events are buffered until a REST
+    snapshot is loaded, events older than the snapshot are dropped and
+    every applied event must start right after the previous one.
+    """
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.bids = OrderBookSide(reverse=True)
+        self.asks = OrderBookSide()
+        self.last_update_id: Optional[int] = None
+        self._buffer: List[Dict[str, Any]] = []
+
+    @property
+    def is_synced(self) -> bool:
+        return self.last_update_id is not None
+
+    def reset(self) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        self.last_update_id = None
+        self._buffer.clear()
+
+    def _update_side(
+        self,
+        side: OrderBookSide,
+        levels: Sequence[Sequence[str]],
+    ) -> None:
+        for price, qty, *_ in levels:
+            side.update(price=price, qty=qty)
+
+    def load_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Load a REST `/depth` snapshot and replay buffered events
+
+        Args:
+            snapshot (Dict[str, Any]): Snapshot with `lastUpdateId`,
+                `bids` and `asks` keys
+
+        Raises:
+            OrderBookGapError: If buffered events do not follow the snapshot
+        """
+        buffer = self._buffer.copy()
+        self.reset()
+        self._update_side(self.bids, snapshot.get("bids", []))
+        self._update_side(self.asks, snapshot.get("asks", []))
+        self.last_update_id = snapshot["lastUpdateId"]
+        for i, event in enumerate(buffer):
+            try:
+                self.apply(event)
+            except OrderBookGapError:
+                # snapshot is older than buffered events, keep them to retry
+                self.reset()
+                self._buffer.extend(buffer[i:])
+                raise
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        """Apply a diff-depth event
+
+        Args:
+            event (Dict[str, Any]): Event with `U`, `u`, `b` and `a` keys
+
+        Raises:
+            OrderBookGapError: If event does not follow the last update
+
+        Returns:
+            bool: True if book changed, False if event was buffered or old
+        """
+        if not self.is_synced:
+            self._buffer.append(event)
+            return False
+
+        first_id, last_id = event["U"], event["u"]
+        if last_id <= self.last_update_id:
+            return False
+        if first_id > self.last_update_id + 1:
+            raise OrderBookGapError(
+                f"{self.symbol} expected update {self.last_update_id + 1}, "
+                f"received {first_id}"
+            )
+
+        self._update_side(self.bids, event.get("b", []))
+        self._update_side(self.asks, event.get("a", []))
+        self.last_update_id = last_id
+        return True
+
+    def export(self, levels: int) -> Dict[str, Any]:
+        return {"bids": self.bids.top(levels), "asks": self.asks.top(levels)}
+
+
+class CompactBook:
+    """Numeric order book parsed once from its stored string levels
+
+    Prices and quantities are kept in float64 arrays, so compute paths
+    never call `float` on level strings. Strings are only used again when
+    a price goes back to the wire (see `format`).
+    """
+
+    __slots__ = (
+        "symbol",
+        "bid_prices",
+        "bid_qtys",
+        "ask_prices",
+        "ask_qtys",
+        "event_time",
+    )
+
+    def __init__(
+        self,
+        symbol: str,
+        bids: Sequence[Sequence[str]],
+        asks: Sequence[Sequence[str]],
+        event_time: int = 0,
+    ) -> None:
+        self.symbol = symbol
+        self.bid_prices = array("d", [float(level[0]) for level in bids])
+        self.bid_qtys = array("d", [float(level[1]) for level in bids])
+        self.ask_prices = array("d", [float(level[0]) for level in asks])
+        self.ask_qtys = array("d", [float(level[1]) for level in asks])
+        self.event_time = event_time
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "CompactBook":
+        """Build a book from a stored Depth JSON document
+
+        Args:
+            document (Dict[str, Any]): Depth document
+
+        Returns:
+            CompactBook: Parsed book
+        """
+        return cls(
+            symbol=document["symbol"],
+            bids=document["bids"],
+            asks=document["asks"],
+            event_time=document.get("event_time", 0),
+        )
+
+    @classmethod
+    def from_depth(cls, depth: Any) -> "CompactBook":
+        return cls(
+            symbol=depth.symbol,
+            bids=depth.bids,
+            asks=depth.asks,
+            event_time=depth.event_time,
+        )
+
+    @staticmethod
+    def format(value: float) -> str:
+        """Format a price or quantity as Binance does (8 decimals)"""
+        return f"{value:.8f}"
+
+    def bid(self, index: int = 0) -> float:
+        return self.bid_prices[index]
+
+    def ask(self, index: int = 0) -> float:
+        return self.ask_prices[index]
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Dict, Hashable, List, Tuple
+
+
+class ConflatingQueue:
+    """Queue keeping only the latest pending item by key
+
+    Putting an item for a key that is still pending replaces it, so a slow
+    consumer always receives the newest state of every key. Replaced items
+    are counted as superseded. When `maxsize` pending keys are reached the
+    oldest pending key is dropped.
+    """
+
+    def __init__(self, maxsize: int = 0) -> None:
+        self.maxsize = maxsize
+        self.superseded = 0
+        self.dropped = 0
+        self.superseded_by_key: Dict[Hashable, int] = {}
+        self._items: Dict[Hashable, Any] = {}
+        self._event = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, key: Hashable, item: Any) -> None:
+        """Add an item without waiting, replacing any pending one for `key`
+
+        Args:
+            key (Hashable): Conflation key (symbol or Redis key)
+            item (Any): Item to queue
+        """
+        if key in self._items:
+            self.superseded += 1
+            self.superseded_by_key[key] = self.superseded_by_key.get(key, 0) + 1
+        elif self.maxsize and len(self._items) >= self.maxsize:
+            del self._items[next(iter(self._items))]
+            self.dropped += 1
+        self._items[key] = item
+        self._event.set()
+
+    def get_nowait(self) -> List[Tuple[Hashable, Any]]:
+        items, self._items = self._items, {}
+        self._event.clear()
+        return list(items.items())
+
+    async def get(self) -> List[Tuple[Hashable, Any]]:
+        """Wait for pending items and take all of them
+
+        Returns:
+            List[Tuple[Hashable, Any]]: Pending (key, item) pairs
+        """
+        while not self._items:
+            await self._event.wait()
+        return self.get_nowait()
@@ -0,0 +1,265 @@
+import math
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+import numpy as np
+from tria_bot.helpers.book import CompactBook
+from tria_bot.models.composite import Symbol
+
+
+SELL, BUY = "SELL", "BUY"
+
+
+class Cycle(NamedTuple):
+    """Assets of a cycle (starting one first) and the trade of each step
+
+    Step `i` goes from `assets[i]` to the next asset (back to the first one
+    after the last step) trading `symbols[i]` on `sides[i]`.
+    """
+
+    assets: Tuple[str, ...]
+    symbols: Tuple[str, ...]
+    sides: Tuple[str, ...]
+
+
+class SymbolGraph:
+    """Arbitrage cycles of up to `max_length` legs over any symbols
+
+    Assets are nodes and every symbol gives two edges: selling base at its
+    bid and buying base at its ask, weighted `-log(price * fee)`. A cycle
+    is profitable when its weights sum is negative. Simple cycles are
+    enumerated once (bounded by `max_length`) as padded arrays of edge ids,
+    so a book update only changes the weights of its two edges and only
+    the cycles through them are summed again.
+    """
+
+    def __init__(
+        self,
+        pairs: Iterable[Tuple[str, str, str]],
+        fee_mult: float,
+        max_length: int = 4,
+        calc_index: int = 0,
+    ) -> None:
+        """
+        Args:
+            pairs (Iterable[Tuple[str, str, str]]): Symbol, base and quote
+                assets
+            fee_mult (float): Remaining ratio after a trade fee
+            max_length (int, optional): Max cycle legs. Defaults to 4.
+            calc_index (int, optional): Book level of prices. Defaults to 0.
+        """
+        pairs = sorted(set(pairs))
+        self.fee_mult = fee_mult
+        self.max_length = max_length
+        self.calc_index = calc_index
+        self.symbols = tuple(symbol for symbol, _, _ in pairs)
+        self.symbol_ids = {s: i for i, s in enumerate(self.symbols)}
+        self.assets = tuple(sorted({a for _, *ab in pairs for a in ab}))
+        asset_ids = {asset: i for i, asset in enumerate(self.assets)}
+
+        # edge 2 * i sells base of symbol i, edge 2 * i + 1 buys it
+        adjacency: List[List[Tuple[int, int]]] = [[] for _ in self.assets]
+        self._edge_from: List[int] = []
+        for symbol_id, (_, base, quote) in enumerate(pairs):
+            base_id, quote_id = asset_ids[base], asset_ids[quote]
+            adjacency[base_id].append((quote_id, 2 * symbol_id))
+            adjacency[quote_id].append((base_id, 2 * symbol_id + 1))
+            self._edge_from.extend((base_id, quote_id))
+        n_edges = len(self._edge_from)
+
+        cycles = self._enumerate(adjacency)
+        # unused legs of shorter cycles point to a zero weight edge
+        self.cycle_edges = np.full(
+            (len(cycles), max_length), n_edges, dtype=np.intp
+        )
+        for cycle_id, edges in enumerate(cycles):
+            self.cycle_edges[cycle_id, : len(edges)] = edges
+        self.lengths = np.array([len(c) for c in cycles], dtype=np.intp)
+
+        # cycle ids by edge, as CSR arrays
+        flat = self.cycle_edges.ravel()
+        order = np.argsort(flat, kind="stable")
+        self._edge_cycles = order // max_length
+        self._edge_starts = np.searchsorted(
+            flat[order], np.arange(n_edges + 1)
+        )
+
+        # no price is an infinite weight, never profitable
+        self.weights = np.full(n_edges + 1, np.inf)
+        self.weights[n_edges] = 0.0
+
+    @classmethod
+    def from_models(
+        cls,
+        symbols: Sequence[Symbol],
+        valid_symbols: Iterable[str],
+        fee_mult: float,
+        max_length: int = 4,
+        calc_index: int = 0,
+    ) -> "SymbolGraph":
+        valid_symbols = set(valid_symbols)
+        return cls(
+            pairs=(
+                (s.symbol, s.base_asset, s.quote_asset)
+                for s in symbols
+                if s.symbol in valid_symbols
+            ),
+            fee_mult=fee_mult,
+            max_length=max_length,
+            calc_index=calc_index,
+        )
+
+    def _enumerate(
+        self,
+        adjacency: List[List[Tuple[int, int]]],
+    ) -> List[Tuple[int, ...]]:
+        # every cycle starts at its lowest asset id, once by direction
+        cycles: List[Tuple[int, ...]] = []
+        max_length = self.max_length
+
+        def walk(node: int, path: Tuple[int, ...], seen: set) -> None:
+            # last leg back to start is looked up instead of walked
+            if len(path) >= 2:
+                for edge in closing.get(node, ()):
+                    cycles.append(path + (edge,))
+            if len(path) + 2 > max_length:
+                return
+            for to, edge in adjacency[node]:
+                if to > start and to not in seen:
+                    seen.add(to)
+                    walk(to, path + (edge,), seen)
+                    seen.discard(to)
+
+        for start in range(len(self.assets)):
+            closing: Dict[int, List[int]] = {}
+            for node, edge in adjacency[start]:
+                # edges are paired, so `edge ^ 1` goes from node to start
+                closing.setdefault(node, []).append(edge ^ 1)
+            walk(start, (), {start})
+        return cycles
+
+    def __len__(self) -> int:
+        return len(self.cycle_edges)
+
+    def cycle(self, cycle_id: int) -> Cycle:
+        """Describe a cycle by its id"""
+        edges = self.cycle_edges[cycle_id, : self.lengths[cycle_id]]
+        return Cycle(
+            assets=tuple(self.assets[self._edge_from[e]] for e in edges),
+            symbols=tuple(self.symbols[e // 2] for e in edges),
+            sides=tuple(BUY if e % 2 else SELL for e in edges),
+        )
+
+    def cycle_ids(self, symbols: Iterable[str]) -> np.ndarray:
+        """Sorted ids of cycles trading any of `symbols`"""
+        ids = [
+            self._edge_cycles[
+                self._edge_starts[edge] : self._edge_starts[edge + 1]
+            ]
+            for symbol in symbols
+            if symbol in self.symbol_ids
+            for edge in (
+                2 * self.symbol_ids[symbol],
+                2 * self.symbol_ids[symbol] + 1,
+            )
+        ]
+        if not ids:
+            return np.array([], dtype=np.intp)
+        return np.unique(np.concatenate(ids))
+
+    def update(self, book: CompactBook) -> bool:
+        """Set edge weights of a symbol from its book
+
+        Args:
+            book (CompactBook): Symbol book
+
+        Returns:
+            bool: False if symbol is not in the graph
+        """
+        symbol_id = self.symbol_ids.get(book.symbol, None)
+        if symbol_id is None:
+            return False
+        try:
+            bid = book.bid(self.calc_index)
+            ask = book.ask(self.calc_index)
+        except IndexError:
+            bid = ask = math.nan
+        sell_rate = bid * self.fee_mult
+        buy_rate = self.fee_mult / ask if ask > 0 else math.nan
+        self.weights[2 * symbol_id] = (
+            -math.log(sell_rate) if sell_rate > 0 else math.inf
+        )
+        self.weights[2 * symbol_id + 1] = (
+            -math.log(buy_rate) if buy_rate > 0 else math.inf
+        )
+        return True
+
+    def update_many(
+        self,
+        books: Iterable[Optional[CompactBook]],
+    ) -> np.ndarray:
+        """Update books, getting ids of the cycles through them
+
+        Args:
+            books (Iterable[Optional[CompactBook]]): Updated books
+
+        Returns:
+            np.ndarray: Sorted ids of affected cycles
+        """
+        return self.cycle_ids(
+            book.symbol
+            for book in books
+            if book is not None and self.update(book)
+        )
+
+    def proffits(
+        self,
+        ids: Optional[np.ndarray] = None,
+        percent: bool = True,
+    ) -> np.ndarray:
+        """Proffit of cycles after fees (-100% if a leg has no price)
+
+        Args:
+            ids (Optional[np.ndarray], optional): Cycle ids to evaluate.
+                Defaults to None (every cycle).
+            percent (bool, optional): Proffit in percent. Defaults to True.
+
+        Returns:
+            np.ndarray: Proffits by cycle, in `ids` order if given
+        """
+        edges = self.cycle_edges if ids is None else self.cycle_edges[ids]
+        proffits = np.expm1(-self.weights[edges].sum(axis=1))
+        return proffits * 100 if percent else proffits
+
+    def profitable(
+        self,
+        min_proffit: float,
+        ids: Optional[np.ndarray] = None,
+        percent: bool = True,
+    ) -> List[Tuple[int, float]]:
+        """Get cycles with a (2 decimals rounded) proffit above minimum
+
+        Args:
+            min_proffit (float): Exclusive minimum proffit
+            ids (Optional[np.ndarray], optional): Cycle ids to evaluate.
+                Defaults to None (every cycle).
+            percent (bool, optional): Proffit in percent. Defaults to True.
+
+        Returns:
+            List[Tuple[int, float]]: Cycle id and rounded proffit
+        """
+        proffits = self.proffits(ids=ids, percent=percent)
+        candidates = np.flatnonzero(proffits > min_proffit - 0.01)
+        results = []
+        for position in candidates.tolist():
+            proffit = round(float(proffits[position]), 2)
+            if proffit > min_proffit:
+                cycle_id = position if ids is None else int(ids[position])
+                results.append((cycle_id, proffit))
+        return results
@@ -0,0 +1,341 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from tria_bot.helpers.book import CompactBook
+from tria_bot.helpers.symbols import TriangleIndex
+
+
+def step_params(step_size: float) -> Tuple[float, float]:
+    """Split a step size in an integer unit and a power of ten scale
+
+    `step_size == unit / scale` exactly in decimal, e.g. 0.05 is (5, 100).
+
+    Args:
+        step_size (float): Symbol step (or tick) size
+
+    Returns:
+        Tuple[float, float]: Integer unit and scale, as floats
+    """
+    sign, digits, exponent = Decimal(str(step_size)).as_tuple()
+    unit = int("".join(map(str, digits)))
+    if exponent >= 0:
+        return float(unit * 10**exponent), 1.0
+    return float(unit), float(10**-exponent)
+
+
+def step_floor(
+    values: np.ndarray,
+    units: np.ndarray,
+    scales: np.ndarray,
+) -> np.ndarray:
+    """Vectorized `binance.helpers.round_step_size`, with the same results
+
+    `round_step_size` floors `Decimal(str(value))` to the step. Steps are
+    `unit / scale` integers ratios, so the floor is the largest integer
+    `m` with `m * unit / scale <= value`. Integer products and powers of
+    ten are exact in float64 and division is correctly rounded, so the
+    float comparison matches the decimal one and `m * unit / scale` is
+    the float of the decimal result. That holds while `values * scales`
+    is below 2**53 (integer products stay exact).
+
+    Args:
+        values (np.ndarray): Positive quantities
+        units (np.ndarray): Step units (see `step_params`)
+        scales (np.ndarray): Step scales (see `step_params`)
+
+    Returns:
+        np.ndarray: Floored quantities
+    """
+    m = np.floor(values * scales / units)
+    m = np.where((m + 1) * units / scales <= values, m + 1, m)
+    m = np.where(m * units / scales > values, m - 1, m)
+    return m * units / scales
+
+
+class TriangleKernel:
+    """Evaluate every (alt, strong, stable) triangle in one vectorized pass
+
+    Best prices of every leg symbol are kept in float64 arrays indexed by
+    `TriangleIndex` symbol id, triangles are arrays of leg ids. `evaluate`
+    runs the same float operations as `ProffitSvc.calc_proffit`, in the
+    same order, so results are equal to the scalar ones.
+    """
+
+    def __init__(
+        self,
+        index: TriangleIndex,
+        step_sizes: Dict[str, float],
+        fee_mult: float,
+        calc_index: int = 0,
+        percent: bool = True,
+    ) -> None:
+        self.index = index
+        self.triangles = index.triangles
+        self.symbols = index.symbols
+        self.symbol_ids = index.symbol_ids
+        self.fee_mult = fee_mult
+        self.calc_index = calc_index
+        self.percent = percent
+
+        def leg_ids(leg: str) -> np.ndarray:
+            return np.array(
+                [self.symbol_ids[getattr(t, leg)] for t in self.triangles],
+                dtype=np.intp,
+            )
+
+        self.alt_stable = leg_ids("alt_stable")
+        self.alt_strong = leg_ids("alt_strong")
+        self.strong_stable = leg_ids("strong_stable")
+
+        # alt/stable legs are bought, only sold legs need a step size
+        params = [
+            step_params(step_sizes[s]) if s in step_sizes else (np.nan, np.nan)
+            for s in self.symbols
+        ]
+        units = np.array([p[0] for p in params], dtype=np.float64)
+        scales = np.array([p[1] for p in params], dtype=np.float64)
+        self._alt_units = units[self.alt_strong]
+        self._alt_scales = scales[self.alt_strong]
+        self._strong_units = units[self.strong_stable]
+        self._strong_scales = scales[self.strong_stable]
+
+        self.bids = np.full(len(self.symbols), np.nan)
+        self.asks = np.full(len(self.symbols), np.nan)
+        # book event times (ms) and triangles skipped by stale leg symbol
+        self.times = np.zeros(len(self.symbols), dtype=np.int64)
+        self.stale_skips = np.zeros(len(self.symbols), dtype=np.int64)
+
+        # triangle ids by leg role of each symbol, for break-even checks
+        roles = [([], [], []) for _ in self.symbols]
+        for triangle in self.triangles:
+            roles[self.symbol_ids[triangle.alt_stable]][0].append(triangle.id)
+            roles[self.symbol_ids[triangle.alt_strong]][1].append(triangle.id)
+            roles[self.symbol_ids[triangle.strong_stable]][2].append(
+                triangle.id
+            )
+        self._roles = [
+            tuple(np.array(ids, dtype=np.intp) for ids in role)
+            for role in roles
+        ]
+        # break-even prices (see `break_even`), NaN never crosses
+        self._gross = np.nan
+        self._max_alt_bid = np.full(len(self.triangles), np.nan)
+        self._min_alt_ask = np.full(len(self.triangles), np.nan)
+        self._min_strong_ask = np.full(len(self.triangles), np.nan)
+
+    def update(self, book: CompactBook) -> None:
+        """Set best prices of a leg symbol
+
+        Args:
+            book (CompactBook): Symbol book
+        """
+        symbol_id = self.symbol_ids.get(book.symbol, None)
+        if symbol_id is None:
+            return
+        self.times[symbol_id] = book.event_time
+        try:
+            self.bids[symbol_id] = book.bid(self.calc_index)
+            self.asks[symbol_id] = book.ask(self.calc_index)
+        except IndexError:
+            self.bids[symbol_id] = self.asks[symbol_id] = np.nan
+
+    def update_many(self, books: Iterable[Optional[CompactBook]]) -> None:
+        for book in books:
+            if book is not None:
+                self.update(book)
+
+    def proffits(
+        self,
+        ammount: float = 100.0,
+        ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Unrounded proffit of triangles (NaN if a leg has no price)
+
+        Args:
+            ammount (float, optional): Stable input. Defaults to 100.0.
+            ids (Optional[np.ndarray], optional): Triangle ids to evaluate.
+                Defaults to None (every triangle).
+
+        Returns:
+            np.ndarray: Proffits by triangle, in `ids` order if given
+        """
+        alt_stable, alt_strong = self.alt_stable, self.alt_strong
+        strong_stable = self.strong_stable
+        alt_units, alt_scales = self._alt_units, self._alt_scales
+        strong_units, strong_scales = self._strong_units, self._strong_scales
+        if ids is not None:
+            alt_stable, alt_strong = alt_stable[ids], alt_strong[ids]
+            strong_stable = strong_stable[ids]
+            alt_units, alt_scales = alt_units[ids], alt_scales[ids]
+            strong_units = strong_units[ids]
+            strong_scales = strong_scales[ids]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            alt_qty = (ammount / self.bids[alt_stable]) * self.fee_mult
+            alt_sell_qty = step_floor(alt_qty, alt_units, alt_scales)
+            strong_qty = alt_sell_qty * self.asks[alt_strong] * self.fee_mult
+            strong_sell_qty = step_floor(
+                strong_qty, strong_units, strong_scales
+            )
+            stable_qty = (
+                strong_sell_qty * self.asks[strong_stable] * self.fee_mult
+            )
+
+        proffits = stable_qty / ammount - 1
+        if self.percent:
+            proffits = proffits * 100
+        return proffits
+
+    def evaluate(
+        self,
+        min_proffit: float,
+        ammount: float = 100.0,
+        ids: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Get triangles with a (2 decimals rounded) proffit above minimum
+
+        Args:
+            min_proffit (float): Exclusive minimum proffit
+            ammount (float, optional): Stable input. Defaults to 100.0.
+            ids (Optional[np.ndarray], optional): Triangle ids to evaluate.
+                Defaults to None (every triangle).
+
+        Returns:
+            List[Tuple[int, float]]: Triangle id and rounded proffit
+        """
+        proffits = self.proffits(ammount=ammount, ids=ids)
+        # rounding can only lift a value 0.005 up, so it is exactly applied
+        # by `round` on the few candidates instead of the whole array
+        with np.errstate(invalid="ignore"):
+            candidates = np.flatnonzero(proffits > min_proffit - 0.01)
+
+        results = []
+        for position in candidates.tolist():
+            proffit = round(float(proffits[position]), 2)
+            if proffit > min_proffit:
+                index = position if ids is None else int(ids[position])
+                results.append((index, proffit))
+        return results
+
+    def fresh(
+        self,
+        now: int,
+        max_ages: Sequence[float],
+        ids: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Drop triangles with a leg book older than its budget
+
+        Ages come from the event times of updated books, so no extra read
+        is needed. Every stale leg of a dropped triangle is counted in
+        `stale_skips`.
+
+        Args:
+            now (int): Current time (ms)
+            max_ages (Sequence[float]): Max seconds by leg (alt/stable,
+                alt/strong, strong/stable), not positive to skip a leg
+            ids (Optional[np.ndarray], optional): Triangle ids to check.
+                Defaults to None (every triangle).
+
+        Returns:
+            np.ndarray: Sorted ids of fresh triangles
+        """
+        if ids is None:
+            ids = np.arange(len(self.triangles))
+        legs = (self.alt_stable, self.alt_strong, self.strong_stable)
+        stale = np.zeros(len(ids), dtype=bool)
+        leg_stale = []
+        for leg, max_age in zip(legs, max_ages):
+            if max_age <= 0:
+                continue
+            symbol_ids = leg[ids]
+            is_stale = now - self.times[symbol_ids] > max_age * 1000
+            leg_stale.append((symbol_ids, is_stale))
+            stale |= is_stale
+        if not stale.any():
+            return ids
+        for symbol_ids, is_stale in leg_stale:
+            np.add.at(self.stale_skips, symbol_ids[is_stale], 1)
+        return ids[~stale]
+
+    def break_even(self, min_proffit: float) -> None:
+        """Set every leg break-even price for `min_proffit`
+
+        Step floors only lower quantities, so a triangle can reach
+        `min_proffit` only if its unrounded gross ratio
+        `asks[alt_strong] * asks[strong_stable] / bids[alt_stable]` (with
+        fees) is above it. With two legs fixed that is a bound on the
+        third: a maximum alt/stable bid and minimum alt/strong and
+        strong/stable asks.
+
+        Args:
+            min_proffit (float): Exclusive minimum proffit, as `evaluate`
+        """
+        # rounded proffits can be 0.005 above unrounded ones
+        margin = min_proffit - 0.01
+        if self.percent:
+            margin /= 100
+        self._gross = (1 + margin) / self.fee_mult**3
+        self._refresh_break_even(np.arange(len(self.triangles)))
+
+    def _refresh_break_even(self, ids: np.ndarray) -> None:
+        bids = self.bids[self.alt_stable[ids]]
+        alt_asks = self.asks[self.alt_strong[ids]]
+        strong_asks = self.asks[self.strong_stable[ids]]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self._max_alt_bid[ids] = alt_asks * strong_asks / self._gross
+            self._min_alt_ask[ids] = self._gross * bids / strong_asks
+            self._min_strong_ask[ids] = self._gross * bids / alt_asks
+
+    def apply(self, books: Iterable[Optional[CompactBook]]) -> np.ndarray:
+        """Update prices, getting triangles crossing a break-even price
+
+        Books are applied one by one and each one is a comparison against
+        its break-even price in every triangle it's a leg of. Bounds of
+        the other legs are then refreshed, so later books are compared
+        against current prices. Triangles not crossing can't reach the
+        `break_even` minimum and don't need to be evaluated.
+
+        Args:
+            books (Iterable[Optional[CompactBook]]): Updated books
+
+        Returns:
+            np.ndarray: Sorted ids of crossing triangles
+        """
+        crossed = []
+        for book in books:
+            if book is None or book.symbol not in self.symbol_ids:
+                continue
+            self.update(book)
+            symbol_id = self.symbol_ids[book.symbol]
+            bid, ask = self.bids[symbol_id], self.asks[symbol_id]
+            alt_stable, alt_strong, strong_stable = self._roles[symbol_id]
+            with np.errstate(invalid="ignore"):
+                crossed.append(alt_stable[bid < self._max_alt_bid[alt_stable]])
+                crossed.append(alt_strong[ask > self._min_alt_ask[alt_strong]])
+                crossed.append(
+                    strong_stable[ask > self._min_strong_ask[strong_stable]]
+                )
+            self._refresh_break_even(
+                np.concatenate((alt_stable, alt_strong, strong_stable))
+            )
+
+        if not crossed:
+            return np.array([], dtype=np.intp)
+        return np.unique(np.concatenate(crossed))
+
+    def triangle_ids(self, symbols: Iterable[str]) -> np.ndarray:
+        """Sorted ids of triangles having any of `symbols` as a leg"""
+        ids = {
+            triangle.id
+            for symbol in symbols
+            for triangle in self.index.triangles_of(symbol)
+        }
+        return np.array(sorted(ids), dtype=np.intp)
+
+    def prices(self, index: int) -> Tuple[float, float, float]:
+        """Best prices used by a triangle (alt/stable bid, asks)"""
+        return (
+            float(self.bids[self.alt_stable[index]]),
+            float(self.asks[self.alt_strong[index]]),
+            float(self.asks[self.strong_stable[index]]),
+        )
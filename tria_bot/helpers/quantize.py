@@ -0,0 +1,181 @@
+from decimal import Decimal
+import math
+from typing import Optional, Tuple, Union
+import numpy as np
+from tria_bot.helpers.kernel import step_floor, step_params
+from tria_bot.models.composite import Symbol
+
+
+Number = Union[float, Decimal, str]
+
+
+def decimal_parts(value: Number) -> Tuple[bool, str, int]:
+    """Split a number as `Decimal(str(value))` does, without Decimal
+
+    Args:
+        value (Number): Finite float, Decimal or numeric string
+
+    Returns:
+        Tuple[bool, str, int]: Sign (True if negative), coefficient digits
+            (trailing zeros kept) and exponent of ten
+    """
+    text = str(value).strip().lower()
+    mantissa, _, exponent = text.partition("e")
+    negative = mantissa.startswith("-")
+    whole, _, fraction = mantissa.lstrip("+-").partition(".")
+    digits = (whole + fraction).lstrip("0") or "0"
+    return negative, digits, int(exponent or 0) - len(fraction)
+
+
+# float math is exact while `value * scale` integers are (see step_floor)
+_MAX_FLOAT_SCALED = 2.0**52
+
+
+def floor_step(
+    value: Number,
+    unit: int,
+    exponent: int,
+    params: Optional[Tuple[float, float]] = None,
+) -> float:
+    """`binance.helpers.round_step_size` with integer math
+
+    The value and step `unit * 10 ** exponent` are scaled to a common
+    exponent, so the remainder is an exact integer one. Like Decimal `%`,
+    negative values are rounded towards zero.
+
+    Positive floats skip the string parsing when the step `params` (see
+    `step_params`) are given: the floor is found as `step_floor` does,
+    which has the same results.
+
+    Args:
+        value (Number): Quantity or price
+        unit (int): Step unit
+        exponent (int): Step exponent of ten
+        params (Optional[Tuple[float, float]], optional): Step unit and
+            scale as floats. Defaults to None.
+
+    Returns:
+        float: Rounded value
+    """
+    if params is not None and type(value) is float and value >= 0.0:
+        float_unit, scale = params
+        if value * scale < _MAX_FLOAT_SCALED:
+            steps = math.floor(value * scale / float_unit)
+            if (steps + 1) * float_unit / scale <= value:
+                steps += 1
+            elif steps * float_unit / scale > value:
+                steps -= 1
+            return steps * float_unit / scale
+
+    negative, digits, value_exponent = decimal_parts(value)
+    common = min(value_exponent, exponent)
+    coefficient = int(digits) * 10 ** (value_exponent - common)
+    rounded = coefficient - coefficient % (unit * 10 ** (exponent - common))
+    if negative:
+        rounded = -rounded
+    # int true division is correctly rounded, as float(Decimal) is
+    if common < 0:
+        return rounded / 10**-common
+    return float(rounded * 10**common)
+
+
+def format_positional(x: float, precision: int = 8) -> str:
+    """`Binance.format_float_positional` with integer math
+
+    `repr(x)` is rounded (half even) to `precision` significant digits
+    and written without scientific notation, as Decimal `"f"` format does.
+
+    Args:
+        x (float): Value
+        precision (int, optional): Significant digits. Defaults to 8.
+
+    Returns:
+        str: Positional string
+    """
+    text = repr(float(x))
+    # short positional reprs are already the Decimal format
+    if "e" not in text and "n" not in text:
+        if len(text.lstrip("-0.").replace(".", "")) <= precision:
+            return text
+
+    negative, digits, exponent = decimal_parts(text)
+    if len(digits) > precision:
+        exceeding = len(digits) - precision
+        coefficient, remainder = divmod(int(digits), 10**exceeding)
+        half = 5 * 10 ** (exceeding - 1)
+        if remainder > half or (remainder == half and coefficient % 2):
+            coefficient += 1
+        digits = str(coefficient)
+        exponent += exceeding
+        if len(digits) > precision:
+            # carried to a new digit, e.g. 99999999|5
+            digits = digits[:-1]
+            exponent += 1
+
+    if exponent >= 0:
+        text = digits + "0" * exponent if digits != "0" else "0"
+    elif len(digits) > -exponent:
+        text = f"{digits[:exponent]}.{digits[exponent:]}"
+    else:
+        text = "0." + "0" * (-exponent - len(digits)) + digits
+    return f"-{text}" if negative else text
+
+
+class Quantizer:
+    """Step and tick rounding of one symbol, precomputed once
+
+    Sizes are kept as integer unit and exponent of ten, so scalar rounding
+    is integer math (`floor_step`) and array rounding is `step_floor`.
+    Results are equal to `binance.helpers.round_step_size` ones.
+    """
+
+    __slots__ = ("symbol", "_step", "_tick")
+
+    def __init__(
+        self,
+        symbol: str,
+        step_size: Optional[float],
+        tick_size: Optional[float],
+    ) -> None:
+        self.symbol = symbol
+        self._step = self._parts(step_size)
+        self._tick = self._parts(tick_size)
+
+    @classmethod
+    def from_model(cls, symbol: Symbol) -> "Quantizer":
+        return cls(
+            symbol=symbol.symbol,
+            step_size=symbol.step_size,
+            tick_size=symbol.tick_size,
+        )
+
+    @staticmethod
+    def _parts(
+        size: Optional[float],
+    ) -> Optional[Tuple[int, int, Tuple[float, float]]]:
+        if not size:
+            return None
+        _, digits, exponent = decimal_parts(float(size))
+        return int(digits), exponent, step_params(float(size))
+
+    def _size(self, kind: str) -> Tuple[int, int, Tuple[float, float]]:
+        parts = self._step if kind == "step" else self._tick
+        if parts is None:
+            raise ValueError(f"Not valid {kind} size for symbol {self.symbol}")
+        return parts
+
+    def step(self, value: Number) -> float:
+        return floor_step(value, *self._size("step"))
+
+    def tick(self, value: Number) -> float:
+        return floor_step(value, *self._size("tick"))
+
+    def steps(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized `step` of positive values"""
+        unit, scale = self._size("step")[2]
+        return step_floor(np.asarray(values, dtype=np.float64), unit, scale)
+
+    def ticks(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized `tick` of positive values"""
+        unit, scale = self._size("tick")[2]
+        return step_floor(np.asarray(values, dtype=np.float64), unit, scale)
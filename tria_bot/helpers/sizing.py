@@ -0,0 +1,159 @@
+from typing import NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from tria_bot.helpers.kernel import step_floor, step_params
+
+
+class LegCurve(NamedTuple):
+    """Piecewise linear fill of a leg walking its book levels
+
+    `inputs` and `outputs` are prefix sums (starting at 0) of what is given
+    and received level by level, `rates` are the output by input unit of
+    each level.
+    """
+
+    inputs: np.ndarray
+    outputs: np.ndarray
+    rates: np.ndarray
+
+    @classmethod
+    def buy(
+        cls,
+        prices: Sequence[float],
+        qtys: Sequence[float],
+    ) -> "LegCurve":
+        """Spend quote asset at level prices, receiving base asset"""
+        prices = np.asarray(prices, dtype=np.float64)
+        qtys = np.asarray(qtys, dtype=np.float64)
+        return cls(
+            inputs=np.concatenate(([0.0], np.cumsum(prices * qtys))),
+            outputs=np.concatenate(([0.0], np.cumsum(qtys))),
+            rates=1 / prices,
+        )
+
+    @classmethod
+    def sell(
+        cls,
+        prices: Sequence[float],
+        qtys: Sequence[float],
+    ) -> "LegCurve":
+        """Spend base asset at level prices, receiving quote asset"""
+        prices = np.asarray(prices, dtype=np.float64)
+        qtys = np.asarray(qtys, dtype=np.float64)
+        return cls(
+            inputs=np.concatenate(([0.0], np.cumsum(qtys))),
+            outputs=np.concatenate(([0.0], np.cumsum(prices * qtys))),
+            rates=prices,
+        )
+
+    def output(self, values: np.ndarray) -> np.ndarray:
+        """Received for each input (NaN if the book can't fill it)"""
+        levels = np.clip(
+            np.searchsorted(self.inputs, values, side="left"),
+            1,
+            len(self.inputs) - 1,
+        )
+        outputs = (
+            self.outputs[levels - 1]
+            + (values - self.inputs[levels - 1]) * self.rates[levels - 1]
+        )
+        return np.where(values <= self.inputs[-1], outputs, np.nan)
+
+    def input(self, values: np.ndarray) -> np.ndarray:
+        """Input needed to receive each output (NaN if out of the book)"""
+        levels = np.clip(
+            np.searchsorted(self.outputs, values, side="left"),
+            1,
+            len(self.outputs) - 1,
+        )
+        inputs = (
+            self.inputs[levels - 1]
+            + (values - self.outputs[levels - 1]) / self.rates[levels - 1]
+        )
+        return np.where(values <= self.outputs[-1], inputs, np.nan)
+
+
+def executable_size(
+    alt_stable: LegCurve,
+    alt_strong: LegCurve,
+    strong_stable: LegCurve,
+    alt_step: float,
+    strong_step: float,
+    fee_mult: float,
+    min_proffit: float,
+    percent: bool = True,
+    samples: int = 16,
+) -> Optional[Tuple[float, float]]:
+    """Get the biggest stable input of a triangle above a minimum proffit
+
+    Every leg walks its book from the best level, with fees and step
+    floors applied as `ProffitSvc.calc_proffit` does. Proffit only changes
+    slope where a leg moves to its next level, so sizes are sampled
+    between those boundaries (mapped to stable input) and every sample is
+    evaluated in one vectorized pass.
+
+    Args:
+        alt_stable (LegCurve): Stable to alt leg
+        alt_strong (LegCurve): Alt to strong leg
+        strong_stable (LegCurve): Strong to stable leg
+        alt_step (float): Step size of alt sells (alt/strong symbol)
+        strong_step (float): Step size of strong sells (strong/stable)
+        fee_mult (float): Remaining ratio after a trade fee
+        min_proffit (float): Exclusive minimum (2 decimals rounded) proffit
+        percent (bool, optional): Proffit in percent. Defaults to True.
+        samples (int, optional): Sizes by level segment. Defaults to 16.
+
+    Returns:
+        Optional[Tuple[float, float]]: Stable input and its proffit, None
+            if no size is above the minimum
+    """
+    legs = (alt_stable, alt_strong, strong_stable)
+    if any(len(leg.rates) == 0 for leg in legs):
+        return None
+
+    # stable inputs where a leg moves to its next level
+    alt_bounds = alt_strong.inputs[1:] / fee_mult
+    strong_bounds = alt_strong.input(strong_stable.inputs[1:]) / fee_mult
+    bounds = np.concatenate(
+        (
+            alt_stable.inputs[1:],
+            alt_stable.input(alt_bounds),
+            alt_stable.input(strong_bounds),
+        )
+    )
+    bounds = np.unique(bounds[np.isfinite(bounds) & (bounds > 0)])
+    if not len(bounds):
+        return None
+    starts = np.concatenate(([0.0], bounds[:-1]))
+    fractions = np.arange(1, samples + 1) / samples
+    sizes = (starts[:, None] + np.outer(bounds - starts, fractions)).ravel()
+
+    alt_unit, alt_scale = step_params(alt_step)
+    strong_unit, strong_scale = step_params(strong_step)
+
+    def proffits(sizes: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            alt_qty = alt_stable.output(sizes) * fee_mult
+            alt_sell_qty = step_floor(alt_qty, alt_unit, alt_scale)
+            strong_qty = alt_strong.output(alt_sell_qty) * fee_mult
+            strong_sell_qty = step_floor(strong_qty, strong_unit, strong_scale)
+            stable_qty = strong_stable.output(strong_sell_qty) * fee_mult
+            values = stable_qty / sizes - 1
+        return values * 100 if percent else values
+
+    def last_passing(sizes: np.ndarray) -> Optional[int]:
+        with np.errstate(invalid="ignore"):
+            rounded = np.round(proffits(sizes), 2)
+            passing = np.flatnonzero(rounded > min_proffit)
+        return int(passing[-1]) if len(passing) else None
+
+    position = last_passing(sizes)
+    if position is None:
+        return None
+    # refine between the last passing size and the next sampled one
+    if position + 1 < len(sizes):
+        sizes = sizes[position] + (
+            sizes[position + 1] - sizes[position]
+        ) * np.arange(samples) / samples
+        position = last_passing(sizes)
+    size = sizes[position : position + 1]
+    return float(size[0]), round(float(proffits(size)[0]), 2)
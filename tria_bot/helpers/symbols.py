@@ -1,4 +1,15 @@
-from typing import Iterable
+import zlib
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 
 STABLE_ASSETS = (
@@ -69,3 +80,151 @@ def all_combos(
         yield from stable_alt_combos(stable_asset=stable, alt_assets=alt_assets)
     
     yield from strong_stable_combos(strong_assets=strong_assets, stable_assets=stable_assets)
+
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Parse an `"index/total"` shard (1 based, as depth splitters)
+
+    Args:
+        shard (str): Shard str, e.g. "2/4"
+
+    Raises:
+        ValueError: If shard is not valid
+
+    Returns:
+        Tuple[int, int]: Shard index and total shards
+    """
+    index, total = (int(value) for value in shard.strip().split("/"))
+    if not 1 <= index <= total:
+        raise ValueError(f"Not valid shard {shard}")
+    return index, total
+
+
+def alt_shard(alt: str, total: int) -> int:
+    """Get the (1 based) shard owning the triangles of an alt asset
+
+    Hashed with crc32, so every process gets the same partition.
+    """
+    return zlib.crc32(alt.encode()) % total + 1
+
+
+class Triangle(NamedTuple):
+    id: int
+    alt: str
+    strong: str
+    stable: str
+    alt_stable: str
+    alt_strong: str
+    strong_stable: str
+
+    @property
+    def symbols(self) -> Tuple[str, str, str]:
+        return self.alt_stable, self.alt_strong, self.strong_stable
+
+
+class TriangleIndex:
+    """Valid (alt, strong, stable) triangles with their leg symbols
+
+    Built once per top volume assets change, so services never build
+    symbol names nor scan symbol lists in hot loops. Triangle ids are
+    their position in `triangles` and every leg symbol has an integer id
+    (position in `symbols`).
+
+    With a `shard`, only triangles of the alts owned by it (see
+    `alt_shard`) are kept: alt legs stay in one shard and only the few
+    strong/stable legs are shared.
+    """
+
+    def __init__(
+        self,
+        alt_assets: Iterable[str],
+        valid_symbols: Iterable[str],
+        strong_assets: Iterable[str] = STRONG_ASSETS,
+        stable_assets: Iterable[str] = STABLE_ASSETS,
+        shard: Tuple[int, int] = (1, 1),
+    ) -> None:
+        self.valid_symbols = frozenset(valid_symbols)
+        self.shard = shard
+        self.triangles: List[Triangle] = []
+        self._by_symbol: Dict[str, List[Triangle]] = {}
+        self._by_assets: Dict[Tuple[str, str, str], Triangle] = {}
+
+        index, total = shard
+        alt_assets = [a for a in alt_assets if alt_shard(a, total) == index]
+        for stable in stable_assets:
+            for strong in strong_assets:
+                strong_stable = f"{strong}{stable}"
+                if strong_stable not in self.valid_symbols:
+                    continue
+                for alt in alt_assets:
+                    alt_stable = f"{alt}{stable}"
+                    alt_strong = f"{alt}{strong}"
+                    if (
+                        alt_stable in self.valid_symbols
+                        and alt_strong in self.valid_symbols
+                    ):
+                        legs = (alt_stable, alt_strong, strong_stable)
+                        self._add(alt, strong, stable, *legs)
+
+        self.symbols: List[str] = list(self._by_symbol)
+        self.symbol_ids: Dict[str, int] = {
+            symbol: i for i, symbol in enumerate(self.symbols)
+        }
+
+    @classmethod
+    def from_models(
+        cls,
+        top_volume_assets: Any,
+        valid_symbols: Any,
+        stable_assets: Iterable[str] = STABLE_ASSETS,
+        shard: Tuple[int, int] = (1, 1),
+    ) -> "TriangleIndex":
+        """Build the index from TopVolumeAssets and ValidSymbols models
+
+        Args:
+            top_volume_assets (Any): TopVolumeAssets instance
+            valid_symbols (Any): ValidSymbols instance
+            stable_assets (Iterable[str], optional): Stable assets.
+                Defaults to STABLE_ASSETS.
+            shard (Tuple[int, int], optional): Shard index and total.
+                Defaults to (1, 1).
+
+        Returns:
+            TriangleIndex: Triangles index
+        """
+        return cls(
+            alt_assets=top_volume_assets.assets,
+            valid_symbols=valid_symbols.symbols,
+            stable_assets=stable_assets,
+            shard=shard,
+        )
+
+    def _add(self, alt: str, strong: str, stable: str, *symbols: str) -> None:
+        triangle = Triangle(len(self.triangles), alt, strong, stable, *symbols)
+        self.triangles.append(triangle)
+        self._by_assets[(alt, strong, stable)] = triangle
+        for symbol in symbols:
+            self._by_symbol.setdefault(symbol, []).append(triangle)
+
+    def __len__(self) -> int:
+        return len(self.triangles)
+
+    def __iter__(self) -> Iterator[Triangle]:
+        return iter(self.triangles)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.symbol_ids
+
+    def get(self, alt: str, strong: str, stable: str) -> Optional[Triangle]:
+        return self._by_assets.get((alt, strong, stable), None)
+
+    def triangles_of(self, symbol: str) -> Sequence[Triangle]:
+        """Get triangles having `symbol` as a leg
+
+        Args:
+            symbol (str): Leg symbol
+
+        Returns:
+            Sequence[Triangle]: Triangles, empty if symbol is not a leg
+        """
+        return self._by_symbol.get(symbol, ())
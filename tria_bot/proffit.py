@@ -1,9 +1,49 @@
 import asyncio
+import multiprocessing
+import time
+from tria_bot.conf import settings
 from tria_bot.services.proffit import ProffitSvc
 
 
-async def main(strict: bool):
-    await ProffitSvc.start(strict=strict)
+async def main(strict: bool, event_driven: bool, shard: str):
+    await ProffitSvc.start(
+        strict=strict,
+        event_driven=event_driven,
+        shard=shard,
+    )
+
+
+def run(**kwargs) -> None:
+    asyncio.run(main(**kwargs))
+
+
+def supervise(workers: int, **kwargs) -> None:
+    """Run one shard process by worker on this host, restarting exited ones
+
+    Args:
+        workers (int): Shards (and processes) count
+    """
+    context = multiprocessing.get_context("spawn")
+
+    def spawn(index: int) -> multiprocessing.Process:
+        process = context.Process(
+            target=run,
+            kwargs={**kwargs, "shard": f"{index}/{workers}"},
+            name=f"proffit-{index}/{workers}",
+        )
+        process.start()
+        return process
+
+    processes = {index: spawn(index) for index in range(1, workers + 1)}
+    try:
+        while True:
+            time.sleep(settings.PROFFIT_WORKERS_CHECK_INTERVAL)
+            for index, process in list(processes.items()):
+                if not process.is_alive():
+                    processes[index] = spawn(index)
+    finally:
+        for process in processes.values():
+            process.terminate()
 
 
 if __name__ == "__main__":
@@ -17,4 +57,31 @@ if __name__ == "__main__":
         action=argparse.BooleanOptionalAction,
         help="Use gaps to calc proffits",
     )
-    asyncio.run(main(**vars(parser.parse_args())))
+    parser.add_argument(
+        "--event-driven",
+        type=bool,
+        default=settings.PROFFIT_EVENT_DRIVEN,
+        action=argparse.BooleanOptionalAction,
+        help="Re-evaluate only triangles of updated depths",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default="1/1",
+        help="Shard index / Total shards (triangles partitioned by alt)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Run every shard of this many in its own process",
+    )
+
+    args = vars(parser.parse_args())
+    workers = args.pop("workers")
+    if workers > 1:
+        args.pop("shard")
+        supervise(workers=workers, **args)
+    else:
+        run(**args)
@@ -0,0 +1,9 @@
+from typing import Tuple
+from pydantic import BaseModel
+
+
+class Cycle(BaseModel):
+    assets: Tuple[str, ...]
+    symbols: Tuple[str, ...]
+    sides: Tuple[str, ...]
+    value: float
@@ -19,5 +19,9 @@ class GapsMessage(RedisMessage):
     data: List[Dict[str, Any]]
 
 
+class CyclesMessage(RedisMessage):
+    data: List[Dict[str, Any]]
+
+
 class TopVolumeMessage(RedisMessage):
     data: Dict[str, Any]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import Optional, Tuple
 from pydantic import BaseModel
 
 
@@ -7,4 +7,8 @@ class Proffit(BaseModel):
     strong: str
     stable: str
     value: float
-    prices: Tuple[str, str, str]
\ No newline at end of file
+    prices: Tuple[str, str, str]
+    # biggest stable input filled by the books and its proffit (0 size if
+    # none, None if not sized); arbitrage skips 0 sizes
+    size: Optional[float] = None
+    size_value: Optional[float] = None
\ No newline at end of file
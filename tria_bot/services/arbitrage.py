@@ -51,7 +51,7 @@ class ArbitrageSvc(BaseSvc):
         self._tva_crud = TVACrud(conn=self._redis_conn)
         self._valid_symbols_crud = ValidSymbolsCRUD(conn=self._redis_conn)
         self._symbols_info_crud = SymbolsCRUD(conn=self._redis_conn)
-        self._depths_crud = DepthsCRUD(conn=self._redis_conn)
+        self._depths_crud = DepthsCRUD(conn=self._data_conn)
         self._tva = await self._get_top_volume_assets()
         self._valid_symbols = await self._get_valid_symbols()
         self._symbols_info = [s async for s in self._get_symbols_info()]
@@ -84,16 +84,17 @@ class ArbitrageSvc(BaseSvc):
     async def _get_symbols_info(
         self,
     ) -> AsyncGenerator[Tuple[str, Symbol], None]:
-        for pk in self._valid_symbols.symbols:
-            # symbol = await self._symbols_info_crud.get(pk)
-            # yield symbol.symbol, symbol
-            yield await self._symbols_info_crud.wait_for(pk)
+        # every symbol is read at once, waiting for missing ones
+        for symbol in await self._symbols_info_crud.wait_for_all(
+            self._valid_symbols.symbols
+        ):
+            yield symbol
 
     async def get_proffit(
         self,
     ) -> Union[ProffitMessage, MultiProffitMessage]:
         proffit = None
-        async with self._redis_conn.pubsub(
+        async with self._pubsub_conn.pubsub(
             ignore_subscribe_messages=True
         ) as ps:
             await ps.subscribe(
@@ -156,6 +157,9 @@ class ArbitrageSvc(BaseSvc):
 
         # 2. apply investment multiplier
         stable_use = round(stable_free * settings.INVESTMENT_MULTIPLIER, 8)
+        # don't invest more than current depths can fill with proffit
+        if proffit.size is not None:
+            stable_use = min(stable_use, round(proffit.size, 8))
 
         msg = "Buying {asset} with {qty} {stable} at {price}...".format(
             asset=proffit.alt,
@@ -225,8 +229,8 @@ class ArbitrageSvc(BaseSvc):
                 )
 
             self.logger.info("Refreshing price...")
-            depth = await self._depths_crud.get(symbol)
-            return await self._sell_alt(proffit=proffit, price=depth.asks[0][0])
+            book = await self._depths_crud.get_book(symbol)
+            return await self._sell_alt(proffit=proffit, price=book.ask())
 
     async def _sell_strong(
         self,
@@ -238,8 +242,8 @@ class ArbitrageSvc(BaseSvc):
 
         best_price = float(proffit.prices[2])
         if not price:
-            depth = await self._depths_crud.get(symbol)
-            best_price = max(float(depth.asks[0][0]), float(proffit.prices[2]))
+            book = await self._depths_crud.get_book(symbol)
+            best_price = max(book.ask(), best_price)
 
         msg = "Selling {qty} {asset} at {price}...".format(
             qty=available, asset=proffit.strong, price=price or best_price
@@ -269,10 +273,8 @@ class ArbitrageSvc(BaseSvc):
                 )
 
             self.logger.info("Refreshing price...")
-            depth = await self._depths_crud.get(symbol)
-            return await self._sell_strong(
-                proffit=proffit, price=depth.asks[0][0]
-            )
+            book = await self._depths_crud.get_book(symbol)
+            return await self._sell_strong(proffit=proffit, price=book.ask())
 
     async def _calc_proffit(
         self, first_order: Dict[str, Any], last_order: Dict[str, float]
@@ -290,7 +292,12 @@ class ArbitrageSvc(BaseSvc):
 
     async def arbitrate(self, proffit: Proffit) -> None:
         self.logger.info(f"Arbitrating with {proffit}")
-        
+        # not filled by the books above the minimum proffit (None = not
+        # sized, see PROFFIT_DEPTH_SIZE)
+        if proffit.size is not None and proffit.size <= 0:
+            self.logger.info("No executable size. Skipping arbitrage...")
+            return
+
         # 1. buy alt asset
         alt_buy_order = await self._buy_alt(proffit=proffit)
         if self._binance._is_order_canceled(order=alt_buy_order):
@@ -1,21 +1,42 @@
-from abc import ABC, abstractproperty
+from abc import ABC, abstractmethod, abstractproperty
 import asyncio
 import os
 from inspect import isawaitable
+from time import time_ns
 from typing import (
     Any,
     Generator,
     Generic,
     Optional,
+    Dict,
+    Sequence,
+    Tuple,
     Type,
+    Union,
     TypeVar,
 )
 from uuid import uuid1
 from binance import AsyncClient, BinanceSocketManager
 from binance.streams import ReconnectingWebsocket
 from pydantic import BaseModel
-from aredis_om import get_redis_connection, Migrator, RedisModel
+from aredis_om import Migrator, RedisModel
+from tria_bot.clients.websocket import (
+    AsyncWebsocket,
+    SocketClosedError,
+    SocketManager,
+)
+from tria_bot.conf import settings
+from tria_bot.crud.batch import (
+    BatchWriter,
+    RawRecord,
+    json_set_raw,
+    publish_updates,
+    record_pk,
+)
+from tria_bot.crud.connections import DATA, OM, PUBSUB, ConnectionManager
+from tria_bot.helpers.conflate import ConflatingQueue
 from tria_bot.helpers.utils import create_logger
+from tria_bot.services.supervisor import SocketSupervisor
 
 
 class SocketErrorDetail(BaseModel):
@@ -39,10 +60,17 @@ class BaseSvc():
             "redis_om_url",
             os.environ.get("REDIS_OM_URL"),
         )
+        self._connections = None
+        # metadata (OM), depths and tickers (data) and pub/sub clients
         self._redis_conn = None
+        self._data_conn = None
+        self._pubsub_conn = None
 
     async def __aenter__(self) -> "BaseSvc":
-        self._redis_conn = get_redis_connection(url=self._redis_url)
+        self._connections = ConnectionManager(urls={OM: self._redis_url})
+        self._redis_conn = self._connections.om
+        self._data_conn = self._connections.data
+        self._pubsub_conn = self._connections.pubsub
         return self
 
     async def __aexit__(
@@ -51,11 +79,18 @@ class BaseSvc():
         exc_val: Optional[Any] = None,
         exc_tb: Optional[Any] = None,
     ) -> None:
-        if self._redis_conn != None:
-            await self._redis_conn.close()
+        if self._connections != None:
+            await self._connections.close()
 
 
 class SocketBaseSvc(Generic[ModelType], ABC):
+    batch_writes: bool = settings.BATCH_WRITES
+    raw_ingest: bool = settings.RAW_INGEST
+    socket_transport: str = settings.SOCKET_TRANSPORT
+    conflate: bool = settings.SOCKET_CONFLATE
+    # channel to publish stored primary keys to (None = no publication)
+    updates_channel: Optional[str] = None
+
     @abstractproperty
     def model(self) -> Type[ModelType]:
         ...
@@ -71,19 +106,46 @@ class SocketBaseSvc(Generic[ModelType], ABC):
             "redis_om_url",
             os.environ.get("REDIS_OM_URL"),
         )
+        self._connections = None
+        # socket data (data role) and pub/sub clients
         self._redis_conn = None
+        self._pubsub_conn = None
         self._binance_client = None
         self._socket_manager = None
-        self._socket: Optional[ReconnectingWebsocket] = None
+        self._socket: Optional[
+            Union[AsyncWebsocket, ReconnectingWebsocket]
+        ] = None
+        self._writer: Optional[BatchWriter] = None
+        self._raw_keys: Dict[str, str] = {}
+        self._queue: Optional[ConflatingQueue] = None
+        self._drain_task: Optional[asyncio.Task] = None
+        self._supervisor: Optional[SocketSupervisor] = None
+        self._connected: bool = False
         self._is_running: bool = True
 
     async def __aenter__(self) -> "SocketBaseSvc":
         await Migrator().run()
-        self._redis_conn = get_redis_connection(url=self._redis_url)
+        self._connections = ConnectionManager(urls={OM: self._redis_url})
+        self._redis_conn = self._connections.data
+        self._pubsub_conn = self._connections.pubsub
         self.model.Meta.database = self._redis_conn
         self.model._meta.database = self._redis_conn
+        if self.batch_writes:
+            self._writer = BatchWriter.shared(
+                url=self._connections.urls[DATA],
+                pubsub_url=self._connections.urls[PUBSUB],
+            )
+        if self.conflate:
+            self._queue = ConflatingQueue(
+                maxsize=settings.SOCKET_CONFLATE_MAXSIZE
+            )
+            self._drain_task = asyncio.create_task(self._drain())
+        self._supervisor = SocketSupervisor.shared(url=self._redis_url)
         self._binance_client = await AsyncClient.create()
-        self._socket_manager = BinanceSocketManager(self._binance_client)
+        if self.socket_transport == "aiohttp":
+            self._socket_manager = SocketManager(tld=self._binance_client.tld)
+        else:
+            self._socket_manager = BinanceSocketManager(self._binance_client)
         self._socket_handler = getattr(
             self._socket_manager, self.socket_handler_name
         )
@@ -96,9 +158,37 @@ class SocketBaseSvc(Generic[ModelType], ABC):
         exc_tb: Optional[Any] = None,
     ) -> None:
         self.logger.info("Stopping service...")
-        await self._redis_conn.close()
+        if self._drain_task != None:
+            self._drain_task.cancel()
+            await asyncio.gather(self._drain_task, return_exceptions=True)
+            await self._write_pending(self._queue.get_nowait())
+            self.logger.info(
+                f"Superseded updates: {self._queue.superseded} "
+                f"{self._queue.superseded_by_key}"
+            )
+        if self._writer != None:
+            await self._writer.release()
+            self._writer = None
+        if self._supervisor != None:
+            await self._supervisor.release()
+            self._supervisor = None
+        await self._connections.close()
+        if isinstance(self._socket_manager, SocketManager):
+            await self._socket_manager.close()
         await self._binance_client.close_connection()
 
+    def recv_time(self) -> int:
+        """Local receive time (ms) of the last socket frame, or now"""
+        return (getattr(self._socket, "recv_time", 0) or time_ns()) // 1000000
+
+    def health_symbols(self) -> Sequence[str]:
+        """Symbols carried by the service socket, for the health table"""
+        return []
+
+    def _touch(self, symbol: str) -> None:
+        if self._supervisor != None:
+            self._supervisor.touch(symbol)
+
     def _model_or_raise(
         self,
         data: Any,
@@ -127,6 +217,31 @@ class SocketBaseSvc(Generic[ModelType], ABC):
         else:
             raise ValueError("Not supported data")
 
+    def _raw_key(self, pk: str) -> str:
+        key = self._raw_keys.get(pk, None)
+        if key is None:
+            key = self._raw_keys[pk] = self.model.make_primary_key(pk)
+        return key
+
+    @abstractmethod
+    def _raw_or_raise(self, data: Any) -> Generator[RawRecord, Any, None]:
+        """Build (key, JSON document) records without model validation,
+        used instead of `_model_or_raise` when `raw_ingest` is enabled
+
+        Documents must keep the model JSON layout, so they can be read
+        back with the model.
+
+        Args:
+            data (Any): Binance socket received data
+
+        Raises:
+            SocketError: If received data is an error
+
+        Yields:
+            Generator[RawRecord, Any, None]: Redis key and JSON document
+        """
+        ...
+
     async def callback(self, stream: Any) -> Any:
         """Save received stream from API and store in database
 
@@ -136,29 +251,139 @@ class SocketBaseSvc(Generic[ModelType], ABC):
         Returns:
             Any: Store result
         """
+        if self.raw_ingest:
+            return await self.store_raw(
+                records=list(self._raw_or_raise(data=stream))
+            )
+
         model_sequence = self._model_or_raise(data=stream)
-        return await self.model.add(models=list(model_sequence))
+        return await self.store(models=list(model_sequence))
+
+    async def store(self, models: Sequence[ModelType]) -> Sequence[ModelType]:
+        """Store models, conflated by key and batched if enabled
+
+        Args:
+            models (Sequence[ModelType]): Models to store
+
+        Returns:
+            Sequence[ModelType]: Stored (or queued) models
+        """
+        for model in models:
+            self._touch(model.symbol)
+        if self._queue != None:
+            for model in models:
+                self._queue.put(model.key(), model)
+            return models
+        return await self._write(models=models)
+
+    async def _write(self, models: Sequence[ModelType]) -> Sequence[ModelType]:
+        if self._writer != None:
+            return await self._writer.add(
+                models=models, channel=self.updates_channel
+            )
+        models = await self.model.add(models=models)
+        if self.updates_channel is not None:
+            await publish_updates(
+                self._pubsub_conn,
+                self.updates_channel,
+                {model.pk for model in models},
+            )
+        return models
+
+    async def store_raw(self, records: Sequence[RawRecord]) -> Sequence[RawRecord]:
+        """Store prebuilt (key, JSON document) records
+
+        Args:
+            records (Sequence[RawRecord]): Records to store
+
+        Returns:
+            Sequence[RawRecord]: Stored (or queued) records
+        """
+        for key, _ in records:
+            self._touch(key.rsplit(":", 1)[-1])
+        if self._queue != None:
+            for record in records:
+                self._queue.put(record[0], record)
+            return records
+        return await self._write_raw(records=records)
+
+    async def _write_raw(
+        self,
+        records: Sequence[RawRecord],
+    ) -> Sequence[RawRecord]:
+        if self._writer != None:
+            return await self._writer.add_raw(
+                records=records, channel=self.updates_channel
+            )
+
+        async with self._redis_conn.pipeline(transaction=False) as pipe:
+            for key, document in records:
+                json_set_raw(pipe, key, document)
+            await pipe.execute()
+        if self.updates_channel is not None:
+            # subscribers listen on the pub/sub server
+            await publish_updates(
+                self._pubsub_conn,
+                self.updates_channel,
+                {record_pk(record) for record in records},
+            )
+        return records
+
+    async def _write_pending(self, items: Sequence[Tuple[str, Any]]) -> None:
+        models = [item for _, item in items if not isinstance(item, tuple)]
+        records = [item for _, item in items if isinstance(item, tuple)]
+        if models:
+            await self._write(models=models)
+        if records:
+            await self._write_raw(records=records)
+
+    async def _drain(self) -> None:
+        """Write the latest pending update of every key, decoupled from
+        socket reads"""
+        while True:
+            items = await self._queue.get()
+            try:
+                await self._write_pending(items)
+            except Exception as err:
+                self.logger.error(f"Error writing {len(items)} updates: {err}")
 
     async def ws_subscribe(self, **params) -> None:
-        """Subscribe to a model socket and pass result to `self.callback`"""
-        self._socket: ReconnectingWebsocket = self._socket_handler(**params)
+        """Subscribe to a model socket and pass result to `self.callback`
+
+        Reconnects are owned by the process `SocketSupervisor` (backoff and
+        connection budget).
+        """
+        await self._supervisor.run(
+            symbols=self.health_symbols(),
+            connect=lambda: self._ws_receive(**params),
+            is_running=lambda: self._is_running,
+        )
+
+    async def _ws_receive(self, **params) -> None:
+        self._socket = self._socket_handler(**params)
         async with self._socket as ws:
             msg = "Connected to `{sn}`{opt}.".format(
                 sn=self.socket_handler_name,
                 opt=f" with {params}" if params else "",
             )
             self.logger.info(msg)
-            while self._is_running:
-                try:
-                    stream = await ws.recv()
-                    result = self.callback(stream=stream)
-                    if isawaitable(result):
-                        await result
-
-                    await asyncio.sleep(0.001)
-
-                except SocketError as err:
-                    # if self._is_running:
-                    self.logger.error(f"Socket error: {err}.\nReconnecting...")
-                    await asyncio.sleep(0.1)
-                    return await self.subscribe()
+            # data of a connected socket is current even without frames
+            self._connected = True
+            try:
+                while self._is_running:
+                    try:
+                        stream = await ws.recv()
+                        result = self.callback(stream=stream)
+                        if isawaitable(result):
+                            await result
+
+                        # let other sockets run without delaying this one
+                        await asyncio.sleep(0)
+
+                    except SocketError as err:
+                        # drop the connection, the supervisor reconnects it
+                        raise SocketClosedError(
+                            f"Socket error: {err}"
+                        ) from err
+            finally:
+                self._connected = False
@@ -5,13 +5,14 @@ from typing import Any, Dict, Generator, Optional, Sequence, Tuple
 from uuid import uuid1
 import orjson
 from pydantic import BaseModel
-from aredis_om import get_redis_connection, Migrator, NotFoundError
+from aredis_om import Migrator, NotFoundError
 from tria_bot.conf import settings
 from tria_bot.crud.composite import (
     TopVolumeAssetsCRUD,
     SymbolsCRUD,
     ValidSymbolsCRUD,
 )
+from tria_bot.crud.connections import OM, ConnectionManager
 from tria_bot.helpers.symbols import all_combos
 from tria_bot.helpers.utils import async_filter, create_logger
 from tria_bot.models.composite import TopVolumeAssets, Symbol, ValidSymbols
@@ -43,7 +44,9 @@ class CompositeSvc:
             "redis_om_url",
             os.environ.get("REDIS_OM_URL"),
         )
+        self._connections = None
         self._redis_conn = None
+        self._pubsub_conn = None
         self._composite_client = None
         self._is_running: bool = True
         self._tva_crud = None
@@ -54,7 +57,9 @@ class CompositeSvc:
 
     async def __aenter__(self) -> "CompositeSvc":
         await Migrator().run()
-        self._redis_conn = get_redis_connection(url=self._redis_url)
+        self._connections = ConnectionManager(urls={OM: self._redis_url})
+        self._redis_conn = self._connections.om
+        self._pubsub_conn = self._connections.pubsub
         self._tva_crud = TopVolumeAssetsCRUD(conn=self._redis_conn)
         self._valid_symbols_crud = ValidSymbolsCRUD(conn=self._redis_conn)
         self._symbols_crud = SymbolsCRUD(conn=self._redis_conn)
@@ -69,7 +74,7 @@ class CompositeSvc:
         exc_val: Optional[Any] = None,
         exc_tb: Optional[Any] = None,
     ) -> None:
-        await self._redis_conn.close()
+        await self._connections.close()
 
     async def get_valid_symbols(self):
         async with BinanceClient() as client:
@@ -106,7 +111,7 @@ class CompositeSvc:
                 "new": new
             }
         )
-        await self._redis_conn.publish(
+        await self._pubsub_conn.publish(
             settings.PUBSUB_TOP_VOLUME_CHANNEL,
             orjson.dumps(data.model_dump()),
         )
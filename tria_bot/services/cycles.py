@@ -0,0 +1,166 @@
+import asyncio
+import time
+from typing import List, Set
+import orjson
+from tria_bot.conf import settings
+from tria_bot.crud.composite import SymbolsCRUD, ValidSymbolsCRUD
+from tria_bot.crud.depths import DepthsCRUD
+from tria_bot.helpers.graph import SymbolGraph
+from tria_bot.models.composite import ValidSymbols
+from tria_bot.schemas.cycle import Cycle
+from tria_bot.schemas.message import CyclesMessage
+from tria_bot.services.base import BaseSvc
+from aredis_om import Migrator
+
+
+class CyclesSvc(BaseSvc):
+    """Detect profitable cycles of up to `max_length` legs over every valid
+    symbol, re-evaluating only cycles through updated depths"""
+
+    valid_symbols_model = ValidSymbols
+    fee_mult = 1 - settings.EXCHANGE_FEE
+    min_proffit_detect = settings.MIN_PROFFIT_DETECT
+    max_length = settings.CYCLES_MAX_LENGTH
+    calc_index = settings.PROFFIT_INDEX
+    max_eval_rate = settings.PROFFIT_MAX_EVAL_RATE
+    proffit_percent_format = settings.PROFFIT_PERCENT_FORMAT
+    cycles_channel = settings.PUBSUB_CYCLES_CHANNEL
+    cycles_event = "cycles-detected"
+    depth_updates_channel = settings.PUBSUB_DEPTH_UPDATES_CHANNEL
+    top_volume_channel = settings.PUBSUB_TOP_VOLUME_CHANNEL
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._valid_symbols_crud = None
+        self._symbols_info_crud = None
+        self._depths_crud = None
+        self._valid_symbols = None
+        self._graph = None
+        self._updated_symbols: Set[str] = set()
+        self._updated_event = asyncio.Event()
+        self._is_running = True
+
+    async def __aenter__(self) -> "CyclesSvc":
+        await super().__aenter__()
+        await Migrator().run()
+        self._valid_symbols_crud = ValidSymbolsCRUD(conn=self._redis_conn)
+        self._symbols_info_crud = SymbolsCRUD(conn=self._redis_conn)
+        self._depths_crud = DepthsCRUD(conn=self._data_conn)
+        self._valid_symbols = await self._valid_symbols_crud.wait_for(
+            self.valid_symbols_model.Meta.PK_VALUE
+        )
+        symbols_info = await self._symbols_info_crud.wait_for_all(
+            self._valid_symbols.symbols
+        )
+        self._graph = SymbolGraph.from_models(
+            symbols=symbols_info,
+            valid_symbols=self._valid_symbols.symbols,
+            fee_mult=self.fee_mult,
+            max_length=self.max_length,
+            calc_index=self.calc_index,
+        )
+        self.logger.info(
+            f"{len(self._graph)} cycles of up to {self.max_length} legs "
+            f"over {len(self._graph.symbols)} symbols"
+        )
+        return self
+
+    def _cycles(self, results) -> List[Cycle]:
+        return [
+            Cycle(**self._graph.cycle(cycle_id)._asdict(), value=proffit)
+            for cycle_id, proffit in results
+        ]
+
+    async def calc_cycles(self, symbols: List[str]) -> List[Cycle]:
+        """Read books of `symbols` and evaluate the cycles through them
+
+        Args:
+            symbols (List[str]): Updated symbols
+
+        Returns:
+            List[Cycle]: Cycles above the minimum proffit
+        """
+        books = await self._depths_crud.get_books(symbols)
+        ids = self._graph.update_many(books)
+        return self._cycles(
+            self._graph.profitable(
+                min_proffit=self.min_proffit_detect,
+                ids=ids,
+                percent=self.proffit_percent_format,
+            )
+        )
+
+    async def publish_cycles(self, cycles: List[Cycle]) -> None:
+        msg = CyclesMessage(
+            event=self.cycles_event, data=[c.model_dump() for c in cycles]
+        )
+        await self._pubsub_conn.publish(
+            self.cycles_channel, orjson.dumps(msg.model_dump())
+        )
+
+    async def updates_subscribe(self) -> None:
+        """Collect updated symbols published by depth services"""
+        async with self._pubsub_conn.pubsub(
+            ignore_subscribe_messages=True
+        ) as ps:
+            await ps.subscribe(self.depth_updates_channel)
+            self.logger.info(f"Subscribed to {self.depth_updates_channel}")
+            while self._is_running:
+                msg = await ps.get_message(timeout=1.0)
+                if msg is None:
+                    continue
+                self._updated_symbols.update(
+                    s
+                    for s in orjson.loads(msg["data"])
+                    if s in self._graph.symbol_ids
+                )
+                if self._updated_symbols:
+                    self._updated_event.set()
+            await ps.unsubscribe()
+
+    async def ps_subscribe(self) -> None:
+        async with self._pubsub_conn.pubsub(
+            ignore_subscribe_messages=True
+        ) as ps:
+            await ps.subscribe(self.top_volume_channel)
+            self.logger.info(f"Subscribed to {self.top_volume_channel}")
+            async for msg in ps.listen():
+                if msg != None:
+                    self.logger.info("Top Volume Assets has changed")
+                    self._is_running = False
+                    await ps.unsubscribe()
+                    break
+
+    async def cycles_loop(self) -> None:
+        """Evaluate cycles of updated symbols, at most `max_eval_rate`
+        times by second (updates between evaluations are merged)"""
+        # a first pass loads every symbol price in the graph
+        cycles = await self.calc_cycles(symbols=list(self._graph.symbols))
+        if cycles:
+            await self.publish_cycles(cycles=cycles)
+
+        min_interval = 1 / self.max_eval_rate if self.max_eval_rate else 0.0
+        while self._is_running:
+            try:
+                await asyncio.wait_for(self._updated_event.wait(), 1.0)
+            except asyncio.TimeoutError:
+                continue
+
+            start = time.monotonic()
+            self._updated_event.clear()
+            symbols, self._updated_symbols = self._updated_symbols, set()
+            cycles = await self.calc_cycles(symbols=list(symbols))
+            if cycles:
+                await self.publish_cycles(cycles=cycles)
+            await asyncio.sleep(min_interval - (time.monotonic() - start))
+
+    @classmethod
+    async def start(cls) -> None:
+        while True:
+            async with cls() as svc:
+                svc.logger.info("Starting service...")
+                await asyncio.gather(
+                    svc.cycles_loop(),
+                    svc.updates_subscribe(),
+                    svc.ps_subscribe(),
+                )
@@ -1,10 +1,17 @@
 import asyncio
-from time import time_ns
-from typing import Any, Generator, Iterable, List
+import time
+import orjson
+from aiohttp import ClientError
+from binance.exceptions import BinanceAPIException, BinanceRequestException
+from typing import Any, Dict, Generator, Iterable, List, Sequence, Set
+from tria_bot.clients.websocket import AsyncWebsocket, SocketClosedError
+from tria_bot.crud.activity import SymbolActivityCRUD
 from tria_bot.crud.composite import ValidSymbolsCRUD
+from tria_bot.helpers.book import OrderBook, OrderBookGapError
 from tria_bot.models.composite import ValidSymbols
 from tria_bot.models.depth import Depth
-from tria_bot.services.base import SocketBaseSvc
+from tria_bot.crud.batch import RawRecord, publish_updates
+from tria_bot.services.base import SocketBaseSvc, SocketError
 from tria_bot.conf import settings
 
 
@@ -12,26 +19,127 @@ class DepthSvc(SocketBaseSvc[Depth]):
     model = Depth
     socket_handler_name = "depth_socket"
     top_volume_channel = settings.PUBSUB_TOP_VOLUME_CHANNEL
+    updates_channel = (
+        settings.PUBSUB_DEPTH_UPDATES_CHANNEL
+        if settings.DEPTH_PUBLISH_UPDATES
+        else None
+    )
+    refresh_interval = settings.DEPTH_REFRESH_INTERVAL
     # valid_sybols_model = ValidSymbols
 
     def __init__(self, *args, symbol: str, **kwargs) -> None:
         super().__init__(*args, **kwargs)
         self.symbol = symbol
+        # last store (monotonic seconds) by symbol
+        self._stored_at: Dict[str, float] = {}
 
     async def __aenter__(self) -> "DepthSvc":
         return await super().__aenter__()
 
+    def health_symbols(self) -> Sequence[str]:
+        return [self.symbol]
+
+    def _touch(self, symbol: str) -> None:
+        super()._touch(symbol)
+        self._stored_at[symbol] = time.monotonic()
+
+    def _live_symbols(self) -> Sequence[str]:
+        """Symbols whose stored book is current while connected"""
+        return self.health_symbols()
+
+    async def refresh(self) -> List[str]:
+        """Set a new event time on books not stored for `refresh_interval`
+
+        Streams only push changes, so while the socket is connected and
+        receiving frames (of any stream, within `refresh_interval`) an
+        unchanged book is still the current one. Refreshed symbols are
+        published as updates, so event driven proffits see the new time.
+
+        Returns:
+            List[str]: Refreshed symbols
+        """
+        # real last frame time, a stalled socket is not live
+        now_ms = time.time_ns() // 1000000
+        last_frame = getattr(self._socket, "recv_time", 0) // 1000000
+        if (
+            not self._connected
+            or now_ms - last_frame > self.refresh_interval * 1000
+        ):
+            return []
+        now = time.monotonic()
+        symbols = [
+            symbol
+            for symbol in self._live_symbols()
+            if now - self._stored_at.get(symbol, now) >= self.refresh_interval
+        ]
+        if not symbols:
+            return []
+
+        async with self._redis_conn.pipeline(transaction=False) as pipe:
+            for symbol in symbols:
+                key = self._raw_key(symbol)
+                pipe.execute_command("JSON.SET", key, "$.event_time", now_ms)
+            # books deleted meanwhile can't be refreshed
+            await pipe.execute(raise_on_error=False)
+        if self.updates_channel is not None:
+            await publish_updates(
+                self._pubsub_conn, self.updates_channel, set(symbols)
+            )
+        for symbol in symbols:
+            self._stored_at[symbol] = now
+        return symbols
+
+    async def refresh_loop(self) -> None:
+        if not self.refresh_interval:
+            return
+        while self._is_running:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as err:
+                self.logger.error(f"Error refreshing depths: {err}")
+
+    def _depth_data(self, data: Any, symbol: str) -> Any:
+        return {**data, "symbol": symbol, "event_time": self.recv_time()}
+
     def _model_or_raise(self, data: Any) -> Generator[Depth, Any, None]:
         return super()._model_or_raise(
-            data={
-                **data,
-                "symbol": self.symbol,
-                "event_time": int(time_ns() / 1000000),
+            data=self._depth_data(data=data, symbol=self.symbol)
+        )
+
+    def _raw_depth(self, data: Any, symbol: str) -> RawRecord:
+        """Build a Depth JSON document straight from socket data
+
+        Args:
+            data (Any): Depth payload with `bids` and `asks` keys
+            symbol (str): Depth symbol
+
+        Raises:
+            SocketError: If payload is not a depth
+
+        Returns:
+            RawRecord: Depth key and JSON document
+        """
+        try:
+            bids, asks = data["bids"], data["asks"]
+        except (KeyError, TypeError):
+            raise SocketError(data)
+
+        document = orjson.dumps(
+            {
+                "symbol": symbol,
+                "bids": bids,
+                "asks": asks,
+                "event_time": self.recv_time(),
             }
         )
+        return self._raw_key(symbol), document
+
+    def _raw_or_raise(self, data: Any) -> Generator[RawRecord, Any, None]:
+        yield self._raw_depth(data=data, symbol=self.symbol)
 
     async def ps_subscribe(self):
-        async with self._redis_conn.pubsub(
+        async with self._pubsub_conn.pubsub(
             ignore_subscribe_messages=True
         ) as ps:
             await ps.subscribe(self.top_volume_channel)
@@ -43,19 +151,26 @@ class DepthSvc(SocketBaseSvc[Depth]):
                     await ps.unsubscribe()
                     break
 
+    def socket_params(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "depth": self._socket_manager.WEBSOCKET_DEPTH_5,
+            "interval": 100,
+        }
+
     async def ws_subscribe(self) -> None:
         # self._socket_manager.depth_socket()
-        return await super().ws_subscribe(
-            symbol=self.symbol,
-            depth=self._socket_manager.WEBSOCKET_DEPTH_5,
-            interval=100,
-        )
+        return await super().ws_subscribe(**self.socket_params())
 
     @classmethod
     async def subscribe(cls, symbol: str) -> Any:
         while True:
             async with cls(symbol=symbol) as ts:
-                await asyncio.gather(ts.ws_subscribe(), ts.ps_subscribe())
+                await asyncio.gather(
+                    ts.ws_subscribe(),
+                    ts.ps_subscribe(),
+                    ts.refresh_loop(),
+                )
 
     @classmethod
     async def _get_valid_symbols(cls) -> ValidSymbols:
@@ -85,3 +200,447 @@ class DepthSvc(SocketBaseSvc[Depth]):
             return
 
         await cls.multi_subscribe(symbols=symbols)
+
+
+class MultiplexDepthSvc(DepthSvc):
+    """Depth service carrying many symbols over one combined-stream socket.
+
+    Binance wraps every combined-stream event as
+    `{"stream": "<symbol>@depth5@100ms", "data": <payload>}`, so received
+    data is dispatched to its symbol by the stream name.
+    """
+
+    socket_handler_name = "multiplex_socket"
+    stream_format = "{symbol}@depth{depth}@{interval}ms"
+    depth = 5
+    interval = 100
+
+    def __init__(self, *args, symbols: Sequence[str], **kwargs) -> None:
+        super().__init__(*args, symbol=None, **kwargs)
+        self.symbols = list(symbols)
+        self._streams = dict(self._map_streams(self.symbols))
+
+    def health_symbols(self) -> Sequence[str]:
+        return self.symbols
+
+    @classmethod
+    def _map_streams(cls, symbols: Iterable[str]):
+        for symbol in symbols:
+            stream = cls.stream_format.format(
+                symbol=symbol.lower(),
+                depth=cls.depth,
+                interval=cls.interval,
+            )
+            yield stream, symbol
+
+    def _model_or_raise(self, data: Any) -> Generator[Depth, Any, None]:
+        """Unwrap a combined-stream event and build its symbol Depth
+
+        Args:
+            data (Any): Combined-stream event with `stream` and `data` keys
+
+        Raises:
+            SocketError: If the event does not belong to a subscribed stream
+
+        Returns:
+            Generator[Depth, Any, None]: Depth instance
+        """
+        symbol = self._streams.get(data.get("stream", None), None)
+        if symbol is None:
+            raise SocketError(data)
+
+        return super(DepthSvc, self)._model_or_raise(
+            data=self._depth_data(data=data.get("data", {}), symbol=symbol)
+        )
+
+    def _raw_or_raise(self, data: Any) -> Generator[RawRecord, Any, None]:
+        symbol = self._streams.get(data.get("stream", None), None)
+        if symbol is None:
+            raise SocketError(data)
+
+        yield self._raw_depth(data=data.get("data", None), symbol=symbol)
+
+    def socket_params(self) -> Dict[str, Any]:
+        return {"streams": list(self._streams)}
+
+    @classmethod
+    async def subscribe(cls, symbols: Sequence[str]) -> Any:
+        while True:
+            async with cls(symbols=symbols) as ts:
+                ts.logger.info(f"Multiplexing {len(symbols)} depth streams")
+                await asyncio.gather(
+                    ts.ws_subscribe(),
+                    ts.ps_subscribe(),
+                    ts.refresh_loop(),
+                )
+
+    @staticmethod
+    def _chunks(
+        symbols: Sequence[str],
+        size: int,
+    ) -> Generator[Sequence[str], Any, None]:
+        for i in range(0, len(symbols), size):
+            yield symbols[i : i + size]
+
+    @classmethod
+    async def multi_subscribe(
+        cls,
+        symbols: Sequence[str],
+        per_socket: int = settings.DEPTH_SYMBOLS_PER_SOCKET,
+    ) -> None:
+        chunks = cls._chunks(symbols=list(symbols), size=max(per_socket, 1))
+        tasks = [cls.subscribe(chunk) for chunk in chunks]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @classmethod
+    async def start(
+        cls,
+        splitter: str,
+        per_socket: int = settings.DEPTH_SYMBOLS_PER_SOCKET,
+    ):
+        symbols = await cls._get_symbols(splitter)
+        if not symbols:
+            return
+
+        await cls.multi_subscribe(symbols=symbols, per_socket=per_socket)
+
+
+class BookTickerSvc(MultiplexDepthSvc):
+    """Top of book service on real time `<symbol>@bookTicker` streams
+
+    Best bid/ask changes are pushed without the 100ms depth throttle and
+    stored in the Depth keys as one level books, so proffit calcs read
+    them unchanged. Only level 0 exists, it must not run together with
+    another depth service nor with `PROFFIT_INDEX` > 0.
+    """
+
+    stream_format = "{symbol}@bookTicker"
+
+    def _ticker_depth(self, data: Any) -> Dict[str, Any]:
+        """Map a bookTicker payload to a one level depth payload
+
+        Args:
+            data (Any): Payload with `b`, `B`, `a` and `A` keys
+
+        Raises:
+            SocketError: If payload is not a book ticker
+
+        Returns:
+            Dict[str, Any]: Depth payload with `bids` and `asks` keys
+        """
+        try:
+            return {
+                "bids": [(data["b"], data["B"])],
+                "asks": [(data["a"], data["A"])],
+            }
+        except (KeyError, TypeError):
+            raise SocketError(data)
+
+    def _model_or_raise(self, data: Any) -> Generator[Depth, Any, None]:
+        symbol = self._streams.get(data.get("stream", None), None)
+        if symbol is None:
+            raise SocketError(data)
+
+        depth = self._ticker_depth(data=data.get("data", None))
+        return super(DepthSvc, self)._model_or_raise(
+            data=self._depth_data(data=depth, symbol=symbol)
+        )
+
+    def _raw_or_raise(self, data: Any) -> Generator[RawRecord, Any, None]:
+        symbol = self._streams.get(data.get("stream", None), None)
+        if symbol is None:
+            raise SocketError(data)
+
+        depth = self._ticker_depth(data=data.get("data", None))
+        yield self._raw_depth(data=depth, symbol=symbol)
+
+    @classmethod
+    async def start(
+        cls,
+        splitter: str,
+        per_socket: int = settings.DEPTH_SYMBOLS_PER_SOCKET,
+    ):
+        if settings.PROFFIT_INDEX > 0:
+            raise ValueError("bookTicker books only have level 0")
+        return await super().start(splitter=splitter, per_socket=per_socket)
+
+
+class TieredDepthSvc(MultiplexDepthSvc):
+    """Depth service spending fast, deep streams only on active symbols
+
+    Symbols with recent opportunity activity (see `SymbolActivityCRUD`)
+    take the hot stream, the rest the cold one. Tiers are re-evaluated
+    every `tier_interval` seconds and moved with live SUBSCRIBE and
+    UNSUBSCRIBE requests, without restarting the socket.
+    """
+
+    hot_stream = settings.DEPTH_HOT_STREAM
+    cold_stream = settings.DEPTH_COLD_STREAM
+    tier_interval = settings.DEPTH_TIER_INTERVAL
+
+    def __init__(self, *args, symbols: Sequence[str], **kwargs) -> None:
+        super().__init__(*args, symbols=symbols, **kwargs)
+        # both tiers are mapped, late events of a moved stream are valid
+        self._streams = {
+            self._stream(symbol, hot=hot): symbol
+            for symbol in self.symbols
+            for hot in (True, False)
+        }
+        self._hot: Set[str] = set()
+        self._activity_crud = None
+        self._request_id = 0
+        self._retier = False
+
+    async def __aenter__(self) -> "TieredDepthSvc":
+        await super().__aenter__()
+        self._activity_crud = SymbolActivityCRUD(conn=self._connections.om)
+        self._hot = await self._hot_symbols()
+        return self
+
+    def _stream(self, symbol: str, hot: bool) -> str:
+        stream_format = self.hot_stream if hot else self.cold_stream
+        return stream_format.format(symbol=symbol.lower())
+
+    async def _hot_symbols(self) -> Set[str]:
+        return set(self.symbols) & await self._activity_crud.hot()
+
+    def socket_params(self) -> Dict[str, Any]:
+        return {
+            "streams": [
+                self._stream(symbol, hot=symbol in self._hot)
+                for symbol in self.symbols
+            ]
+        }
+
+    async def ws_subscribe(self) -> None:
+        # streams are taken on every (re)connect, so they follow the tiers
+        await self._supervisor.run(
+            symbols=self.health_symbols(),
+            connect=lambda: self._ws_receive(**self.socket_params()),
+            is_running=lambda: self._is_running,
+        )
+
+    async def _send(self, method: str, streams: Sequence[str]) -> None:
+        self._request_id += 1
+        await self._socket.send(
+            {"method": method, "params": streams, "id": self._request_id}
+        )
+
+    async def _apply_tiers(self, hot: Set[str]) -> None:
+        """Move symbols whose tier changed to their new stream
+
+        Args:
+            hot (Set[str]): Symbols of the hot tier
+        """
+        promoted, demoted = hot - self._hot, self._hot - hot
+        if not promoted and not demoted:
+            return
+
+        self.logger.info(
+            f"Depth tiers changed: {len(promoted)} promoted, "
+            f"{len(demoted)} demoted ({len(hot)} hot)"
+        )
+        subscribe = [self._stream(s, hot=True) for s in promoted]
+        subscribe.extend(self._stream(s, hot=False) for s in demoted)
+        unsubscribe = [self._stream(s, hot=False) for s in promoted]
+        unsubscribe.extend(self._stream(s, hot=True) for s in demoted)
+        self._hot = hot
+        if self._socket is None:
+            return
+        if not isinstance(self._socket, AsyncWebsocket):
+            # python-binance sockets resubscribe their own streams on
+            # reconnect, so reconnect with the new tiers instead
+            self._retier = True
+            return
+
+        # subscribe first, so moved symbols never miss updates
+        await self._send("SUBSCRIBE", subscribe)
+        await self._send("UNSUBSCRIBE", unsubscribe)
+
+    async def tier_loop(self) -> None:
+        while self._is_running:
+            await asyncio.sleep(self.tier_interval)
+            try:
+                await self._apply_tiers(hot=await self._hot_symbols())
+            except Exception as err:
+                self.logger.error(f"Error updating depth tiers: {err}")
+
+    async def callback(self, stream: Any) -> Any:
+        """Store a depth event, skipping (un)subscribe responses
+
+        Args:
+            stream (Any): Combined-stream event or request response
+
+        Raises:
+            SocketError: If a (un)subscribe request failed
+            SocketClosedError: If tiers changed on a python-binance socket
+
+        Returns:
+            Any: Store result
+        """
+        if self._retier:
+            self._retier = False
+            raise SocketClosedError("Depth tiers changed")
+        if "stream" not in stream and "id" in stream:
+            if "error" in stream:
+                raise SocketError(stream)
+            return
+
+        return await super().callback(stream=stream)
+
+    @classmethod
+    async def subscribe(cls, symbols: Sequence[str]) -> Any:
+        while True:
+            async with cls(symbols=symbols) as ts:
+                ts.logger.info(
+                    f"Multiplexing {len(symbols)} tiered depth streams "
+                    f"({len(ts._hot)} hot)"
+                )
+                await asyncio.gather(
+                    ts.ws_subscribe(),
+                    ts.ps_subscribe(),
+                    ts.tier_loop(),
+                    ts.refresh_loop(),
+                )
+
+
+class DiffDepthSvc(MultiplexDepthSvc):
+    """Depth service keeping local full order books from diff-depth streams
+
+    Every book starts from a REST `/depth` snapshot and is updated with
+    `<symbol>@depth@100ms` deltas. A sequence gap resets the book and
+    triggers a new snapshot. Only the top `export_levels` are stored.
+    """
+
+    stream_format = "{symbol}@depth@{interval}ms"
+    snapshot_limit = settings.DEPTH_SNAPSHOT_LIMIT
+    export_levels = settings.DEPTH_EXPORT_LEVELS
+    resync_wait = 1.0
+    snapshot_base_delay = settings.DEPTH_SNAPSHOT_RETRY_BASE_DELAY
+    snapshot_max_delay = settings.DEPTH_SNAPSHOT_RETRY_MAX_DELAY
+    snapshot_errors = (
+        BinanceAPIException,
+        BinanceRequestException,
+        ClientError,
+        asyncio.TimeoutError,
+    )
+
+    def __init__(self, *args, symbols: Sequence[str], **kwargs) -> None:
+        super().__init__(*args, symbols=symbols, **kwargs)
+        self._books = {s: OrderBook(symbol=s) for s in self.symbols}
+        self._sync_tasks: Dict[str, asyncio.Task] = {}
+
+    def _live_symbols(self) -> Sequence[str]:
+        # books waiting for a snapshot are not current
+        return [s for s, book in self._books.items() if book.is_synced]
+
+    async def __aexit__(self, *args, **kwargs) -> None:
+        for task in self._sync_tasks.values():
+            task.cancel()
+        return await super().__aexit__(*args, **kwargs)
+
+    async def _store_book(self, book: OrderBook) -> Any:
+        if self.raw_ingest:
+            data = book.export(levels=self.export_levels)
+            return await self.store_raw(
+                records=[self._raw_depth(data=data, symbol=book.symbol)]
+            )
+        return await self.store(models=[self._book_model(book)])
+
+    def _book_model(self, book: OrderBook) -> Depth:
+        return self.model(
+            **self._depth_data(
+                data=book.export(levels=self.export_levels),
+                symbol=book.symbol,
+            )
+        )
+
+    def _snapshot_delay(self, err: Exception, attempt: int) -> float:
+        delay = min(
+            self.snapshot_max_delay,
+            self.snapshot_base_delay * 2**attempt,
+        )
+        # rate limited (429) or banned (418): wait what the server asks
+        response = getattr(err, "response", None)
+        retry_after = getattr(response, "headers", {}).get("Retry-After")
+        if retry_after is not None:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    async def _sync(self, book: OrderBook) -> None:
+        """Load snapshots until buffered events follow one of them
+
+        Failed snapshot requests are retried with exponential backoff, so
+        a rate limited or unreachable API is not hammered by every diff.
+
+        Args:
+            book (OrderBook): Book to synchronize
+        """
+        attempt = 0
+        while not book.is_synced:
+            try:
+                snapshot = await self._binance_client.get_order_book(
+                    symbol=book.symbol,
+                    limit=self.snapshot_limit,
+                )
+            except self.snapshot_errors as err:
+                delay = self._snapshot_delay(err=err, attempt=attempt)
+                attempt += 1
+                self.logger.error(
+                    f"{book.symbol} snapshot failed: {err!r}. "
+                    f"Retrying in {delay:.1f}s..."
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            attempt = 0
+            try:
+                book.load_snapshot(snapshot=snapshot)
+            except OrderBookGapError as err:
+                self.logger.warning(f"{err}. Retrying snapshot...")
+                await asyncio.sleep(self.resync_wait)
+
+        self.logger.info(f"{book.symbol} order book synced")
+        await self._store_book(book=book)
+
+    def _ensure_sync(self, book: OrderBook) -> None:
+        task = self._sync_tasks.get(book.symbol, None)
+        if task is None or task.done():
+            self._sync_tasks[book.symbol] = asyncio.create_task(
+                self._sync(book=book)
+            )
+
+    async def callback(self, stream: Any) -> Any:
+        """Apply a diff-depth event to its book and store the top levels
+
+        Args:
+            stream (Any): Combined-stream diff-depth event
+
+        Raises:
+            SocketError: If the event does not belong to a subscribed stream
+
+        Returns:
+            Any: Store result
+        """
+        symbol = self._streams.get(stream.get("stream", None), None)
+        if symbol is None:
+            raise SocketError(stream)
+
+        book = self._books[symbol]
+        event = stream.get("data", {})
+        try:
+            changed = book.apply(event)
+        except OrderBookGapError as err:
+            self.logger.warning(f"{err}. Resyncing...")
+            book.reset()
+            changed = book.apply(event)
+
+        if not book.is_synced:
+            self._ensure_sync(book=book)
+        if not changed:
+            return
+
+        return await self._store_book(book=book)
@@ -1,9 +1,9 @@
 import asyncio
-from typing import Sequence
+from typing import Dict, Sequence
 
 import orjson
 from tria_bot.conf import settings
-from tria_bot.helpers.symbols import all_combos, STRONG_ASSETS
+from tria_bot.helpers.symbols import TriangleIndex
 from tria_bot.helpers.utils import async_filter
 from tria_bot.models.composite import TopVolumeAssets, ValidSymbols
 
@@ -16,9 +16,10 @@ from tria_bot.crud.composite import (
     TopVolumeAssetsCRUD as TVACrud,
     ValidSymbolsCRUD as VSCrud,
 )
+from tria_bot.crud.activity import SymbolActivityCRUD
 from tria_bot.crud.tickers import TickersCRUD
 from tria_bot.crud.gaps import GapsCRUD
-from aredis_om import NotFoundError, Migrator
+from aredis_om import Migrator
 
 
 class GapCalculatorSvc(BaseSvc):
@@ -39,6 +40,8 @@ class GapCalculatorSvc(BaseSvc):
         # self._gaps_crud = None
         self._valid_symbols_crud = None
         self._valid_symbols = None
+        self._index = None
+        self._activity_crud = None
 
         self._is_running = True
 
@@ -46,11 +49,17 @@ class GapCalculatorSvc(BaseSvc):
         await super().__aenter__()
         await Migrator().run()
         self._tva_crud = TVACrud(conn=self._redis_conn)
-        self._tickers_crud = TickersCRUD(conn=self._redis_conn)
+        self._tickers_crud = TickersCRUD(conn=self._data_conn)
         # self._gaps_crud = GapsCRUD(conn=self._redis_conn)
         self._valid_symbols_crud = VSCrud(conn=self._redis_conn)
+        self._activity_crud = SymbolActivityCRUD(conn=self._redis_conn)
         self._tva = await self._get_top_volume_assets()
         self._valid_symbols = await self._get_valid_symbols()
+        self._index = TriangleIndex.from_models(
+            top_volume_assets=self._tva,
+            valid_symbols=self._valid_symbols,
+            stable_assets=(self.stable,),
+        )
 
         return self
 
@@ -63,7 +72,7 @@ class GapCalculatorSvc(BaseSvc):
         )
 
     async def ps_subscribe(self):
-        async with self._redis_conn.pubsub(
+        async with self._pubsub_conn.pubsub(
             ignore_subscribe_messages=True
         ) as ps:
             await ps.subscribe(self.top_volume_channel)
@@ -76,30 +85,27 @@ class GapCalculatorSvc(BaseSvc):
                     break
 
     async def calc_gaps(self):
-        for alt in self._tva.assets:
-            try:
-                alt_stable_symbol = f"{alt}{self.stable}"
-                if alt_stable_symbol not in self._valid_symbols.symbols:
-                    continue
-
-                stable = await self._tickers_crud.get(alt_stable_symbol)
-                stable_pcp = float(stable.price_change_percent)
-
-                for stg in STRONG_ASSETS:
-                    alt_strong_symbol = f"{alt}{stg}"
-                    if alt_stable_symbol not in self._valid_symbols.symbols:
-                        continue
-                    strong = await self._tickers_crud.get(alt_strong_symbol)
-                    strong_pcp = float(strong.price_change_percent)
-                    yield self.gap_model(
-                        # assets=f"{alt}-{stg}-{self.stable}",
-                        alt=alt,
-                        strong=stg,
-                        stable=self.stable,
-                        value=round(strong_pcp - stable_pcp, 2),
-                    )
-            except NotFoundError:
-                pass
+        # every ticker is read at once by cycle
+        symbols = self._index.symbols
+        tickers = await self._tickers_crud.get_many(symbols)
+        pcps: Dict[str, float] = {
+            symbol: float(ticker.price_change_percent)
+            for symbol, ticker in zip(symbols, tickers)
+            if ticker is not None
+        }
+        for triangle in self._index:
+            stable_pcp = pcps.get(triangle.alt_stable, None)
+            strong_pcp = pcps.get(triangle.alt_strong, None)
+            if stable_pcp is None or strong_pcp is None:
+                continue
+
+            yield self.gap_model(
+                # assets=f"{alt}-{stg}-{self.stable}",
+                alt=triangle.alt,
+                strong=triangle.strong,
+                stable=triangle.stable,
+                value=round(strong_pcp - stable_pcp, 2),
+            )
 
     # async def calc_publish_gaps(self) -> None:
     #     data = {"event": self.gaps_event, "gaps": [
@@ -116,10 +122,17 @@ class GapCalculatorSvc(BaseSvc):
         msg = GapsMessage(
             event=self.gaps_event, data=[g.model_dump() for g in gaps]
         )
-        await self._redis_conn.publish(
+        await self._pubsub_conn.publish(
             settings.PUBSUB_GAPS_CHANNEL, orjson.dumps(msg.model_dump())
         )
 
+    async def mark_activity(self, gaps: Sequence[Gap]) -> None:
+        """Store symbols of gap triangles as active (depth tiers)"""
+        triangles = (self._index.get(g.alt, g.strong, g.stable) for g in gaps)
+        await self._activity_crud.mark(
+            symbols={symbol for t in triangles for symbol in t.symbols}
+        )
+
     # async def gaps_loop(self):
     #     while self._is_running:
     #         await self.calc_publish_gaps()
@@ -133,6 +146,7 @@ class GapCalculatorSvc(BaseSvc):
             if gaps:
                 # await self._gaps_crud.add(models=gaps)
                 await self.publish_gaps(gaps=gaps)
+                await self.mark_activity(gaps=gaps)
                 await asyncio.sleep(0.5)
 
     @classmethod
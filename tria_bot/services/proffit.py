@@ -1,13 +1,34 @@
-from ast import List
 import asyncio
+from collections import Counter
 import time
-from typing import AsyncGenerator, Iterable, Sequence, Tuple
+from typing import (
+    AsyncGenerator,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 from binance.helpers import round_step_size
+import numpy as np
 import orjson
 from tria_bot.conf import settings
+from tria_bot.crud.activity import SymbolActivityCRUD
 from tria_bot.crud.depths import DepthsCRUD
+from tria_bot.crud.triangles import TriangleScript
 from tria_bot.helpers.binance import Binance as BinanceHelper
-from tria_bot.helpers.symbols import all_combos, STRONG_ASSETS
+from tria_bot.helpers.book import CompactBook
+from tria_bot.helpers.kernel import TriangleKernel
+from tria_bot.helpers.sizing import LegCurve, executable_size
+from tria_bot.helpers.symbols import (
+    Triangle,
+    TriangleIndex,
+    all_combos,
+    parse_shard,
+)
 from tria_bot.models.composite import Symbol, TopVolumeAssets, ValidSymbols
 from tria_bot.models.depth import Depth
 
@@ -50,14 +71,37 @@ class ProffitSvc(BaseSvc):
     # TODO: get from api and use fee by symbol
     fee_mult = 1 - settings.EXCHANGE_FEE
     min_proffit_detect = settings.MIN_PROFFIT_DETECT
+    # near threshold proffits mark their symbols as active (depth tiers)
+    hot_proffit = min_proffit_detect - settings.DEPTH_HOT_PROFFIT_MARGIN
     proffit_event = "proffit-detected"
     calc_index = settings.PROFFIT_INDEX
+    vectorized = settings.PROFFIT_VECTORIZED
+    max_eval_rate = settings.PROFFIT_MAX_EVAL_RATE
+    break_even = settings.PROFFIT_BREAK_EVEN
+    depth_size = settings.PROFFIT_DEPTH_SIZE
+    # max book age (seconds) by leg, see `TriangleKernel.fresh`
+    max_leg_ages = settings.PROFFIT_MAX_LEG_AGES
+    stale_report_interval = settings.PROFFIT_STALE_REPORT_INTERVAL
+    stale_skips_key = "tria_bot:StaleSkips"
+    server_side = settings.PROFFIT_SERVER_SIDE
+    script_batch = settings.PROFFIT_SCRIPT_BATCH
+    depth_updates_channel = settings.PUBSUB_DEPTH_UPDATES_CHANNEL
     proffit_percent_format = settings.PROFFIT_PERCENT_FORMAT
     top_volume_channel = settings.PUBSUB_TOP_VOLUME_CHANNEL
     gaps_channel = settings.PUBSUB_GAPS_CHANNEL
 
-    def __init__(self, *args, **kwargs) -> None:
+    def __init__(
+        self,
+        *args,
+        event_driven: bool = False,
+        shard: str = "1/1",
+        **kwargs,
+    ) -> None:
         super().__init__(*args, **kwargs)
+        # event mode keeps leg prices in the vectorized kernel
+        self._event_driven = event_driven
+        # only triangles of the alts owned by the shard are evaluated
+        self._shard = parse_shard(shard)
         self._tva_crud = None
         self._tva = None
         self._tickers_crud = None
@@ -68,6 +112,17 @@ class ProffitSvc(BaseSvc):
         self._valid_symbols = None
         self._symbols_info = None
         self._binance_helper = None
+        self._index = None
+        self._activity_crud = None
+        self._active_symbols: Set[str] = set()
+        self._kernel = None
+        self._triangle_script = None
+        # last read books of kernel legs, for executable sizes
+        self._books: Dict[str, CompactBook] = {}
+        self._updated_symbols: Set[str] = set()
+        self._updated_event = asyncio.Event()
+        self._stale_skips: Counter = Counter()
+        self._stale_reported = time.monotonic()
         self._is_running = True
 
     async def _get_top_volume_assets(self) -> TopVolumeAssets:
@@ -76,10 +131,11 @@ class ProffitSvc(BaseSvc):
     async def _get_symbols_info(
         self,
     ) -> AsyncGenerator[Tuple[str, Symbol], None]:
-        for pk in self._valid_symbols.symbols:
-            # symbol = await self._symbols_info_crud.get(pk)
-            # yield symbol.symbol, symbol
-            yield await self._symbols_info_crud.wait_for(pk)
+        # every symbol is read at once, waiting for missing ones
+        for symbol in await self._symbols_info_crud.wait_for_all(
+            self._valid_symbols.symbols
+        ):
+            yield symbol
 
     async def _get_valid_symbols(self):
         return await self._valid_symbols_crud.wait_for(
@@ -99,15 +155,31 @@ class ProffitSvc(BaseSvc):
         await Migrator().run()
         self._tva_crud = TVACrud(conn=self._redis_conn)
         self._valid_symbols_crud = ValidSymbolsCRUD(conn=self._redis_conn)
-        self._tickers_crud = TickersCRUD(conn=self._redis_conn)
-        self._depths_crud = DepthsCRUD(conn=self._redis_conn)
+        self._tickers_crud = TickersCRUD(conn=self._data_conn)
+        self._depths_crud = DepthsCRUD(conn=self._data_conn)
         self._proffits_crud = ProffitsCRUD(conn=self._redis_conn)
         self._symbols_info_crud = SymbolsCRUD(conn=self._redis_conn)
+        self._activity_crud = SymbolActivityCRUD(conn=self._redis_conn)
         self._tva = await self._get_top_volume_assets()
         self._valid_symbols = await self._get_valid_symbols()
+        self._index = TriangleIndex.from_models(
+            top_volume_assets=self._tva,
+            valid_symbols=self._valid_symbols,
+            stable_assets=(self.stable,),
+            shard=self._shard,
+        )
+        self.logger.info(
+            f"Shard {self._shard[0]}/{self._shard[1]} owns "
+            f"{len(self._index)} triangles"
+        )
         # self._symbols_info = {k: v async for k, v in self._get_symbols_info()}
         self._symbols_info = [s async for s in self._get_symbols_info()]
         self._binance_helper = BinanceHelper(symbols=self._symbols_info)
+        if self.vectorized or self._event_driven:
+            self._kernel = self._build_kernel()
+        if self.server_side:
+            self._triangle_script = TriangleScript(conn=self._data_conn)
+            await self._triangle_script.load_steps(self._step_sizes())
         await self.wait_depth()
         return self
 
@@ -117,7 +189,7 @@ class ProffitSvc(BaseSvc):
         self.logger.info("Done!")
 
     async def ps_subscribe(self):
-        async with self._redis_conn.pubsub(
+        async with self._pubsub_conn.pubsub(
             ignore_subscribe_messages=True
         ) as ps:
             await ps.subscribe(self.top_volume_channel)
@@ -131,13 +203,13 @@ class ProffitSvc(BaseSvc):
 
     def calc_proffit(
         self,
-        alt_stable_depth: Depth,
-        alt_strong_depth: Depth,
-        strong_stable_depth: Depth,
+        alt_stable_depth: CompactBook,
+        alt_strong_depth: CompactBook,
+        strong_stable_depth: CompactBook,
         ammount: float = 100.0,
         # percent: bool = True,
     ):
-        alt_stable_price = float(alt_stable_depth.bids[self.calc_index][0])
+        alt_stable_price = alt_stable_depth.bid(self.calc_index)
         alt_qty = (ammount / alt_stable_price) * self.fee_mult
         # alt_sell_qty = self.apply_step_size(
         alt_sell_qty = self._binance_helper.apply_step_size(
@@ -145,7 +217,7 @@ class ProffitSvc(BaseSvc):
             value=alt_qty,
         )
 
-        alt_strong_price = float(alt_strong_depth.asks[self.calc_index][0])
+        alt_strong_price = alt_strong_depth.ask(self.calc_index)
         strong_qty = alt_sell_qty * alt_strong_price * self.fee_mult
 
         # strong_sell_qty = self.apply_step_size(
@@ -153,9 +225,7 @@ class ProffitSvc(BaseSvc):
             symbol=strong_stable_depth.symbol,
             value=strong_qty,
         )
-        strong_stable_price = float(
-            strong_stable_depth.asks[self.calc_index][0]
-        )
+        strong_stable_price = strong_stable_depth.ask(self.calc_index)
         stable_qty = strong_sell_qty * strong_stable_price * self.fee_mult
 
         proffit = stable_qty / ammount - 1
@@ -163,12 +233,23 @@ class ProffitSvc(BaseSvc):
             proffit = proffit * 100
         return round(proffit, 2)
 
+    def _track_activity(self, proffit: float, *symbols: str) -> None:
+        if proffit > self.hot_proffit:
+            self._active_symbols.update(symbols)
+
+    async def mark_activity(self) -> None:
+        """Store symbols of near threshold triangles as active"""
+        if not self._active_symbols:
+            return
+        symbols, self._active_symbols = self._active_symbols, set()
+        await self._activity_crud.mark(symbols=symbols)
+
     def _is_valid_symbol(self, symbol: str) -> bool:
-        return symbol in self._valid_symbols.symbols
+        return symbol in self._index.valid_symbols
 
     async def get_gaps(self) -> GapsMessage:
         gaps = None
-        async with self._redis_conn.pubsub(
+        async with self._pubsub_conn.pubsub(
             ignore_subscribe_messages=True
         ) as ps:
             await ps.subscribe(self.gaps_channel, self.top_volume_channel)
@@ -186,50 +267,28 @@ class ProffitSvc(BaseSvc):
                 await asyncio.sleep(0.001)
             return gaps
 
-    async def get_depths(self, *symbols):
-        for symbol in symbols:
-            s = await self._depths_crud.get(symbol)
-            yield s
+    async def get_depths(self, *symbols) -> AsyncGenerator[CompactBook, None]:
+        for book in await self._depths_crud.get_books(symbols):
+            if book is None:
+                raise NotFoundError
+            yield book
 
     async def strict_calc_proffits(
         self, gaps: Iterable[Gap]
     ) -> AsyncGenerator[Proffit, None]:
-        for gap in gaps:
-            alt_stable_symbol = f"{gap.alt}{gap.stable}"
-            alt_strong_symbol = f"{gap.alt}{gap.strong}"
-            strong_stable_symbol = f"{gap.strong}{gap.stable}"
-
-            try:
-                depths = [
-                    depth
-                    async for depth in self.get_depths(
-                        alt_stable_symbol,
-                        alt_strong_symbol,
-                        strong_stable_symbol,
-                    )
-                ]
-                # self.logger.info(f"depths is {depths}")
-            except NotFoundError:
+        triangles = [self._index.get(g.alt, g.strong, g.stable) for g in gaps]
+        triangles = [t for t in triangles if t is not None]
+        # legs of every gap triangle are read in one call
+        symbols = list({s: None for t in triangles for s in t.symbols})
+        books = dict(zip(symbols, await self._depths_crud.get_books(symbols)))
+        for triangle in triangles:
+            depths = [books[symbol] for symbol in triangle.symbols]
+            if any(depth is None for depth in depths):
                 continue
 
-            proffit = self.calc_proffit(
-                alt_stable_depth=depths[0],
-                alt_strong_depth=depths[1],
-                strong_stable_depth=depths[2],
-                ammount=100,
-            )
-            if proffit > self.min_proffit_detect:
-                yield self.proffit_model(
-                    alt=gap.alt,
-                    strong=gap.strong,
-                    stable=gap.stable,
-                    value=proffit,
-                    prices=(
-                        depths[0].bids[self.calc_index][0],
-                        depths[1].asks[self.calc_index][0],
-                        depths[2].asks[self.calc_index][0],
-                    ),
-                )
+            proffit = self._triangle_proffit(triangle=triangle, depths=depths)
+            if proffit is not None:
+                yield proffit
 
     async def strict_loop(self):
         try:
@@ -242,6 +301,8 @@ class ProffitSvc(BaseSvc):
             if proffits:
                 self.logger.info("Potential proffits detected!")
                 await self.publish_proffits(proffits=proffits)
+            await self.mark_activity()
+            await self.report_stale()
             # else:
             #     self.logger.info("No proffits with inner gaps")
 
@@ -251,62 +312,290 @@ class ProffitSvc(BaseSvc):
             self.logger.info("Top volume has change. Stopping service...")
             # pass
 
-    async def calc_proffits(self):
-        # TODO: do this parallel
-        for stg in STRONG_ASSETS:
-            try:
-                strong_stable_symbol = f"{stg}{self.stable}"
-                if not self._is_valid_symbol(strong_stable_symbol):
-                    continue
-                strong_stable = await self._depths_crud.get(
-                    strong_stable_symbol
+    def _triangle_proffit(
+        self,
+        triangle: Triangle,
+        depths: Sequence[CompactBook],
+    ) -> Optional[Proffit]:
+        stale = self._stale_legs(triangle=triangle, depths=depths)
+        if stale:
+            self._stale_skips.update(stale)
+            return None
+
+        proffit = self.calc_proffit(
+            alt_stable_depth=depths[0],
+            alt_strong_depth=depths[1],
+            strong_stable_depth=depths[2],
+            ammount=100,
+            # percent=True,
+        )
+        self._track_activity(proffit, *triangle.symbols)
+        if proffit <= self.min_proffit_detect:
+            return None
+
+        return self.proffit_model(
+            alt=triangle.alt,
+            strong=triangle.strong,
+            stable=triangle.stable,
+            value=proffit,
+            prices=(
+                CompactBook.format(depths[0].bid(self.calc_index)),
+                CompactBook.format(depths[1].ask(self.calc_index)),
+                CompactBook.format(depths[2].ask(self.calc_index)),
+            ),
+            **self._executable_size(depths),
+        )
+
+    def _stale_legs(
+        self,
+        triangle: Triangle,
+        depths: Sequence[CompactBook],
+    ) -> List[str]:
+        """Leg symbols with a book older than their `max_leg_ages`"""
+        now = time.time_ns() // 1000000
+        return [
+            symbol
+            for symbol, depth, max_age in zip(
+                triangle.symbols, depths, self.max_leg_ages
+            )
+            if max_age > 0 and now - depth.event_time > max_age * 1000
+        ]
+
+    def _fresh_ids(self, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        if not any(max_age > 0 for max_age in self.max_leg_ages):
+            return ids
+        return self._kernel.fresh(
+            now=time.time_ns() // 1000000,
+            max_ages=self.max_leg_ages,
+            ids=ids,
+        )
+
+    async def report_stale(self) -> None:
+        """Log and store (`stale_skips_key` hash) triangles skipped by stale
+        leg symbol, every `stale_report_interval` seconds"""
+        now = time.monotonic()
+        if now - self._stale_reported < self.stale_report_interval:
+            return
+        self._stale_reported = now
+        skips, self._stale_skips = self._stale_skips, Counter()
+        kernel = self._kernel
+        if kernel is not None:
+            for symbol_id in np.flatnonzero(kernel.stale_skips).tolist():
+                skips[kernel.symbols[symbol_id]] += int(
+                    kernel.stale_skips[symbol_id]
                 )
-            except NotFoundError:
+            kernel.stale_skips[:] = 0
+        if not skips:
+            return
+
+        top = ", ".join(f"{s}={n}" for s, n in skips.most_common(5))
+        self.logger.warning(
+            f"Skipped {sum(skips.values())} stale legs (top: {top})"
+        )
+        async with self._redis_conn.pipeline(transaction=False) as pipe:
+            for symbol, count in skips.items():
+                pipe.hincrby(self.stale_skips_key, symbol, count)
+            await pipe.execute()
+
+    def _leg_curve(
+        self,
+        depth: CompactBook,
+        side: str,
+        buy: bool = False,
+    ) -> LegCurve:
+        """Leg fill taking liquidity from a book side, from its best level
+        and with prices on the symbol tick"""
+        prices = getattr(depth, f"{side}_prices")
+        qtys = getattr(depth, f"{side}_qtys")
+        quantizer = self._binance_helper.get_quantizer(depth.symbol)
+        prices = quantizer.ticks(prices)
+        if buy:
+            return LegCurve.buy(prices, qtys)
+        return LegCurve.sell(prices, qtys)
+
+    def _executable_size(
+        self,
+        depths: Sequence[Optional[CompactBook]],
+    ) -> Dict[str, float]:
+        """Biggest stable input filled by the books above the minimum
+        proffit, walking the sides a trade takes (buying alt on alt/stable
+        asks, selling on alt/strong and strong/stable bids)
+
+        Deeper levels of those sides only get worse, so the size stops
+        where the proffit falls below the minimum.
+
+        Args:
+            depths (Sequence[Optional[CompactBook]]): Triangle leg books
+
+        Returns:
+            Dict[str, float]: `size` and `size_value` proffit fields, empty
+                if disabled and 0 size if a book is missing or no size is
+                above the minimum
+        """
+        if not self.depth_size:
+            return {}
+        if len(depths) != 3 or any(depth is None for depth in depths):
+            return {"size": 0.0}
+        alt_stable, alt_strong, strong_stable = depths
+        result = executable_size(
+            alt_stable=self._leg_curve(alt_stable, "ask", buy=True),
+            alt_strong=self._leg_curve(alt_strong, "bid"),
+            strong_stable=self._leg_curve(strong_stable, "bid"),
+            alt_step=self._binance_helper.get_step_size(alt_strong.symbol),
+            strong_step=self._binance_helper.get_step_size(
+                strong_stable.symbol
+            ),
+            fee_mult=self.fee_mult,
+            min_proffit=self.min_proffit_detect,
+            percent=self.proffit_percent_format,
+        )
+        if result is None:
+            return {"size": 0.0}
+        size, value = result
+        return {"size": size, "size_value": value}
+
+    async def calc_proffits(self):
+        # every leg book is read at once by cycle
+        symbols = self._index.symbols
+        books = dict(zip(symbols, await self._depths_crud.get_books(symbols)))
+        for triangle in self._index:
+            depths = [books[symbol] for symbol in triangle.symbols]
+            if any(depth is None for depth in depths):
                 continue
 
-            for alt in self._tva.assets:
-                try:
-                    alt_strong_symbol = f"{alt}{stg}"
-                    alt_stable_symbol = f"{alt}{self.stable}"
-                    if not all(
-                        (
-                            self._is_valid_symbol(alt_strong_symbol),
-                            self._is_valid_symbol(alt_stable_symbol),
-                        )
-                    ):
-                        continue
-
-                    alt_stable = await self._depths_crud.get(alt_stable_symbol)
-                    alt_strong = await self._depths_crud.get(alt_strong_symbol)
-
-                    proffit = self.calc_proffit(
-                        alt_stable_depth=alt_stable,
-                        alt_strong_depth=alt_strong,
-                        strong_stable_depth=strong_stable,
-                        ammount=100,
-                        # percent=True,
-                    )
-                    if proffit > self.min_proffit_detect:
-                        yield self.proffit_model(
-                            # assets=f"{alt}-{stg}-{self.stable}",
-                            alt=alt,
-                            strong=stg,
-                            stable=self.stable,
-                            value=proffit,
-                            prices=(
-                                alt_stable.bids[self.calc_index][0],
-                                alt_strong.asks[self.calc_index][0],
-                                strong_stable.asks[self.calc_index][0],
-                            ),
-                        )
-                except NotFoundError:
+            proffit = self._triangle_proffit(
+                triangle=triangle,
+                depths=depths,
+            )
+            if proffit is not None:
+                yield proffit
+
+    def _step_sizes(self) -> Dict[str, float]:
+        """Step sizes of the symbols sold by triangles"""
+        return {
+            symbol: self._binance_helper.get_step_size(symbol)
+            for triangle in self._index
+            for symbol in (triangle.alt_strong, triangle.strong_stable)
+        }
+
+    def _build_kernel(self) -> TriangleKernel:
+        self.logger.info(f"Vectorized kernel of {len(self._index)} triangles")
+        return TriangleKernel(
+            index=self._index,
+            step_sizes=self._step_sizes(),
+            fee_mult=self.fee_mult,
+            calc_index=self.calc_index,
+            percent=self.proffit_percent_format,
+        )
+
+    async def vector_calc_proffits(self) -> AsyncGenerator[Proffit, None]:
+        """Same results as `calc_proffits`, evaluating every triangle in
+        one `TriangleKernel` pass after reading every leg book at once"""
+        kernel = self._kernel
+        books = await self._depths_crud.get_books(kernel.symbols)
+        self._keep_books(books)
+        kernel.update_many(books)
+        results = kernel.evaluate(
+            min_proffit=self.hot_proffit, ids=self._fresh_ids()
+        )
+        for proffit in self._kernel_proffits(results):
+            yield proffit
+
+    async def script_calc_proffits(self) -> AsyncGenerator[Proffit, None]:
+        """Same results as `calc_proffits`, evaluated inside Redis by
+        `TriangleScript` (one call by `script_batch` triangles), so only
+        triangles near the threshold leave the server"""
+        triangles = list(self._index)
+        for start in range(0, len(triangles), self.script_batch):
+            batch = triangles[start : start + self.script_batch]
+            # unrounded candidates, rounded here as `calc_proffit` does
+            results, stale = await self._triangle_script.evaluate(
+                triangles=batch,
+                fee_mult=self.fee_mult,
+                min_proffit=self.hot_proffit - 0.01,
+                now=time.time_ns() // 1000000,
+                max_ages=self.max_leg_ages,
+                calc_index=self.calc_index,
+                percent=self.proffit_percent_format,
+            )
+            self._stale_skips.update(stale)
+            for position, value, prices in results:
+                triangle = batch[position]
+                proffit = round(value, 2)
+                self._track_activity(proffit, *triangle.symbols)
+                if proffit <= self.min_proffit_detect:
                     continue
+                depths = []
+                if self.depth_size:
+                    depths = await self._depths_crud.get_books(
+                        triangle.symbols
+                    )
+                yield self.proffit_model(
+                    alt=triangle.alt,
+                    strong=triangle.strong,
+                    stable=triangle.stable,
+                    value=proffit,
+                    prices=tuple(CompactBook.format(float(p)) for p in prices),
+                    **self._executable_size(depths),
+                )
+
+    async def event_calc_proffits(
+        self,
+        symbols: Iterable[str],
+    ) -> AsyncGenerator[Proffit, None]:
+        """Read updated books and evaluate only the triangles using them
+
+        Books of other legs are the prices already kept in the kernel.
+        With `break_even`, only triangles where an updated leg crosses its
+        break-even price are evaluated.
+
+        Args:
+            symbols (Iterable[str]): Updated leg symbols
+        """
+        kernel = self._kernel
+        symbols = list(symbols)
+        books = await self._depths_crud.get_books(symbols)
+        self._keep_books(books)
+        if self.break_even:
+            ids = kernel.apply(books)
+        else:
+            kernel.update_many(books)
+            ids = kernel.triangle_ids(symbols)
+        ids = self._fresh_ids(ids)
+        for proffit in self._kernel_proffits(
+            kernel.evaluate(min_proffit=self.hot_proffit, ids=ids)
+        ):
+            yield proffit
+
+    def _kernel_proffits(
+        self,
+        results: Iterable[Tuple[int, float]],
+    ) -> Generator[Proffit, None, None]:
+        kernel = self._kernel
+        for index, proffit in results:
+            triangle = kernel.triangles[index]
+            self._track_activity(proffit, *triangle.symbols)
+            if proffit > self.min_proffit_detect:
+                prices = kernel.prices(index)
+                depths = [self._books.get(s) for s in triangle.symbols]
+                yield self.proffit_model(
+                    alt=triangle.alt,
+                    strong=triangle.strong,
+                    stable=triangle.stable,
+                    value=proffit,
+                    prices=tuple(CompactBook.format(p) for p in prices),
+                    **self._executable_size(depths),
+                )
+
+    def _keep_books(self, books: Iterable[Optional[CompactBook]]) -> None:
+        if self.depth_size:
+            self._books.update((b.symbol, b) for b in books if b is not None)
 
     async def publish_proffits(self, proffits: Sequence[Proffit]):
         msg = MultiProffitMessage(
             event=self.proffit_event, data=[p.model_dump() for p in proffits]
         )
-        await self._redis_conn.publish(
+        await self._pubsub_conn.publish(
             settings.PUBSUB_MULTI_PROFFIT_CHANNEL,
             orjson.dumps(msg.model_dump()),
         )
@@ -318,27 +607,90 @@ class ProffitSvc(BaseSvc):
             data=proffit.model_dump(),
         )
         # data = {"event": self.proffit_event, "data": proffit.dict()}
-        await self._redis_conn.publish(
+        await self._pubsub_conn.publish(
             settings.PUBSUB_PROFFIT_CHANNEL,
             # orjson.dumps(data),
             orjson.dumps(msg.model_dump()),
         )
 
+    async def updates_subscribe(self) -> None:
+        """Collect updated leg symbols published by depth services"""
+        async with self._pubsub_conn.pubsub(
+            ignore_subscribe_messages=True
+        ) as ps:
+            await ps.subscribe(self.depth_updates_channel)
+            self.logger.info(f"Subscribed to {self.depth_updates_channel}")
+            while self._is_running:
+                msg = await ps.get_message(timeout=1.0)
+                if msg is None:
+                    continue
+                self._updated_symbols.update(
+                    s for s in orjson.loads(msg["data"]) if s in self._index
+                )
+                if self._updated_symbols:
+                    self._updated_event.set()
+            await ps.unsubscribe()
+
+    async def event_loop(self) -> None:
+        """Evaluate triangles of updated symbols, at most `max_eval_rate`
+        times by second (updates between evaluations are merged)"""
+        # a first full pass loads every leg price in the kernel
+        async for proffit in self.vector_calc_proffits():
+            await self.publish_proffit(proffit=proffit)
+        if self.break_even:
+            self._kernel.break_even(min_proffit=self.hot_proffit)
+
+        min_interval = 1 / self.max_eval_rate if self.max_eval_rate else 0.0
+        while self._is_running:
+            try:
+                await asyncio.wait_for(self._updated_event.wait(), 1.0)
+            except asyncio.TimeoutError:
+                continue
+
+            start = time.monotonic()
+            self._updated_event.clear()
+            symbols, self._updated_symbols = self._updated_symbols, set()
+            async for proffit in self.event_calc_proffits(symbols=symbols):
+                await self.publish_proffit(proffit=proffit)
+            await self.mark_activity()
+            await self.report_stale()
+            await asyncio.sleep(min_interval - (time.monotonic() - start))
+
     async def proffit_loop(self):
         while self._is_running:
             # proffits = [p async for p in self.calc_proffits()]
-            async for proffit in self.calc_proffits():
+            if self.server_side:
+                proffits = self.script_calc_proffits()
+            elif self.vectorized:
+                proffits = self.vector_calc_proffits()
+            else:
+                proffits = self.calc_proffits()
+            async for proffit in proffits:
                 # self.logger.info(f"New proffit detectec ({proffit})")
                 await self.publish_proffit(proffit=proffit)
+            await self.mark_activity()
+            await self.report_stale()
             # await self._proffits_crud.add(proffits)
 
     @classmethod
-    async def start(cls, strict: bool) -> None:
+    async def start(
+        cls,
+        strict: bool,
+        event_driven: bool = False,
+        shard: str = "1/1",
+    ) -> None:
         while True:
-            async with cls() as svc:
+            async with cls(event_driven=event_driven, shard=shard) as svc:
                 if strict:
                     svc.logger.info("Starting service with strict mode...")
                     await svc.strict_loop()
+                elif event_driven:
+                    svc.logger.info("Starting service with event mode...")
+                    await asyncio.gather(
+                        svc.event_loop(),
+                        svc.updates_subscribe(),
+                        svc.ps_subscribe(),
+                    )
                 else:
                     svc.logger.info("Starting service...")
                     await asyncio.gather(svc.proffit_loop(), svc.ps_subscribe())
@@ -0,0 +1,250 @@
+import asyncio
+from random import uniform
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from uuid import uuid1
+import orjson
+from aiohttp import ClientError
+from aredis_om import get_redis_connection
+from aredis_om.connections import redis
+from tria_bot.clients.websocket import SocketClosedError
+from tria_bot.conf import settings
+from tria_bot.helpers.utils import create_logger
+
+
+class SocketHealth:
+    """Connection state of a symbol socket"""
+
+    __slots__ = ("state", "reconnects", "last_message", "last_error")
+
+    def __init__(self) -> None:
+        self.state = "idle"
+        self.reconnects = 0
+        self.last_message = 0.0
+        self.last_error: Optional[str] = None
+
+    def as_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = now or time()
+        age = round(now - self.last_message, 3) if self.last_message else None
+        return {
+            "state": self.state,
+            "reconnects": self.reconnects,
+            "last_message_age": age,
+            "last_error": self.last_error,
+        }
+
+
+class ConnectionBudget:
+    """Host wide websocket connection rate limit
+
+    Every connection attempt is registered in a Redis sorted set, so all
+    socket containers sharing the Redis (and the public IP) share the
+    Binance budget of `limit` connections by `period` seconds.
+    """
+
+    key = "tria_bot:SocketConnections"
+
+    def __init__(
+        self,
+        conn: redis.Redis,
+        limit: int = settings.SOCKET_CONNECTIONS_LIMIT,
+        period: float = settings.SOCKET_CONNECTIONS_PERIOD,
+    ) -> None:
+        self._conn = conn
+        self.limit = limit
+        self.period = period
+
+    async def acquire(self) -> float:
+        """Wait until a new connection fits in the budget
+
+        Returns:
+            float: Seconds waited
+        """
+        waited = 0.0
+        while True:
+            now = time()
+            member = f"{uuid1()}"
+            async with self._conn.pipeline(transaction=True) as pipe:
+                pipe.zremrangebyscore(self.key, 0, now - self.period)
+                pipe.zadd(self.key, {member: now})
+                pipe.zcard(self.key)
+                pipe.expire(self.key, int(self.period) + 1)
+                _, _, count, _ = await pipe.execute()
+            if count <= self.limit:
+                return waited
+
+            await self._conn.zrem(self.key, member)
+            oldest = await self._conn.zrange(self.key, 0, 0, withscores=True)
+            wait = oldest[0][1] + self.period - now if oldest else 1.0
+            wait = max(wait, 0.1) + uniform(0, 1.0)
+            waited += wait
+            await asyncio.sleep(wait)
+
+
+class SocketSupervisor:
+    """Process wide owner of socket (re)connections
+
+    Connections wait for the shared `ConnectionBudget`, start with a small
+    random delay so mass restarts are spread, and reconnect with full
+    jitter exponential backoff after any error (`retry_errors` are the
+    expected ones, others are logged with their traceback). A per symbol
+    health table is logged and stored in the `tria_bot:SocketHealth` hash
+    every `health_interval`.
+    """
+
+    health_key = "tria_bot:SocketHealth"
+    retry_errors = (
+        SocketClosedError,
+        asyncio.TimeoutError,
+        ClientError,
+        ConnectionError,
+        OSError,
+    )
+
+    _shared: Dict[Optional[str], "SocketSupervisor"] = {}
+
+    def __init__(
+        self,
+        conn: Optional[redis.Redis] = None,
+        base_delay: float = settings.SOCKET_RECONNECT_BASE_DELAY,
+        max_delay: float = settings.SOCKET_RECONNECT_MAX_DELAY,
+        connect_jitter: float = settings.SOCKET_CONNECT_JITTER,
+        health_interval: float = settings.SOCKET_HEALTH_INTERVAL,
+    ) -> None:
+        self._conn = conn
+        if self._conn == None:
+            self._conn = get_redis_connection()
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.connect_jitter = connect_jitter
+        self.health_interval = health_interval
+        self.budget = ConnectionBudget(conn=self._conn)
+        self.health: Dict[str, SocketHealth] = {}
+        self.logger = create_logger(f"{type(self).__name__}[{uuid1()}]")
+        self._health_task: Optional[asyncio.Task] = None
+        self._users = 0
+
+    @classmethod
+    def shared(cls, url: Optional[str] = None) -> "SocketSupervisor":
+        """Get the process supervisor for a Redis url
+
+        Every call must be paired with a `release` call.
+
+        Args:
+            url (Optional[str], optional): Redis url. Defaults to None.
+
+        Returns:
+            SocketSupervisor: Shared supervisor instance
+        """
+        supervisor = cls._shared.get(url, None)
+        if supervisor is None:
+            supervisor = cls(conn=get_redis_connection(url=url))
+            cls._shared[url] = supervisor
+        if supervisor._health_task is None and supervisor.health_interval:
+            supervisor._health_task = asyncio.create_task(
+                supervisor._health_loop()
+            )
+        supervisor._users += 1
+        return supervisor
+
+    async def release(self) -> None:
+        """Release a shared supervisor, stopping health reports if unused
+
+        The instance stays registered, so health counters survive service
+        restarts (e.g. on top volume assets changes).
+        """
+        self._users -= 1
+        if self._users > 0 or self._health_task is None:
+            return
+
+        self._health_task.cancel()
+        await asyncio.gather(self._health_task, return_exceptions=True)
+        self._health_task = None
+
+    def _symbol_health(self, symbol: str) -> SocketHealth:
+        health = self.health.get(symbol, None)
+        if health is None:
+            health = self.health[symbol] = SocketHealth()
+        return health
+
+    def _set_state(self, symbols: Iterable[str], state: str, **kwargs) -> None:
+        for symbol in symbols:
+            health = self._symbol_health(symbol)
+            health.state = state
+            for k, v in kwargs.items():
+                setattr(health, k, v)
+
+    def touch(self, symbol: str) -> None:
+        """Register a received message for a symbol"""
+        health = self._symbol_health(symbol)
+        health.state = "connected"
+        health.last_message = time()
+
+    def _backoff(self, attempt: int) -> float:
+        return uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    async def run(
+        self,
+        symbols: Iterable[str],
+        connect: Callable[[], Awaitable[Any]],
+        is_running: Callable[[], bool],
+    ) -> None:
+        """Keep a socket connected while the service is running
+
+        Args:
+            symbols (Iterable[str]): Symbols carried by the socket
+            connect (Callable[[], Awaitable[Any]]): Connect and receive
+                until the socket closes (raising) or the service stops
+            is_running (Callable[[], bool]): Service running check
+        """
+        symbols = list(symbols)
+        attempt = 0
+        await asyncio.sleep(uniform(0, self.connect_jitter))
+        while is_running():
+            self._set_state(symbols, "connecting")
+            started = time()
+            try:
+                waited = await self.budget.acquire()
+                if waited:
+                    self.logger.warning(
+                        f"Connection budget waited {waited:.1f}s"
+                    )
+                started = time()
+                await connect()
+            except Exception as err:
+                # any error (e.g. Redis or data ones) must not stop the
+                # symbols streaming; cancellations are not `Exception`
+                if not isinstance(err, self.retry_errors):
+                    self.logger.exception(f"Unexpected socket error: {err!r}")
+                # a connection that lived long enough resets the backoff
+                if time() - started > self.max_delay:
+                    attempt = 0
+                delay = self._backoff(attempt)
+                attempt += 1
+                for symbol in symbols:
+                    self._symbol_health(symbol).reconnects += 1
+                self._set_state(symbols, "backoff", last_error=repr(err))
+                self.logger.error(
+                    f"Socket error: {err!r}. Reconnecting in {delay:.2f}s..."
+                )
+                await asyncio.sleep(delay)
+        self._set_state(symbols, "stopped")
+
+    def health_table(self) -> Dict[str, Dict[str, Any]]:
+        now = time()
+        return {s: h.as_dict(now=now) for s, h in self.health.items()}
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            table = self.health_table()
+            if not table:
+                continue
+            self.logger.info(f"Socket health: {table}")
+            try:
+                await self._conn.hset(
+                    self.health_key,
+                    mapping={s: orjson.dumps(h) for s, h in table.items()},
+                )
+            except Exception as err:
+                self.logger.error(f"Error storing socket health: {err}")
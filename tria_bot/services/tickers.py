@@ -1,8 +1,10 @@
 import asyncio
-from typing import Any, Generator
-from tria_bot.crud.composite import TopVolumeAssetsCRUD
-from tria_bot.helpers.symbols import all_combos
-from tria_bot.models.composite import TopVolumeAssets
+from typing import Any, Generator, Sequence
+import orjson
+from tria_bot.crud.batch import RawRecord
+from tria_bot.crud.composite import TopVolumeAssetsCRUD, ValidSymbolsCRUD
+from tria_bot.helpers.symbols import TriangleIndex
+from tria_bot.models.composite import TopVolumeAssets, ValidSymbols
 from tria_bot.models.ticker import Ticker
 from tria_bot.services.base import SocketBaseSvc, SocketError, SocketErrorDetail
 from tria_bot.conf import settings
@@ -11,36 +13,46 @@ from tria_bot.conf import settings
 class TickerSvc(SocketBaseSvc[Ticker]):
     model = Ticker
     tva_model = TopVolumeAssets
+    valid_symbols_model = ValidSymbols
     socket_handler_name = "ticker_socket"
     top_volume_channel = settings.PUBSUB_TOP_VOLUME_CHANNEL
     # socket_handler_name = "symbol_ticker_socket"
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
-        self._symbols = None
+        self._index = None
         self._tva_crud = None
         self._tva = None
+        self._valid_symbols_crud = None
 
     async def _get_top_volume_assets(self):
         return await self._tva_crud.wait_for(self.tva_model.Meta.PK_VALUE)
 
-    async def _get_symbols(self):
-        return list(
-            all_combos(
-                alt_assets=self._tva.assets,
-                stable_assets=(settings.USE_STABLE_ASSET,),
-            )
+    async def _get_valid_symbols(self):
+        return await self._valid_symbols_crud.wait_for(
+            self.valid_symbols_model.Meta.PK_VALUE
+        )
+
+    async def _get_index(self) -> TriangleIndex:
+        return TriangleIndex.from_models(
+            top_volume_assets=self._tva,
+            valid_symbols=await self._get_valid_symbols(),
+            stable_assets=(settings.USE_STABLE_ASSET,),
         )
 
     async def __aenter__(self) -> "TickerSvc":
         await super().__aenter__()
         self._tva_crud = TopVolumeAssetsCRUD(conn=self._redis_conn)
+        self._valid_symbols_crud = ValidSymbolsCRUD(conn=self._redis_conn)
         self._tva = await self._get_top_volume_assets()
-        self._symbols = await self._get_symbols()
+        self._index = await self._get_index()
         return self
 
+    def health_symbols(self) -> Sequence[str]:
+        return self._index.symbols
+
     async def ps_subscribe(self):
-        async with self._redis_conn.pubsub(
+        async with self._pubsub_conn.pubsub(
             ignore_subscribe_messages=True
         ) as ps:
             await ps.subscribe(self.top_volume_channel)
@@ -55,7 +67,7 @@ class TickerSvc(SocketBaseSvc[Ticker]):
     def _model_or_raise(self, data: Any) -> Generator[Ticker, Any, None]:
         if isinstance(data, list):
             for obj in data:
-                if obj.get("s", None) in self._symbols:
+                if obj.get("s", None) in self._index:
                     yield self.model(**obj)
 
         elif isinstance(data, dict):
@@ -66,6 +78,22 @@ class TickerSvc(SocketBaseSvc[Ticker]):
         else:
             raise ValueError("Not supported data")
 
+    def _raw_or_raise(self, data: Any) -> Generator[RawRecord, Any, None]:
+        if not isinstance(data, list):
+            raise SocketError(data)
+
+        for obj in data:
+            symbol = obj.get("s", None)
+            if symbol in self._index:
+                document = orjson.dumps(
+                    {
+                        "symbol": symbol,
+                        "price_change": obj["p"],
+                        "price_change_percent": obj["P"],
+                        "event_time": obj["E"],
+                    }
+                )
+                yield self._raw_key(symbol), document
 
     @classmethod
     async def start(cls) -> None:
@@ -1,4 +1,5 @@
 import asyncio
+import os
 from collections import namedtuple
 from typing import Any, Generator
 from dotenv import load_dotenv
@@ -23,6 +24,8 @@ load_dotenv("test.env")
 # TEST_PREFIX = "tria-bot:testing"
 GLOBAL_PREFIX = "tria_bot"
 REDIS_URL = "redis://localhost:6379?decode_responses=True"
+# a second server for pub/sub role tests (skipped if not set)
+PUB_SUB_REDIS_URL = os.environ.get("TEST_PUB_SUB_REDIS_URL", None)
 
 from dataclasses import dataclass
 
@@ -0,0 +1,79 @@
+import pytest
+from tria_bot.helpers.book import CompactBook, OrderBook, OrderBookGapError
+
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "bids": [["0.99", "5.0"], ["1.00", "2.0"], ["0.98", "1.0"]],
+    "asks": [["1.02", "3.0"], ["1.01", "4.0"]],
+}
+
+
+def _event(first_id: int, last_id: int, bids=None, asks=None):
+    return {"U": first_id, "u": last_id, "b": bids or [], "a": asks or []}
+
+
+def test_snapshot_sorted():
+    book = OrderBook(symbol="FAKESYMBOL")
+    book.load_snapshot(SNAPSHOT)
+
+    exported = book.export(levels=2)
+    assert exported["bids"] == [("1.00", "2.0"), ("0.99", "5.0")]
+    assert exported["asks"] == [("1.01", "4.0"), ("1.02", "3.0")]
+
+
+def test_buffered_events():
+    book = OrderBook(symbol="FAKESYMBOL")
+    assert not book.apply(_event(90, 95, bids=[["2.00", "1.0"]]))
+    assert not book.apply(_event(96, 101, asks=[["1.01", "0"]]))
+    assert not book.is_synced
+
+    book.load_snapshot(SNAPSHOT)
+    assert book.last_update_id == 101
+    assert book.export(levels=1) == {
+        "bids": [("1.00", "2.0")],
+        "asks": [("1.02", "3.0")],
+    }
+
+
+def test_apply_and_gap():
+    book = OrderBook(symbol="FAKESYMBOL")
+    book.load_snapshot(SNAPSHOT)
+
+    assert not book.apply(_event(99, 100))
+    assert book.apply(_event(101, 102, bids=[["1.005", "7.0"]]))
+    assert book.export(levels=1)["bids"] == [("1.005", "7.0")]
+
+    with pytest.raises(OrderBookGapError):
+        book.apply(_event(104, 105))
+
+
+def test_old_snapshot():
+    book = OrderBook(symbol="FAKESYMBOL")
+    book.apply(_event(105, 106))
+
+    with pytest.raises(OrderBookGapError):
+        book.load_snapshot(SNAPSHOT)
+    assert not book.is_synced
+
+    book.load_snapshot({**SNAPSHOT, "lastUpdateId": 104})
+    assert book.last_update_id == 106
+
+
+def test_compact_book():
+    book = CompactBook.from_document(
+        {
+            "symbol": "FAKESYMBOL",
+            "bids": [["0.05193000", "12.3"], ["0.05192000", "25.1"]],
+            "asks": [["0.05194000", "7.9"]],
+            "event_time": 123456789,
+        }
+    )
+
+    assert book.bid() == 0.05193
+    assert book.bid(1) == 0.05192
+    assert book.ask() == 0.05194
+    assert list(book.ask_qtys) == [7.9]
+    assert book.event_time == 123456789
+    assert CompactBook.format(book.bid()) == "0.05193000"
+    assert CompactBook.format(0.00000475) == "0.00000475"
@@ -0,0 +1,40 @@
+import asyncio
+from tria_bot.helpers.conflate import ConflatingQueue
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+@pytest_mark_asyncio
+async def test_conflate():
+    queue = ConflatingQueue()
+    queue.put("FAKESYMBOL1", 1)
+    queue.put("FAKESYMBOL2", 1)
+    queue.put("FAKESYMBOL1", 2)
+    queue.put("FAKESYMBOL1", 3)
+
+    items = await queue.get()
+    assert items == [("FAKESYMBOL1", 3), ("FAKESYMBOL2", 1)]
+    assert queue.superseded == 2
+    assert queue.superseded_by_key == {"FAKESYMBOL1": 2}
+    assert len(queue) == 0
+
+
+@pytest_mark_asyncio
+async def test_wait_put():
+    queue = ConflatingQueue()
+
+    async def put():
+        await asyncio.sleep(0.01)
+        queue.put("FAKESYMBOL", 1)
+
+    items, _ = await asyncio.gather(queue.get(), put())
+    assert items == [("FAKESYMBOL", 1)]
+
+
+def test_maxsize():
+    queue = ConflatingQueue(maxsize=2)
+    queue.put("FAKESYMBOL1", 1)
+    queue.put("FAKESYMBOL2", 1)
+    queue.put("FAKESYMBOL3", 1)
+
+    assert queue.dropped == 1
+    assert [k for k, _ in queue.get_nowait()] == ["FAKESYMBOL2", "FAKESYMBOL3"]
@@ -0,0 +1,85 @@
+import math
+from tria_bot.helpers.book import CompactBook
+from tria_bot.helpers.graph import BUY, SELL, Cycle, SymbolGraph
+
+
+PAIRS = [
+    ("BTCUSDT", "BTC", "USDT"),
+    ("ETHUSDT", "ETH", "USDT"),
+    ("ETHBTC", "ETH", "BTC"),
+    ("ALTETH", "ALT", "ETH"),
+    ("ALTUSDT", "ALT", "USDT"),
+]
+
+
+def _book(symbol: str, bid: str, ask: str) -> CompactBook:
+    return CompactBook(symbol, [(bid, "1.0")], [(ask, "1.0")])
+
+
+def test_cycles():
+    graph = SymbolGraph(pairs=PAIRS, fee_mult=1.0, max_length=3)
+    # BTC-ETH-USDT and ALT-ETH-USDT, in both directions
+    assert len(graph) == 4
+    assert len(SymbolGraph(pairs=PAIRS, fee_mult=1.0, max_length=4)) == 6
+
+    assets = {graph.cycle(i).assets for i in range(len(graph))}
+    assert assets == {
+        ("ALT", "ETH", "USDT"),
+        ("ALT", "USDT", "ETH"),
+        ("BTC", "ETH", "USDT"),
+        ("BTC", "USDT", "ETH"),
+    }
+
+
+def test_profitable():
+    graph = SymbolGraph(pairs=PAIRS, fee_mult=0.999, max_length=4)
+    books = [
+        _book("BTCUSDT", "40000", "40001"),
+        _book("ETHUSDT", "2000", "2000.1"),
+        _book("ETHBTC", "0.05", "0.05001"),
+        _book("ALTETH", "0.0103", "0.0104"),
+        _book("ALTUSDT", "20", "20.01"),
+    ]
+    assert graph.update_many(books).tolist() == list(range(len(graph)))
+
+    # buy ALT with USDT, sell it for ETH and ETH for USDT (or through BTC)
+    triangle = round((2000 * 0.0103 / 20.01 * 0.999**3 - 1) * 100, 2)
+    square = round(
+        (40000 * 0.05 * 0.0103 / 20.01 * 0.999**4 - 1) * 100, 2
+    )
+    results = graph.profitable(min_proffit=0.3)
+    assert [(graph.cycle(i), p) for i, p in results] == [
+        (
+            Cycle(
+                assets=("ALT", "ETH", "BTC", "USDT"),
+                symbols=("ALTETH", "ETHBTC", "BTCUSDT", "ALTUSDT"),
+                sides=(SELL, SELL, SELL, BUY),
+            ),
+            square,
+        ),
+        (
+            Cycle(
+                assets=("ALT", "ETH", "USDT"),
+                symbols=("ALTETH", "ETHUSDT", "ALTUSDT"),
+                sides=(SELL, SELL, BUY),
+            ),
+            triangle,
+        ),
+    ]
+
+    # only cycles through BTCUSDT are affected by its book
+    ids = graph.update_many([_book("BTCUSDT", "50000", "50001")])
+    assert all("BTCUSDT" in graph.cycle(i).symbols for i in ids)
+    assert len(ids) == 4
+    results = graph.profitable(min_proffit=0.3, ids=ids)
+    assert [graph.cycle(i).symbols for i, _ in results] == [
+        ("ALTETH", "ETHBTC", "BTCUSDT", "ALTUSDT"),
+        ("BTCUSDT", "ETHUSDT", "ETHBTC"),
+    ]
+
+
+def test_missing_price():
+    graph = SymbolGraph(pairs=PAIRS[:3], fee_mult=1.0, max_length=3)
+    graph.update_many([_book("BTCUSDT", "1", "1"), _book("ETHBTC", "1", "1")])
+    assert graph.profitable(min_proffit=-100.0) == []
+    assert all(math.isclose(p, -100) for p in graph.proffits())
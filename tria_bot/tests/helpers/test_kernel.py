@@ -0,0 +1,201 @@
+import random
+import numpy as np
+from binance.helpers import round_step_size
+from tria_bot.helpers.binance import Binance as BinanceHelper
+from tria_bot.helpers.book import CompactBook
+from tria_bot.helpers.kernel import TriangleKernel, step_floor, step_params
+from tria_bot.helpers.symbols import TriangleIndex
+from tria_bot.models.composite import Symbol
+from tria_bot.services.proffit import ProffitSvc
+
+
+STEP_SIZES = (1.0, 0.1, 0.01, 0.001, 0.0001, 1e-05, 1e-08, 0.05, 10.0)
+STRONGS = ("BTC", "ETH", "BNB")
+STABLE = "USDT"
+
+
+def _symbol(symbol: str, step_size: float) -> Symbol:
+    return Symbol(
+        symbol=symbol,
+        base_asset="FAKE",
+        quote_asset="SYMBOL",
+        is_spot_trading_allowed=True,
+        min_price=0.0,
+        max_price=0.0,
+        tick_size=0.00000001,
+        min_qty=0.0,
+        max_qty=0.0,
+        step_size=step_size,
+        order_types=["LIMIT"],
+        permissions=["SPOT"],
+        status="TRADING",
+    )
+
+
+def _book(symbol: str, price: float, rng: random.Random) -> CompactBook:
+    price = round(price * rng.uniform(0.98, 1.02), 8)
+    return CompactBook(
+        symbol=symbol,
+        bids=[(CompactBook.format(price), "1.0")],
+        asks=[(CompactBook.format(price), "1.0")],
+    )
+
+
+def _market(rng: random.Random):
+    alts = [f"ALT{i}" for i in range(60)]
+    strong_prices = {s: rng.uniform(10, 40000) for s in STRONGS}
+    alt_prices = {a: 10 ** rng.uniform(-2, 3) for a in alts}
+
+    books, symbols = {}, []
+    for stg in STRONGS:
+        symbol = f"{stg}{STABLE}"
+        books[symbol] = _book(symbol, strong_prices[stg], rng)
+        symbols.append(_symbol(symbol, rng.choice(STEP_SIZES[3:7])))
+    for alt in alts:
+        symbol = f"{alt}{STABLE}"
+        books[symbol] = _book(symbol, alt_prices[alt], rng)
+        for stg in STRONGS:
+            symbol = f"{alt}{stg}"
+            price = alt_prices[alt] / strong_prices[stg]
+            books[symbol] = _book(symbol, max(price, 1e-8), rng)
+            symbols.append(_symbol(symbol, rng.choice(STEP_SIZES)))
+    index = TriangleIndex(
+        alt_assets=alts,
+        valid_symbols=books,
+        strong_assets=STRONGS,
+        stable_assets=(STABLE,),
+    )
+    return index, books, symbols
+
+
+def _kernel(index: TriangleIndex, symbols) -> TriangleKernel:
+    svc = ProffitSvc()
+    return TriangleKernel(
+        index=index,
+        step_sizes={s.symbol: s.step_size for s in symbols},
+        fee_mult=svc.fee_mult,
+        calc_index=svc.calc_index,
+        percent=svc.proffit_percent_format,
+    )
+
+
+def test_step_floor():
+    rng = random.Random(7)
+    for step_size in STEP_SIZES:
+        unit, scale = step_params(step_size)
+        values = [rng.uniform(0, 10) ** rng.randint(1, 4) for _ in range(500)]
+        values += [0.3, 0.7, 1.1, 2.675, 0.29, 0.57, 0.0]
+        floored = step_floor(
+            np.array(values),
+            np.full(len(values), unit),
+            np.full(len(values), scale),
+        )
+        assert floored.tolist() == [
+            round_step_size(quantity=v, step_size=step_size) for v in values
+        ]
+
+
+def test_kernel_matches_calc_proffit():
+    rng = random.Random(11)
+    index, books, symbols = _market(rng)
+
+    svc = ProffitSvc()
+    svc._binance_helper = BinanceHelper(symbols=symbols)
+    kernel = _kernel(index=index, symbols=symbols)
+    kernel.update_many(books.values())
+
+    expected = [
+        svc.calc_proffit(
+            alt_stable_depth=books[triangle.alt_stable],
+            alt_strong_depth=books[triangle.alt_strong],
+            strong_stable_depth=books[triangle.strong_stable],
+            ammount=100,
+        )
+        for triangle in index
+    ]
+    assert kernel.evaluate(min_proffit=-1000.0) == list(enumerate(expected))
+
+    detected = [(i, p) for i, p in enumerate(expected) if p > 0.3]
+    assert detected
+    assert kernel.evaluate(min_proffit=0.3) == detected
+
+    ids = kernel.triangle_ids(["BTCUSDT"])
+    assert kernel.evaluate(min_proffit=-1000.0, ids=ids) == [
+        (t.id, expected[t.id]) for t in index if t.strong == "BTC"
+    ]
+
+
+def test_kernel_break_even():
+    rng = random.Random(13)
+    index, books, symbols = _market(rng)
+    kernel = _kernel(index=index, symbols=symbols)
+    kernel.update_many(books.values())
+    kernel.break_even(min_proffit=0.3)
+
+    checked = crossed = 0
+    for _ in range(20):
+        updated = rng.sample(sorted(books), 5)
+        for symbol in updated:
+            price = books[symbol].bid(0)
+            books[symbol] = _book(symbol, price, rng)
+        ids = kernel.apply(books[symbol] for symbol in updated)
+        # every triangle reaching the minimum crossed a break-even price
+        detected = kernel.evaluate(
+            min_proffit=0.3, ids=kernel.triangle_ids(updated)
+        )
+        assert {i for i, _ in detected} <= set(ids.tolist())
+        checked += len(kernel.triangle_ids(updated))
+        crossed += len(ids)
+    assert 0 < crossed < checked
+
+
+def test_kernel_missing_leg():
+    index = TriangleIndex(
+        alt_assets=["ALT"],
+        valid_symbols=["ALTUSDT", "ALTBTC", "BTCUSDT"],
+        stable_assets=(STABLE,),
+    )
+    kernel = TriangleKernel(
+        index=index,
+        step_sizes={"ALTBTC": 0.01, "BTCUSDT": 0.00001},
+        fee_mult=0.999,
+    )
+    kernel.update(CompactBook("ALTUSDT", [("1.0", "1.0")], [("1.0", "1.0")]))
+    assert kernel.evaluate(min_proffit=-100.0) == []
+
+
+def test_kernel_fresh():
+    index = TriangleIndex(
+        alt_assets=["ALT", "OTHER"],
+        valid_symbols=[
+            "ALTUSDT",
+            "ALTBTC",
+            "OTHERUSDT",
+            "OTHERBTC",
+            "BTCUSDT",
+        ],
+        stable_assets=(STABLE,),
+    )
+    kernel = TriangleKernel(index=index, step_sizes={}, fee_mult=0.999)
+    for symbol, event_time in (
+        ("ALTUSDT", 10000),
+        ("ALTBTC", 10000),
+        ("BTCUSDT", 9000),
+        ("OTHERUSDT", 4000),
+        ("OTHERBTC", 10000),
+    ):
+        book = CompactBook(symbol, [("1.0", "1.0")], [("1.0", "1.0")])
+        book.event_time = event_time
+        kernel.update(book)
+
+    alt = index.get("ALT", "BTC", STABLE)
+    other = index.get("OTHER", "BTC", STABLE)
+    assert kernel.fresh(now=10000, max_ages=(5, 5, 5)).tolist() == [alt.id]
+    assert kernel.stale_skips[index.symbol_ids["OTHERUSDT"]] == 1
+    # a strong/stable budget of 0.5s drops both, 0 disables a leg
+    assert kernel.fresh(now=10000, max_ages=(0, 5, 0.5)).tolist() == []
+    assert kernel.fresh(now=10000, max_ages=(0, 5, 0)).tolist() == [
+        alt.id,
+        other.id,
+    ]
+    assert kernel.stale_skips[index.symbol_ids["BTCUSDT"]] == 2
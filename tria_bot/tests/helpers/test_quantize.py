@@ -0,0 +1,54 @@
+import random
+from decimal import Context
+import numpy as np
+import pytest
+from binance.helpers import round_step_size
+from tria_bot.helpers.quantize import Quantizer, format_positional
+
+
+SIZES = (1.0, 0.1, 0.01, 0.0001, 1e-05, 1e-08, 0.05, 0.25, 10.0)
+
+
+def _values(rng: random.Random):
+    values = [rng.uniform(0, 10) ** rng.randint(1, 12) for _ in range(500)]
+    values += [rng.randint(1, 10**9) * 1e-08 for _ in range(200)]
+    values += [0.0, 0.3, 0.7, 1.1, 2.675, 0.29, 0.57, 99999999.5, 1e16]
+    return values
+
+
+def test_step_tick():
+    rng = random.Random(3)
+    values = _values(rng)
+    for size in SIZES:
+        quantizer = Quantizer("FAKESYMBOL", step_size=size, tick_size=size)
+        expected = [round_step_size(v, step_size=size) for v in values]
+        assert [quantizer.step(v) for v in values] == expected
+        assert [quantizer.tick(v) for v in values] == expected
+        # strings, decimals and negative values use integer math
+        for value in ("545.168734897", "-0.0057", "1E-7"):
+            assert quantizer.step(value) == round_step_size(value, size)
+
+    quantizer = Quantizer(symbol="FAKESYMBOL", step_size=0.001, tick_size=0.05)
+    small = np.array([v for v in values if v < 1e9])
+    assert quantizer.steps(small).tolist() == [
+        round_step_size(quantity=v, step_size=0.001) for v in small
+    ]
+    assert quantizer.ticks(small).tolist() == [
+        round_step_size(quantity=v, step_size=0.05) for v in small
+    ]
+
+
+def test_size_error():
+    quantizer = Quantizer(symbol="FAKESYMBOL", step_size=0.01, tick_size=0.0)
+    with pytest.raises(ValueError):
+        quantizer.tick(1.0)
+
+
+def test_format_positional():
+    context = Context(prec=8)
+    rng = random.Random(5)
+    values = _values(rng) + [-v for v in _values(rng)]
+    values += [-0.0, 5e-324, 0.000099999995, 999999995.0, 123456789.0]
+    for value in values:
+        expected = format(context.create_decimal(repr(value)), "f")
+        assert format_positional(value) == expected
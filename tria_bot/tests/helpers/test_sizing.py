@@ -0,0 +1,112 @@
+import numpy as np
+from tria_bot.helpers.binance import Binance as BinanceHelper
+from tria_bot.helpers.book import CompactBook
+from tria_bot.helpers.sizing import LegCurve, executable_size
+from tria_bot.models.composite import Symbol
+from tria_bot.services.proffit import ProffitSvc
+
+
+FEE_MULT = 0.999
+
+
+def _size(prices, qtys, min_proffit=0.3):
+    return executable_size(
+        alt_stable=LegCurve.buy(prices, qtys),
+        alt_strong=LegCurve.sell([0.0102], [1000.0]),
+        strong_stable=LegCurve.sell([100.0], [10.0]),
+        alt_step=0.01,
+        strong_step=0.00001,
+        fee_mult=FEE_MULT,
+        min_proffit=min_proffit,
+    )
+
+
+def test_leg_curve():
+    curve = LegCurve.buy([1.0, 2.0], [10.0, 5.0])
+    assert curve.output([5.0, 10.0, 14.0]).tolist() == [5.0, 10.0, 12.0]
+    assert curve.input([5.0, 12.0]).tolist() == [5.0, 14.0]
+    assert np.isnan(curve.output([30.0])).all()
+
+
+def test_executable_size():
+    size, proffit = _size([1.0, 1.1], [100.0, 100.0])
+    # first level fills 100 USDT, the 1.1 level lowers proffit to 0.305%
+    gross = 1.02 * FEE_MULT**3
+    limit = 100 + 100 * (gross - 1.00305) / (1.00305 - gross / 1.1)
+    assert limit - 1 < size <= limit
+    assert proffit > 0.3
+
+    # all the book is above the minimum
+    size, proffit = _size([1.0], [100.0])
+    assert size == 100.0
+    assert proffit == 1.69
+
+    assert _size([1.1], [100.0]) is None
+    assert _size([], []) is None
+
+
+def _symbol(symbol, step_size, tick_size):
+    return Symbol(
+        symbol=symbol,
+        base_asset=symbol[:4],
+        quote_asset=symbol[4:],
+        is_spot_trading_allowed=True,
+        min_price=0.0,
+        max_price=1000000.0,
+        tick_size=tick_size,
+        min_qty=0.0,
+        max_qty=1000000.0,
+        step_size=step_size,
+        order_types=["LIMIT"],
+        permissions=["SPOT"],
+        status="TRADING",
+    )
+
+
+def test_taker_sides():
+    svc = ProffitSvc()
+    svc.depth_size = True
+    svc.min_proffit_detect = 0.3
+    svc.fee_mult = FEE_MULT
+    svc.proffit_percent_format = True
+    svc._binance_helper = BinanceHelper(
+        symbols=[
+            _symbol("FALTFUSD", 0.01, 0.0001),
+            _symbol("FALTFBTC", 0.01, 0.0001),
+            _symbol("FBTCFUSD", 0.00001, 0.01),
+        ]
+    )
+    # alt bought on asks, sold on bids; deeper levels are worse and the
+    # other sides (better deeper levels) must not be walked
+    depths = [
+        CompactBook(
+            "FALTFUSD",
+            [("0.99", "1.0"), ("0.9", "10000.0")],
+            [("1.0", "100.0"), ("1.1", "100.0")],
+        ),
+        CompactBook(
+            "FALTFBTC",
+            [("0.0102", "1000.0")],
+            [("0.0103", "1.0"), ("0.02", "1000.0")],
+        ),
+        CompactBook(
+            "FBTCFUSD",
+            [("100.0", "10.0")],
+            [("101.0", "0.01"), ("200.0", "10.0")],
+        ),
+    ]
+    result = svc._executable_size(depths)
+    size, value = _size([1.0, 1.1], [100.0, 100.0])
+    assert result == {"size": size, "size_value": value}
+    # the first level fills 100 USDT, the 1.1 one drops below 0.3%
+    gross = 1.02 * FEE_MULT**3
+    limit = 100 + 100 * (gross - 1.00305) / (1.00305 - gross / 1.1)
+    assert limit - 1 < result["size"] <= limit
+    assert result["size_value"] > 0.3
+
+    # not filled above the minimum, or not sized
+    depths[1] = CompactBook("FALTFBTC", [], [("0.0102", "1000.0")])
+    assert svc._executable_size(depths) == {"size": 0.0}
+    assert svc._executable_size([None, *depths[1:]]) == {"size": 0.0}
+    svc.depth_size = False
+    assert svc._executable_size(depths) == {}
@@ -1,9 +1,12 @@
+import pytest
 from tria_bot.helpers.symbols import (
     all_combos,
     alt_combos,
     stable_alt_combos,
     strong_alt_combos,
     strong_stable_combos,
+    TriangleIndex,
+    parse_shard,
 )
 
 
@@ -81,4 +84,62 @@ def test_all_combos():
         f"{STRONG_ASSETS[1]}{STABLE_ASSETS[0]}",
         f"{STRONG_ASSETS[1]}{STABLE_ASSETS[1]}",
     )
-    assert set(combos) == set(expected)
\ No newline at end of file
+    assert set(combos) == set(expected)
+
+
+def test_triangle_index():
+    index = TriangleIndex(
+        alt_assets=ALT_ASSETS,
+        valid_symbols=("SOLUSDT", "SOLBTC", "SOLETH", "XRPUSDT", "BTCUSDT"),
+        strong_assets=STRONG_ASSETS,
+        stable_assets=STABLE_ASSETS,
+    )
+
+    # ETHUSDT and XRPBTC are not valid
+    assert len(index) == 1
+    triangle = index.triangles[0]
+    assert (triangle.alt, triangle.strong, triangle.stable) == (
+        "SOL",
+        "BTC",
+        "USDT",
+    )
+    assert triangle.symbols == ("SOLUSDT", "SOLBTC", "BTCUSDT")
+    assert index.get("SOL", "BTC", "USDT") is triangle
+    assert index.get("SOL", "ETH", "USDT") is None
+
+    assert index.symbols == ["SOLUSDT", "SOLBTC", "BTCUSDT"]
+    assert index.symbol_ids["BTCUSDT"] == 2
+    assert "BTCUSDT" in index
+    assert "XRPUSDT" not in index
+    assert index.triangles_of("BTCUSDT") == [triangle]
+    assert index.triangles_of("XRPUSDT") == ()
+
+
+def test_triangle_index_shards():
+    alts = [f"ALT{i}" for i in range(40)]
+    valid_symbols = [f"{stg}USDT" for stg in STRONG_ASSETS]
+    for alt in alts:
+        valid_symbols += [f"{alt}USDT"] + [f"{alt}{s}" for s in STRONG_ASSETS]
+
+    def index(shard):
+        return TriangleIndex(
+            alt_assets=alts,
+            valid_symbols=valid_symbols,
+            strong_assets=STRONG_ASSETS,
+            stable_assets=("USDT",),
+            shard=shard,
+        )
+
+    whole = index((1, 1))
+    shards = [index((i, 3)) for i in range(1, 4)]
+    assert all(len(shard) for shard in shards)
+    owned = [(t.alt, t.strong, t.stable) for s in shards for t in s]
+    assert sorted(owned) == sorted((t.alt, t.strong, t.stable) for t in whole)
+    # every alt (and its alt legs) belongs to one shard
+    alts_by_shard = [{t.alt for t in shard} for shard in shards]
+    assert sum(map(len, alts_by_shard)) == len(set.union(*alts_by_shard))
+
+    assert parse_shard(" 2/3") == (2, 3)
+    for shard in ("0/3", "4/3", "1"):
+        with pytest.raises(ValueError):
+            parse_shard(shard)
@@ -0,0 +1,19 @@
+# type: ignore
+
+import asyncio
+from tria_bot.crud.activity import SymbolActivityCRUD
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+@pytest_mark_asyncio
+async def test_mark_hot(redis):
+    activity = SymbolActivityCRUD(conn=redis, window=0.5)
+    await activity.mark(symbols=["FAKESYMBOL1", "FAKESYMBOL2"])
+    assert await activity.hot() == {"FAKESYMBOL1", "FAKESYMBOL2"}
+
+    await asyncio.sleep(0.6)
+    await activity.mark(symbols=["FAKESYMBOL3"])
+    assert await activity.hot() == {"FAKESYMBOL3"}
+    assert await redis.zcard(activity.key) == 1
+
+    await redis.delete(activity.key)
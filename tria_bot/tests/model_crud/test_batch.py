@@ -0,0 +1,156 @@
+# type: ignore
+
+import asyncio
+import orjson
+import pytest
+
+# We need to run this check as sync code (during tests) even in async mode
+# because we call it in the top-level module scope.
+from redis_om import has_redis_json
+from tria_bot.crud.batch import BatchWriter
+from tria_bot.tests.conftest import REDIS_URL, pytest_mark_asyncio
+
+
+if not has_redis_json():
+    pytestmark = pytest.mark.skip
+
+
+KEY = "tria_bot:testing:Batch:{pk}"
+
+
+def _record(pk: str, version: int):
+    return KEY.format(pk=pk), orjson.dumps({"pk": pk, "version": version})
+
+
+async def _version(redis, pk: str):
+    document = await redis.execute_command("JSON.GET", KEY.format(pk=pk))
+    return None if document is None else orjson.loads(document)["version"]
+
+
+def _writer(redis, **kwargs) -> BatchWriter:
+    kwargs = {"max_delay": 0.0, "max_records": 100, **kwargs}
+    return BatchWriter(conn=redis, stats_interval=0.0, **kwargs)
+
+
+@pytest_mark_asyncio
+async def test_flush_next_tick(redis):
+    writer = _writer(redis)
+    await writer.add_raw([_record("TICK", 1)])
+    assert writer._records and writer._handle is not None
+
+    # max_delay 0: flushed as soon as the adding coroutine yields
+    await asyncio.sleep(0.05)
+    assert await _version(redis, "TICK") == 1
+    assert not writer._records and writer._handle is None
+
+
+@pytest_mark_asyncio
+async def test_flush_delay(redis):
+    writer = _writer(redis, max_delay=0.3)
+    await writer.add_raw([_record("DELAY", 1)])
+    await asyncio.sleep(0.1)
+    # the delay runs from the first record of the batch, not the last
+    await writer.add_raw([_record("DELAY", 2)])
+    assert await _version(redis, "DELAY") is None
+
+    await asyncio.sleep(0.3)
+    assert await _version(redis, "DELAY") == 2
+    assert writer.stats.flushes == 1
+
+
+@pytest_mark_asyncio
+async def test_flush_max_records(redis):
+    writer = _writer(redis, max_delay=60.0, max_records=3)
+    await writer.add_raw([_record("MAX1", 1), _record("MAX2", 1)])
+    assert await _version(redis, "MAX1") is None
+    assert writer._handle is not None
+
+    # a full batch is saved before `add` returns, the timer is dropped
+    await writer.add_raw([_record("MAX3", 1)])
+    assert [await _version(redis, f"MAX{i}") for i in (1, 2, 3)] == [1] * 3
+    assert writer._handle is None
+
+
+@pytest_mark_asyncio
+async def test_last_write_wins(redis):
+    writer = _writer(redis, max_delay=60.0)
+    channel = "tria_bot:testing:batch-updates"
+    async with redis.pubsub(ignore_subscribe_messages=True) as ps:
+        await ps.subscribe(channel)
+        await writer.add_raw([_record("LAST", 1)], channel=channel)
+        await writer.add_raw(
+            [_record("LAST", 2), _record("OTHER", 1)],
+            channel=channel,
+        )
+        await writer.add_raw([_record("LAST", 3)], channel=channel)
+        await writer.flush()
+        assert await _version(redis, "LAST") == 3
+
+        # one publication per batch, every updated key once
+        for _ in range(5):
+            message = await ps.get_message(timeout=0.2)
+            if message is not None:
+                break
+        assert orjson.loads(message["data"]) == ["LAST", "OTHER"]
+        assert await ps.get_message(timeout=0.1) is None
+
+
+@pytest_mark_asyncio
+async def test_concurrent_order(redis):
+    writer = _writer(redis, max_records=4)
+
+    # concurrent adds overlap their flushes, batches are saved in order
+    await asyncio.gather(
+        *(writer.add_raw([_record("ORDER", i)]) for i in range(50))
+    )
+    await asyncio.sleep(0.05)
+    assert await _version(redis, "ORDER") == 49
+    assert writer.stats.records == 50
+
+
+@pytest_mark_asyncio
+async def test_release(redis, monkeypatch):
+    writer = BatchWriter.shared(url=REDIS_URL)
+    assert BatchWriter.shared(url=REDIS_URL) is writer
+    writer.max_delay = 60.0
+    close, closed = writer._conn.close, []
+
+    async def counted_close():
+        closed.append(True)
+        await close()
+
+    monkeypatch.setattr(writer._conn, "close", counted_close)
+    await writer.add_raw([_record("RELEASE", 1)])
+
+    # pending records are kept while other users remain
+    await writer.release()
+    assert await _version(redis, "RELEASE") is None
+    assert not closed and BatchWriter.shared(url=REDIS_URL) is writer
+    await writer.release()
+
+    # the last user flushes them before closing the connection
+    await writer.release()
+    assert await _version(redis, "RELEASE") == 1
+    assert writer._handle is None
+    assert closed == [True]
+    assert (REDIS_URL, REDIS_URL) not in BatchWriter._shared
+
+
+@pytest_mark_asyncio
+async def test_stats(redis):
+    writer = _writer(redis, max_delay=60.0)
+    await writer.add_raw([_record("STATS1", 1), _record("STATS2", 1)])
+    await writer.flush()
+    await writer.add_raw([_record(f"STATS{i}", 2) for i in (1, 2, 3, 4)])
+    await writer.flush()
+    # empty batches are not counted
+    await writer.flush()
+
+    stats = writer.stats.as_dict()
+    assert stats["flushes"] == 2
+    assert stats["records"] == 6
+    assert stats["avg_batch_size"] == 3.0
+    assert stats["max_batch_size"] == 4
+    assert writer.stats.last_batch_size == 4
+    assert 0 < writer.stats.last_latency <= writer.stats.max_latency
+    assert stats["avg_flush_ms"] <= stats["max_flush_ms"]
@@ -0,0 +1,51 @@
+# type: ignore
+
+import asyncio
+import contextlib
+from tria_bot.crud.cache import ModelCache
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+async def _subscribed(cache: ModelCache, conn) -> int:
+    cache.watch(conn)
+    while not cache._subscribed:
+        await asyncio.sleep(0.01)
+    return cache.watch(conn)
+
+
+@pytest_mark_asyncio
+async def test_cache_invalidation(redis):
+    cache = ModelCache()
+    cache.channel = "tria_bot:testing:cache-invalidation"
+
+    # rows read before subscribing are not kept
+    generation = cache.watch(redis)
+    cache.put("tria_bot:Symbol:FAKE1", "row", generation)
+    generation = await _subscribed(cache, redis)
+    assert cache.get("tria_bot:Symbol:FAKE1") is None
+
+    cache.put("tria_bot:Symbol:FAKE1", "row1", generation)
+    cache.put("tria_bot:Symbol:FAKE2", "row2", generation)
+    assert cache.get("tria_bot:Symbol:FAKE1") == "row1"
+
+    # writes of another process
+    other = ModelCache()
+    other.channel = cache.channel
+    await other.publish(redis, ["tria_bot:Symbol:FAKE1"])
+    for _ in range(100):
+        if len(cache) == 1:
+            break
+        await asyncio.sleep(0.01)
+    assert cache.get("tria_bot:Symbol:FAKE1") is None
+    assert cache.get("tria_bot:Symbol:FAKE2") == "row2"
+
+    # reads started before an invalidation are not kept
+    cache.put("tria_bot:Symbol:FAKE1", "row1", generation)
+    assert cache.get("tria_bot:Symbol:FAKE1") is None
+    assert cache.stats() == {"hits": 2, "misses": 3, "rows": 1}
+
+    # rows are dropped when the listener stops
+    cache._listener.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await cache._listener
+    assert len(cache) == 0
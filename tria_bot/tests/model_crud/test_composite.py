@@ -218,3 +218,28 @@ def test_symbol_size(symbol):
 
     tick_sized = symbol.apply_tick_size(value=value)
     assert tick_sized == 5.13234
+
+
+@pytest_mark_asyncio
+async def test_cached_get(crud, symbol):
+    cache = crud.symbols.cache
+    cache.watch(crud.symbols._conn)
+    while not cache._subscribed:
+        await asyncio.sleep(0.01)
+
+    await crud.symbols.get(symbol.symbol)
+    hits = cache.hits
+    s = await crud.symbols.get(symbol.symbol)
+    assert s == symbol
+    assert cache.hits == hits + 1
+
+    # cached rows are copies
+    s.status = "BREAK"
+    s = await crud.symbols.get(symbol.symbol)
+    assert s.status == symbol.status
+
+    # writes invalidate rows
+    await crud.symbols.save(symbol)
+    misses = cache.misses
+    assert await crud.symbols.get_many([symbol.symbol]) == [symbol]
+    assert cache.misses == misses + 1
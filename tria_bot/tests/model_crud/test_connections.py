@@ -0,0 +1,28 @@
+# type: ignore
+
+from tria_bot.crud.connections import DATA, OM, PUBSUB, ConnectionManager
+from tria_bot.tests.conftest import REDIS_URL, pytest_mark_asyncio
+
+
+@pytest_mark_asyncio
+async def test_role_pools():
+    connections = ConnectionManager(urls={OM: REDIS_URL})
+    assert connections.urls == {
+        DATA: REDIS_URL,
+        OM: REDIS_URL,
+        PUBSUB: REDIS_URL,
+    }
+
+    # one client and pool by role
+    assert connections.get(DATA) is connections.data
+    pools = {c.connection_pool for c in (connections.data, connections.om)}
+    assert len(pools) == 2
+    pool = connections.pubsub.connection_pool
+    assert pool.max_connections == connections.max_connections[PUBSUB]
+
+    await connections.data.set("tria_bot:testing:connections", "1")
+    assert await connections.om.get("tria_bot:testing:connections") == "1"
+    await connections.om.delete("tria_bot:testing:connections")
+
+    await connections.close()
+    assert connections._clients == {}
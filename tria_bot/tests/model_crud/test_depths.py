@@ -1,16 +1,24 @@
 # type: ignore
 
 import asyncio
+import time
 import pytest
 import pytest_asyncio
+from types import SimpleNamespace
 from typing import Generator, Any
 
 # We need to run this check as sync code (during tests) even in async mode
 # because we call it in the top-level module scope.
 from redis_om import has_redis_json
-from aredis_om import NotFoundError
+from aredis_om import NotFoundError, get_redis_connection
 from tria_bot.models.depth import Depth
-from tria_bot.tests.conftest import pytest_mark_asyncio
+from tria_bot.services.depth import MultiplexDepthSvc
+from tria_bot.crud.batch import BatchWriter
+from tria_bot.tests.conftest import (
+    PUB_SUB_REDIS_URL,
+    REDIS_URL,
+    pytest_mark_asyncio,
+)
 
 
 if not has_redis_json():
@@ -39,6 +47,17 @@ async def test_get(crud, depth):
     assert s == depth
 
 
+@pytest_mark_asyncio
+async def test_get_many(crud, depth):
+    ds = await crud.depths.get_many([depth.symbol, "NOTFOUNDSYMBOL"])
+    assert ds == [depth, None]
+
+    books = await crud.depths.get_books(["NOTFOUNDSYMBOL", depth.symbol])
+    assert books[0] is None
+    assert books[1].symbol == depth.symbol
+    assert books[1].bid(0) == float(depth.bids[0][0])
+
+
 @pytest_mark_asyncio
 async def test_not_found(crud):
     with pytest.raises(NotFoundError) as err:
@@ -67,6 +86,79 @@ async def test_wait_for(crud):
     await crud.depths.model.delete(S)
 
 
+@pytest_mark_asyncio
+async def test_wait_for_all(crud, depth):
+    S = "WAITSYMBOL"
+
+    async def new_depth() -> Depth:
+        await asyncio.sleep(0.2)
+        d = crud.depths.model(
+            symbol=S,
+            bids=[("0.468746", "685465.4")],
+            asks=[("0.478166", "6548.4")],
+            event_time=684685,
+        )
+        return await crud.depths.save(d)
+
+    tasks = [crud.depths.wait_for_all([depth.symbol, S], timeout=5.0)]
+    results = await asyncio.gather(*tasks, new_depth())
+    assert [d.symbol for d in results[0]] == [depth.symbol, S]
+
+    # ensure delete to prevent next steps
+    await crud.depths.model.delete(S)
+
+
+@pytest_mark_asyncio
+async def test_keyspace_events(crud, redis, depth):
+    original = await redis.config_get("notify-keyspace-events")
+    await redis.config_set("notify-keyspace-events", "")
+    crud.depths._keyspace_notify.clear()
+    crud.depths.wait_keyspace_events = ("Kd", "Kg")
+    try:
+        # server flags are only checked, unless CONFIG SET is enabled
+        assert not await crud.depths._enable_keyspace_events()
+        config = await redis.config_get("notify-keyspace-events")
+        assert config["notify-keyspace-events"] == ""
+
+        # any flag set is enough (generic events of older RedisJSON)
+        await redis.config_set("notify-keyspace-events", "Kg")
+        crud.depths._keyspace_notify.clear()
+        assert await crud.depths._enable_keyspace_events()
+
+        await redis.config_set("notify-keyspace-events", "")
+        crud.depths._keyspace_notify.clear()
+        crud.depths.wait_config_set = True
+        assert await crud.depths._enable_keyspace_events()
+        config = await redis.config_get("notify-keyspace-events")
+        assert set(config["notify-keyspace-events"]) == {"K", "d"}
+
+        # JSON.SET writes wake waiters with the default flags
+        async with redis.pubsub(ignore_subscribe_messages=True) as ps:
+            await ps.psubscribe(crud.depths._keyspace_pattern())
+            await crud.depths.save(depth)
+            # the first read may be the (ignored) subscribe confirmation
+            for _ in range(5):
+                message = await ps.get_message(timeout=0.2)
+                if message is not None:
+                    break
+            assert message is not None
+            assert message["channel"].endswith(depth.pk)
+            assert message["data"] == "json.set"
+    finally:
+        del crud.depths.wait_keyspace_events
+        del crud.depths.wait_config_set
+        crud.depths._keyspace_notify.clear()
+        await redis.config_set(
+            "notify-keyspace-events", original["notify-keyspace-events"]
+        )
+
+
+@pytest_mark_asyncio
+async def test_wait_for_timeout(crud):
+    with pytest.raises(asyncio.TimeoutError):
+        await crud.depths.wait_for("NOTFOUNDSYMBOL", timeout=0.1)
+
+
 @pytest_mark_asyncio
 async def test_all_pks(crud, depth):
     depth_pks = [pk async for pk in crud.depths.all_pks()]
@@ -77,3 +169,113 @@ async def test_all_pks(crud, depth):
 async def test_get_all(crud, depth):
     ds = [d async for d in crud.depths.get_all()]
     assert ds == [depth]
+
+
+@pytest_mark_asyncio
+async def test_iter_batches(crud, depth):
+    batches = [b async for b in crud.depths.iter_batches(batch_size=1)]
+    assert batches == [[depth]]
+
+
+@pytest_mark_asyncio
+async def test_refresh_live_book(crud, redis):
+    depth = crud.depths.model(
+        symbol="FAKEQUIET",
+        bids=[("1.0", "2.0")],
+        asks=[("1.1", "2.0")],
+        event_time=123456789,
+    )
+    await crud.depths.save(depth)
+    svc = MultiplexDepthSvc(symbols=[depth.symbol])
+    svc._redis_conn = redis
+    svc.updates_channel = None
+    svc._touch(depth.symbol)
+    svc._stored_at[depth.symbol] -= svc.refresh_interval
+
+    # a closed socket leaves the book stale
+    assert await svc.refresh() == []
+
+    # a live socket without frames of the book keeps it, with a new time
+    svc._connected = True
+    svc._socket = SimpleNamespace(recv_time=time.time_ns())
+    assert await svc.refresh() == [depth.symbol]
+    refreshed = await crud.depths.get(depth.symbol)
+    assert refreshed.bids == depth.bids
+    assert refreshed.asks == depth.asks
+    assert refreshed.event_time > depth.event_time
+    assert await svc.refresh() == []
+
+    await crud.depths.model.delete(depth.symbol)
+
+
+@pytest_mark_asyncio
+async def test_refresh_stalled_socket(crud, redis):
+    depth = crud.depths.model(
+        symbol="FAKESTALLED",
+        bids=[("1.0", "2.0")],
+        asks=[("1.1", "2.0")],
+        event_time=123456789,
+    )
+    await crud.depths.save(depth)
+    svc = MultiplexDepthSvc(symbols=[depth.symbol])
+    svc._redis_conn = redis
+    svc.updates_channel = None
+    svc._touch(depth.symbol)
+    svc._stored_at[depth.symbol] -= svc.refresh_interval
+
+    # connected, but no frame of any stream since long ago
+    svc._connected = True
+    stalled = time.time_ns() - int(svc.refresh_interval * 2e9)
+    svc._socket = SimpleNamespace(recv_time=stalled)
+    assert await svc.refresh() == []
+    # transports without receive times are never refreshed
+    svc._socket = object()
+    assert await svc.refresh() == []
+    stored = await crud.depths.get(depth.symbol)
+    assert stored.event_time == depth.event_time
+
+    await crud.depths.model.delete(depth.symbol)
+
+
+@pytest.mark.skipif(
+    PUB_SUB_REDIS_URL is None, reason="TEST_PUB_SUB_REDIS_URL not set"
+)
+@pytest_mark_asyncio
+async def test_updates_on_pubsub_server(redis):
+    pubsub_conn = get_redis_connection(url=PUB_SUB_REDIS_URL)
+    svc = MultiplexDepthSvc(symbols=["FAKEROLES"])
+    svc._redis_conn = redis
+    svc._pubsub_conn = pubsub_conn
+    record = svc._raw_depth(
+        data={"bids": [("1.0", "2.0")], "asks": [("1.1", "2.0")]},
+        symbol="FAKEROLES",
+    )
+
+    async def published() -> list:
+        """Updates received on the data and pub/sub servers"""
+        pubsubs = [
+            conn.pubsub(ignore_subscribe_messages=True)
+            for conn in (redis, pubsub_conn)
+        ]
+        for ps in pubsubs:
+            await ps.subscribe(svc.updates_channel)
+            await ps.get_message(timeout=0.1)
+        await svc._write_raw(records=[record])
+        if svc._writer is not None:
+            await svc._writer.flush()
+        messages = []
+        for ps in pubsubs:
+            msg = await ps.get_message(timeout=0.5)
+            messages.append(msg and msg["data"])
+            await ps.close()
+        return messages
+
+    # direct and batched writes publish on the pub/sub server only
+    assert await published() == [None, '["FAKEROLES"]']
+    svc._writer = BatchWriter.shared(
+        url=REDIS_URL, pubsub_url=PUB_SUB_REDIS_URL
+    )
+    assert await published() == [None, '["FAKEROLES"]']
+
+    await svc._writer.release()
+    await redis.delete(record[0])
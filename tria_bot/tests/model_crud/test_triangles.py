@@ -0,0 +1,88 @@
+# type: ignore
+
+import time
+import pytest
+from typing import Generator, Any
+
+# We need to run this check as sync code (during tests) even in async mode
+# because we call it in the top-level module scope.
+from redis_om import has_redis_json
+from tria_bot.crud.triangles import TriangleScript
+from tria_bot.helpers.quantize import Quantizer
+from tria_bot.helpers.symbols import Triangle
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+if not has_redis_json():
+    pytestmark = pytest.mark.skip
+
+FEE_MULT = 1 - 0.00075
+
+
+@pytest.fixture(scope="session")
+def triangle() -> Generator[Triangle, Any, None]:
+    yield Triangle(
+        id=0,
+        alt="FAKEALT",
+        strong="FAKEBTC",
+        stable="FAKEUSDT",
+        alt_stable="FAKEALTFAKEUSDT",
+        alt_strong="FAKEALTFAKEBTC",
+        strong_stable="FAKEBTCFAKEUSDT",
+    )
+
+
+@pytest_mark_asyncio
+async def test_evaluate(crud, redis, triangle):
+    now = time.time_ns() // 1000000
+    prices = ("0.45620000", "0.00001060", "43150.12000000")
+    for symbol, price in zip(triangle.symbols, prices):
+        await crud.depths.save(
+            crud.depths.model(
+                symbol=symbol,
+                bids=[(price, "100.0")],
+                asks=[(price, "100.0")],
+                event_time=now,
+            )
+        )
+    script = TriangleScript(conn=redis)
+    await script.load_steps(
+        {triangle.alt_strong: 1.0, triangle.strong_stable: 1e-05}
+    )
+
+    # same operations as `ProffitSvc.calc_proffit`
+    alt_qty = Quantizer(triangle.alt_strong, 1.0, None).step(
+        (100.0 / float(prices[0])) * FEE_MULT
+    )
+    strong_qty = Quantizer(triangle.strong_stable, 1e-05, None).step(
+        alt_qty * float(prices[1]) * FEE_MULT
+    )
+    expected = (strong_qty * float(prices[2]) * FEE_MULT / 100.0 - 1) * 100
+
+    results, stale = await script.evaluate(
+        triangles=[triangle],
+        fee_mult=FEE_MULT,
+        min_proffit=-100.0,
+        now=now,
+        max_ages=(5.0, 5.0, 5.0),
+    )
+    assert results == [(0, expected, prices)]
+    assert stale == []
+
+    results, stale = await script.evaluate(
+        triangles=[triangle],
+        fee_mult=FEE_MULT,
+        min_proffit=expected,
+        now=now,
+    )
+    assert results == []
+
+    results, stale = await script.evaluate(
+        triangles=[triangle],
+        fee_mult=FEE_MULT,
+        min_proffit=-100.0,
+        now=now + 10000,
+        max_ages=(5.0, 0.0, 0.0),
+    )
+    assert results == []
+    assert stale == [triangle.alt_stable]
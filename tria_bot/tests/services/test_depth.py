@@ -0,0 +1,114 @@
+# type: ignore
+
+import orjson
+import pytest
+from tria_bot.models.depth import Depth
+from tria_bot.services.base import SocketError
+from tria_bot.services.depth import BookTickerSvc, MultiplexDepthSvc
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+EVENT_TIME = 123456789
+PAYLOAD = {
+    "lastUpdateId": 160,
+    "bids": [["0.468746", "685465.4"], ["0.6878", "6885.1"]],
+    "asks": [["0.478166", "6548.4"], ["0.67488", "6878.2"]],
+}
+
+
+def _svc(cls, symbols=("FAKE1", "FAKE2")):
+    svc = cls(symbols=list(symbols))
+    svc.recv_time = lambda: EVENT_TIME
+    return svc
+
+
+def _document_model(record) -> Depth:
+    key, document = record
+    model = Depth(**orjson.loads(document))
+    # raw documents keep the model layout and key
+    assert key == model.key()
+    assert orjson.loads(document) == orjson.loads(model.json())
+    return model
+
+
+def test_multiplex_routing():
+    svc = _svc(MultiplexDepthSvc)
+    stream = {"stream": "fake2@depth5@100ms", "data": PAYLOAD}
+
+    records = list(svc._raw_or_raise(data=stream))
+    assert len(records) == 1
+    model = _document_model(records[0])
+    assert model.symbol == "FAKE2"
+    assert model.bids == [tuple(level) for level in PAYLOAD["bids"]]
+    assert model.asks == [tuple(level) for level in PAYLOAD["asks"]]
+    assert model.event_time == EVENT_TIME
+
+    # validated models carry the same book
+    assert list(svc._model_or_raise(data=stream)) == [model]
+
+
+def test_multiplex_unknown_stream():
+    svc = _svc(MultiplexDepthSvc)
+    unknown = [
+        {"stream": "other@depth5@100ms", "data": PAYLOAD},
+        # subscribed symbol, other stream
+        {"stream": "fake1@depth20@100ms", "data": PAYLOAD},
+        {"data": PAYLOAD},
+    ]
+    for stream in unknown:
+        with pytest.raises(SocketError):
+            list(svc._raw_or_raise(data=stream))
+        with pytest.raises(SocketError):
+            list(svc._model_or_raise(data=stream))
+
+    with pytest.raises(SocketError):
+        list(svc._raw_or_raise(data={"stream": "fake1@depth5@100ms"}))
+
+
+@pytest_mark_asyncio
+async def test_multiplex_callback(monkeypatch):
+    svc = _svc(MultiplexDepthSvc)
+    stored = []
+
+    async def store(models):
+        stored.extend(model.symbol for model in models)
+
+    async def store_raw(records):
+        stored.extend(_document_model(r).symbol for r in records)
+
+    monkeypatch.setattr(svc, "store", store)
+    monkeypatch.setattr(svc, "store_raw", store_raw)
+    for raw_ingest in (False, True):
+        svc.raw_ingest = raw_ingest
+        await svc.callback({"stream": "fake1@depth5@100ms", "data": PAYLOAD})
+        await svc.callback({"stream": "fake2@depth5@100ms", "data": PAYLOAD})
+    assert stored == ["FAKE1", "FAKE2"] * 2
+
+
+def test_book_ticker():
+    svc = _svc(BookTickerSvc)
+    ticker = {
+        "u": 400900217,
+        "s": "FAKE1",
+        "b": "25.35190000",
+        "B": "31.21000000",
+        "a": "25.36520000",
+        "A": "40.66000000",
+    }
+    stream = {"stream": "fake1@bookTicker", "data": ticker}
+
+    records = list(svc._raw_or_raise(data=stream))
+    assert len(records) == 1
+    assert records[0][0] == "tria_bot:Depth:FAKE1"
+    model = _document_model(records[0])
+    # one level books of the best bid and ask
+    assert model.symbol == "FAKE1"
+    assert model.bids == [("25.35190000", "31.21000000")]
+    assert model.asks == [("25.36520000", "40.66000000")]
+    assert model.event_time == EVENT_TIME
+    assert list(svc._model_or_raise(data=stream)) == [model]
+
+    with pytest.raises(SocketError):
+        list(svc._raw_or_raise(data={**stream, "data": {"b": "1.0"}}))
+    with pytest.raises(SocketError):
+        list(svc._raw_or_raise(data={**stream, "stream": "fake1@depth5"}))
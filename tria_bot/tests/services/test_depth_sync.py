@@ -0,0 +1,93 @@
+# type: ignore
+
+import asyncio
+from types import SimpleNamespace
+from aiohttp import ClientError
+from binance.exceptions import BinanceAPIException
+from tria_bot.services.depth import DiffDepthSvc
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+SNAPSHOT = {
+    "lastUpdateId": 10,
+    "bids": [["1.0", "5"]],
+    "asks": [["1.1", "5"]],
+}
+
+
+class FailingClient:
+    """Snapshot client failing with the given errors before answering"""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def get_order_book(self, symbol: str, limit: int):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return SNAPSHOT
+
+
+def _api_error(status_code: int, retry_after: str = None):
+    headers = {} if retry_after is None else {"Retry-After": retry_after}
+    return BinanceAPIException(
+        response=SimpleNamespace(headers=headers),
+        status_code=status_code,
+        text='{"code": -1003, "msg": "Too many requests."}',
+    )
+
+
+def _svc(client, monkeypatch):
+    svc = DiffDepthSvc(symbols=["FAKESYMBOL"])
+    svc._binance_client = client
+    stored, sleeps = [], []
+
+    async def store_book(book):
+        stored.append(book.symbol)
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(svc, "_store_book", store_book)
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return svc, stored, sleeps
+
+
+@pytest_mark_asyncio
+async def test_snapshot_backoff(monkeypatch):
+    client = FailingClient(
+        _api_error(status_code=429, retry_after="30"),
+        ClientError("connection reset"),
+        asyncio.TimeoutError(),
+        _api_error(status_code=500),
+    )
+    svc, stored, sleeps = _svc(client, monkeypatch)
+    svc.snapshot_base_delay, svc.snapshot_max_delay = 1.0, 4.0
+
+    book = svc._books["FAKESYMBOL"]
+    await svc._sync(book=book)
+    # exponential and capped, Retry-After wins when longer
+    assert sleeps == [30.0, 2.0, 4.0, 4.0]
+    assert client.calls == 5
+    assert book.is_synced and book.last_update_id == 10
+    assert stored == ["FAKESYMBOL"]
+
+
+@pytest_mark_asyncio
+async def test_snapshot_errors_keep_task(monkeypatch):
+    client = FailingClient(ClientError("unreachable"))
+    svc, stored, _ = _svc(client, monkeypatch)
+
+    # failed snapshots are retried by the running task (diffs arriving in
+    # the meantime do not spawn a new one) instead of failing it
+    book = svc._books["FAKESYMBOL"]
+    svc._ensure_sync(book=book)
+    task = svc._sync_tasks["FAKESYMBOL"]
+    svc._ensure_sync(book=book)
+    assert svc._sync_tasks["FAKESYMBOL"] is task
+
+    await task
+    assert task.exception() is None
+    assert client.calls == 2
+    assert stored == ["FAKESYMBOL"]
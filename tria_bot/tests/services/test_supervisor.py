@@ -0,0 +1,142 @@
+# type: ignore
+
+import asyncio
+import time
+from aredis_om.connections import redis as aioredis
+from tria_bot.clients.websocket import SocketClosedError
+from tria_bot.services import supervisor
+from tria_bot.services.supervisor import (
+    ConnectionBudget,
+    SocketHealth,
+    SocketSupervisor,
+)
+from tria_bot.tests.conftest import pytest_mark_asyncio
+
+
+BUDGET_KEY = "tria_bot:testing:SocketConnections"
+
+
+def _supervisor(redis, **kwargs) -> SocketSupervisor:
+    kwargs = {"connect_jitter": 0.0, "health_interval": 0.0, **kwargs}
+    svc = SocketSupervisor(conn=redis, **kwargs)
+    svc.budget.key = BUDGET_KEY
+    return svc
+
+
+def test_backoff(redis, monkeypatch):
+    svc = _supervisor(redis, base_delay=0.5, max_delay=4.0)
+
+    # full jitter: uniform between 0 and the capped exponential delay
+    monkeypatch.setattr(supervisor, "uniform", lambda a, b: b)
+    delays = [svc._backoff(attempt) for attempt in range(6)]
+    assert delays == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0]
+
+    monkeypatch.setattr(supervisor, "uniform", lambda a, b: a)
+    assert svc._backoff(10) == 0.0
+
+
+@pytest_mark_asyncio
+async def test_reconnects(redis):
+    svc = _supervisor(redis, base_delay=0.001, max_delay=0.01)
+    connects = []
+
+    async def connect():
+        connects.append(time.time())
+        if len(connects) < 3:
+            raise SocketClosedError("closed")
+
+    await svc.run(
+        symbols=["FAKE1", "FAKE2"],
+        connect=connect,
+        is_running=lambda: len(connects) < 3,
+    )
+    assert len(connects) == 3
+    table = svc.health_table()
+    assert table["FAKE1"]["state"] == "stopped"
+    assert table["FAKE1"]["reconnects"] == 2
+    assert table["FAKE2"]["last_error"] == repr(SocketClosedError("closed"))
+    await redis.delete(BUDGET_KEY)
+
+
+@pytest_mark_asyncio
+async def test_unexpected_errors(redis, monkeypatch):
+    svc = _supervisor(redis, base_delay=0.001, max_delay=0.01)
+    acquire = svc.budget.acquire
+    attempts = []
+
+    async def failing_acquire():
+        attempts.append("budget")
+        if len(attempts) == 1:
+            raise aioredis.RedisError("budget server down")
+        return await acquire()
+
+    async def connect():
+        attempts.append("connect")
+        if attempts.count("connect") == 1:
+            raise ValueError("bad frame")
+
+    monkeypatch.setattr(svc.budget, "acquire", failing_acquire)
+    await svc.run(
+        symbols=["FAKE1"],
+        connect=connect,
+        is_running=lambda: attempts.count("connect") < 2,
+    )
+    # neither a budget nor a data error stops the socket
+    assert attempts == ["budget", "budget", "connect", "budget", "connect"]
+    health = svc.health_table()["FAKE1"]
+    assert health["reconnects"] == 2
+    assert health["last_error"] == repr(ValueError("bad frame"))
+    await redis.delete(BUDGET_KEY)
+
+
+@pytest_mark_asyncio
+async def test_connection_budget(redis, monkeypatch):
+    monkeypatch.setattr(supervisor, "uniform", lambda a, b: a)
+    budget = ConnectionBudget(conn=redis, limit=2, period=0.5)
+    budget.key = BUDGET_KEY
+    await redis.delete(BUDGET_KEY)
+
+    assert await budget.acquire() == 0.0
+    assert await budget.acquire() == 0.0
+    assert await redis.zcard(BUDGET_KEY) == 2
+
+    # full budget: waits for the oldest connection to leave the period
+    start = time.monotonic()
+    waited = await budget.acquire()
+    assert 0.0 < waited <= 0.5
+    assert time.monotonic() - start >= waited - 0.01
+    # rejected attempts are not kept, expired ones are dropped
+    assert await redis.zcard(BUDGET_KEY) <= 2
+
+    await asyncio.sleep(0.5)
+    assert await budget.acquire() == 0.0
+    await redis.delete(BUDGET_KEY)
+
+
+def test_health_age():
+    health = SocketHealth()
+    assert health.as_dict()["last_message_age"] is None
+
+    health.last_message = 1000.0
+    assert health.as_dict(now=1005.0)["last_message_age"] == 5.0
+
+
+@pytest_mark_asyncio
+async def test_health_release(redis):
+    svc = _supervisor(redis, health_interval=60.0)
+    SocketSupervisor._shared["testing"] = svc
+    try:
+        assert SocketSupervisor.shared("testing") is svc
+        assert SocketSupervisor.shared("testing") is svc
+        task = svc._health_task
+        svc.touch("FAKE1")
+        assert svc.health_table()["FAKE1"]["state"] == "connected"
+
+        # health reports stop with the last user, counters are kept
+        await svc.release()
+        assert not task.done()
+        await svc.release()
+        assert task.done() and svc._health_task is None
+        assert "FAKE1" in svc.health
+    finally:
+        del SocketSupervisor._shared["testing"]